@@ -0,0 +1,110 @@
+"""比較完整與精簡瀏覽器設定載入活動列表頁的耗時與傳輸量
+
+    python benchmarks/bench_page_load.py [--url URL] [--loads 10] [--json]
+    python benchmarks/bench_page_load.py --standin --cards 500
+
+--standin 時在本機啟動 benchmarks/standin_site.py（不需登入）並載入它的列表頁。
+完整設定為原本的做法：normal 載入策略、不封鎖資源、等到卡片出現後捲動並固定等待 2 秒；
+精簡設定為 eager 載入策略、封鎖 BLOCKED_URL_PATTERNS，並在卡片數穩定時立即返回。
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.browser import setup_driver, block_resources, wait_for_cards, page_load_stats
+from config import TARGET_URL
+
+
+def load_full(driver, url: str) -> int:
+    driver.get(url)
+    count = wait_for_cards(driver, settle=0)
+    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+    time.sleep(2)
+    return count
+
+
+def load_lean(driver, url: str) -> int:
+    driver.get(url)
+    return wait_for_cards(driver)
+
+
+def run(lean: bool, url: str, loads: int) -> dict:
+    driver = setup_driver(lean=lean)
+    try:
+        block_resources(driver, enabled=lean)
+        seconds: List[float] = []
+        transfer: List[int] = []
+        resources: List[int] = []
+        cards = 0
+        for _ in range(loads):
+            # 每次載入前清除快取，量測的是實際的網路傳輸量
+            driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+            start = time.perf_counter()
+            cards = (load_lean if lean else load_full)(driver, url)
+            seconds.append(time.perf_counter() - start)
+            stats = page_load_stats(driver)
+            transfer.append(stats.get("transfer_bytes", 0))
+            resources.append(stats.get("resources", 0))
+    finally:
+        driver.quit()
+    return {
+        "profile": "lean" if lean else "full",
+        "loads": loads,
+        "cards": cards,
+        "median_s": round(statistics.median(seconds), 3),
+        "max_s": round(max(seconds), 3),
+        "median_kb": round(statistics.median(transfer) / 1024, 1),
+        "median_resources": statistics.median(resources),
+    }
+
+
+def start_standin(cards: int) -> str:
+    import uvicorn
+    from benchmarks.standin_site import SiteSettings, create_app
+
+    server = uvicorn.Server(uvicorn.Config(
+        create_app(SiteSettings(cards=cards, require_login=False)), host="127.0.0.1", port=0, log_level="warning"
+    ))
+    threading.Thread(target=server.run, name="standin", daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return f"http://127.0.0.1:{port}/index.php"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=TARGET_URL)
+    parser.add_argument("--standin", action="store_true", help="載入本機測試站的列表頁")
+    parser.add_argument("--cards", type=int, default=200, help="測試站的卡片數")
+    parser.add_argument("--loads", type=int, default=10)
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出")
+    args = parser.parse_args()
+
+    url = start_standin(args.cards) if args.standin else args.url
+    results = [run(False, url, args.loads), run(True, url, args.loads)]
+    full, lean = results
+    savings = {
+        "seconds_ratio": round(lean["median_s"] / full["median_s"], 3) if full["median_s"] else None,
+        "bytes_ratio": round(lean["median_kb"] / full["median_kb"], 3) if full["median_kb"] else None,
+    }
+    if args.json:
+        print(json.dumps({"url": url, "results": results, "lean_vs_full": savings}, ensure_ascii=False, indent=2))
+        return
+    for result in results:
+        print(
+            f"{result['profile']:<5} {result['median_s']:>7.3f} 秒 (最慢 {result['max_s']:.3f})  "
+            f"{result['median_kb']:>9.1f} KB  {result['median_resources']:>4} 個資源  {result['cards']} 張卡片"
+        )
+    print(f"精簡 / 完整: 時間 {savings['seconds_ratio']}，傳輸量 {savings['bytes_ratio']}")
+
+
+if __name__ == "__main__":
+    main()
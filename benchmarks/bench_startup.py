@@ -0,0 +1,140 @@
+"""量測服務冷啟動：匯入耗時、可回應請求的時間與第一次掃描完成的時間
+
+    python benchmarks/bench_startup.py [--runs 5] [--cards 200] [--json]
+
+- import: 在新的行程中 import main 的耗時，另以 -X importtime 列出累計最久的模組
+- ready / first_scan: 啟動 uvicorn main:app，從行程開始到 /metrics 可回應、以及 wmg_scans_total{result="ok"}
+  出現為止的時間；列表頁由本機的 benchmarks/standin_site.py 提供，不預熱 Chrome
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+IMPORT_SCRIPT = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+
+
+def measure_import(runs: int) -> dict:
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_SCRIPT], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return {"median_s": round(statistics.median(timings), 3), "min_s": round(min(timings), 3)}
+
+
+def slowest_imports(limit: int = 15) -> List[Dict[str, float]]:
+    """-X importtime 中累計耗時最久的頂層套件"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"], cwd=ROOT, capture_output=True, text=True
+    ).stderr
+    packages: Dict[str, int] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        top = name.strip().split(".")[0]
+        # 同一套件只取最外層（累計最大）的一筆
+        packages[top] = max(packages.get(top, 0), int(cumulative))
+    ordered = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+    return [{"package": name, "ms": round(us / 1000, 1)} for name, us in ordered if name != "main"][:limit]
+
+
+def start_standin(cards: int) -> str:
+    import uvicorn
+    from benchmarks.standin_site import SiteSettings, create_app
+
+    server = uvicorn.Server(uvicorn.Config(
+        create_app(SiteSettings(cards=cards, require_login=False)), host="127.0.0.1", port=0, log_level="warning"
+    ))
+    threading.Thread(target=server.run, name="standin", daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{server.servers[0].sockets[0].getsockname()[1]}"
+
+
+def measure_app(standin_url: str, timeout: float = 30) -> dict:
+    """啟動服務並輪詢 /metrics，回傳可回應與第一次掃描完成的秒數"""
+    with tempfile.TemporaryDirectory() as tmp:
+        port = 18000 + os.getpid() % 1000
+        env = {
+            **os.environ,
+            "WMG_BASE_URL": standin_url,
+            "DRIVER_POOL_WARM": "0",
+            "HISTORY_DB_PATH": str(Path(tmp) / "history.db"),
+            # 不使用 data/ 下的 leader 鎖與共用快照：避免成為 follower 而不掃描，也不覆寫實際服務的快照
+            "LEADER_LOCK_PATH": str(Path(tmp) / "leader.lock"),
+            "SHARED_SNAPSHOT_PATH": str(Path(tmp) / "snapshot.json"),
+        }
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        ready = first_scan = None
+        try:
+            with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1) as client:
+                while time.perf_counter() - start < timeout and first_scan is None:
+                    try:
+                        metrics = client.get("/metrics").text
+                    except httpx.HTTPError:
+                        time.sleep(0.01)
+                        continue
+                    if ready is None:
+                        ready = time.perf_counter() - start
+                    if 'wmg_scans_total{result="ok"}' in metrics:
+                        first_scan = time.perf_counter() - start
+                    else:
+                        time.sleep(0.01)
+        finally:
+            process.terminate()
+            process.wait()
+    return {"ready_s": ready, "first_scan_s": first_scan}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--cards", type=int, default=200, help="測試站的卡片數")
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出")
+    args = parser.parse_args()
+
+    standin_url = start_standin(args.cards)
+    app_runs = [measure_app(standin_url) for _ in range(args.runs)]
+
+    def median(key: str):
+        values = [run[key] for run in app_runs if run[key] is not None]
+        return round(statistics.median(values), 3) if values else None
+
+    report = {
+        "import": measure_import(args.runs),
+        "ready_s": median("ready_s"),
+        "first_scan_s": median("first_scan_s"),
+        "slowest_imports": slowest_imports(),
+    }
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+    print(f"import main: {report['import']['median_s']:.3f} 秒 (最快 {report['import']['min_s']:.3f})")
+    print(f"可回應請求: {report['ready_s']} 秒，第一次掃描完成: {report['first_scan_s']} 秒")
+    for item in report["slowest_imports"]:
+        print(f"  {item['package']:<24} {item['ms']:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
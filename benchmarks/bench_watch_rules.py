@@ -0,0 +1,143 @@
+"""比較監控規則引擎與逐條比對的速度
+
+    python benchmarks/bench_watch_rules.py [--cards N] [--rules 100,1000,10000] [--json]
+
+以隨機產生的課程與規則比對，並確認兩種方式的結果相同。
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.schemas import EventStatus, WatchRule
+from services.event_store import activity_date
+from services.watch_rules import CompiledRules
+
+SPORTS = ["射箭", "游泳", "田徑", "桌球", "羽球", "籃球", "柔道", "舉重", "自由車", "網球"]
+KINDS = ["反曲弓", "複合弓", "自由式", "短跑", "長跑", "單打", "雙打", "基礎", "進階", "體驗"]
+LEVELS = ["初級", "中級", "高級"]
+
+
+def make_events(count: int, rng: random.Random) -> List[EventStatus]:
+    events = []
+    for i in range(count):
+        month, day = rng.randint(1, 12), rng.randint(1, 28)
+        events.append(EventStatus(
+            name=f"{rng.choice(SPORTS)}-{rng.choice(KINDS)}{i % 50}",
+            location=f"場地{rng.randint(0, 99)}",
+            event_date=f"活動日期：2025/{month:02d}/{day:02d} (六) 09:00",
+            registration_start="報名開始：2025/01/13 10:00",
+            registration_end="報名截止：2025/02/01 23:59",
+            status="開放報名",
+            last_checked="2025-01-01 00:00:00",
+            level=rng.choice(LEVELS),
+        ))
+    return events
+
+
+def make_rules(count: int, rng: random.Random) -> List[WatchRule]:
+    rules = []
+    for i in range(count):
+        kind = rng.random()
+        if kind < 0.5:
+            name, name_match = f"{rng.choice(SPORTS)}-{rng.choice(KINDS)}{rng.randint(0, 49)}", "exact"
+        elif kind < 0.7:
+            name, name_match = f"{rng.choice(SPORTS)}-{rng.choice(KINDS)}", "prefix"
+        elif kind < 0.9:
+            name, name_match = rng.choice(KINDS), "contains"
+        else:
+            name, name_match = None, "exact"
+        date_from = date_to = None
+        if rng.random() < 0.5:
+            start = rng.randint(1, 12)
+            date_from = f"2025/{start:02d}/01"
+            date_to = f"2025/{min(12, start + rng.randint(0, 2)):02d}/28"
+        rules.append(WatchRule(
+            id=str(i),
+            name=name,
+            name_match=name_match,
+            location=f"場地{rng.randint(0, 99)}" if rng.random() < 0.6 else None,
+            date_from=date_from,
+            date_to=date_to,
+            level=rng.choice(LEVELS) if rng.random() < 0.3 else None,
+        ))
+    return rules
+
+
+def rule_matches(rule: WatchRule, event: EventStatus) -> bool:
+    """逐條比對，作為正確性與速度的基準"""
+    if rule.name:
+        if rule.name_match == "exact" and event.name != rule.name:
+            return False
+        if rule.name_match == "prefix" and not event.name.startswith(rule.name):
+            return False
+        if rule.name_match == "contains" and rule.name not in event.name:
+            return False
+    if rule.location and event.location != rule.location:
+        return False
+    if rule.level and event.level != rule.level:
+        return False
+    if rule.date_from or rule.date_to:
+        date = activity_date(event)
+        if date is None:
+            return False
+        if rule.date_from and date < rule.date_from:
+            return False
+        if rule.date_to and date > rule.date_to:
+            return False
+    return True
+
+
+def bench(events: List[EventStatus], rules: List[WatchRule]) -> dict:
+    start = time.perf_counter()
+    compiled = CompiledRules(rules)
+    compile_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed = [compiled.match(event) for event in events]
+    indexed_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    naive = [[i for i, rule in enumerate(rules) if rule_matches(rule, event)] for event in events]
+    naive_time = time.perf_counter() - start
+
+    if indexed != naive:
+        raise AssertionError("規則引擎與逐條比對的結果不同")
+    return {
+        "rules": len(rules),
+        "cards": len(events),
+        "matches": sum(len(m) for m in indexed),
+        "compile_ms": round(compile_time * 1000, 2),
+        "indexed_ms": round(indexed_time * 1000, 2),
+        "naive_ms": round(naive_time * 1000, 2),
+        "speedup": round(naive_time / indexed_time, 1) if indexed_time else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cards", type=int, default=500)
+    parser.add_argument("--rules", default="10,100,1000,5000")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出結果")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    events = make_events(args.cards, rng)
+    results = [bench(events, make_rules(int(count), rng)) for count in args.rules.split(",")]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'rules':>7} {'cards':>7} {'matches':>9} {'compile ms':>11} {'indexed ms':>11} {'naive ms':>10} {'speedup':>8}")
+    for r in results:
+        print(f"{r['rules']:>7} {r['cards']:>7} {r['matches']:>9} {r['compile_ms']:>11} {r['indexed_ms']:>11} {r['naive_ms']:>10} {r['speedup']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""以本機測試站對登入、掃描與通知流程做壓力測試
+
+    python benchmarks/load_test.py [--cards 500] [--scans 200] [--logins 10] [--fetch-requests 500] [--latency 0.02]
+    python benchmarks/load_test.py --base-url http://127.0.0.1:8765 --output load.json
+
+未指定 --base-url 時在背景執行緒啟動 benchmarks/standin_site.py，並將 WMG_BASE_URL 與
+TELEGRAM_API_BASE 指向它，之後執行的都是實際程式碼：
+- login: 以 Chrome 池並行執行 services.login.login（需要 Chrome），量測每次表單登入耗時
+- scan: 連續呼叫服務的 snapshot_cache.refresh（scan_events → ChangeDetector → main 註冊的訂閱者），
+  每隔幾次翻轉課程狀態，開放的課程由 main.notify_changes 經 watch_engine 分派給 notifier，
+  以測試站收到訊息的時間計算翻轉到通知的延遲
+- fetch: 以 --concurrency 個並行請求呼叫 fetch_page_content
+
+各階段輸出吞吐量與 p50 / p95 / p99 延遲的 JSON。
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CAPTCHA_IMG_PATTERN = re.compile(r'<img[^>]+src="([^"]*images/check/[^"]+)"')
+
+
+def percentiles(timings: List[float]) -> Dict[str, Optional[float]]:
+    if not timings:
+        return {"count": 0, "p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    ordered = sorted(timings)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 2)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 2),
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_standin(args: argparse.Namespace, port: int):
+    """在背景執行緒啟動測試站"""
+    import uvicorn
+    from benchmarks.standin_site import SiteSettings, create_app
+
+    settings = SiteSettings(
+        cards=args.cards,
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        flip_ratio=args.flip_ratio,
+        telegram_429_ratio=args.telegram_429_ratio,
+    )
+    server = uvicorn.Server(uvicorn.Config(create_app(settings), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="standin", daemon=True).start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("測試站啟動逾時")
+        time.sleep(0.05)
+
+
+async def http_login(base_url: str) -> List[dict]:
+    """以 HTTP 走一次登入表單，回傳 cookie_manager 格式的 cookies"""
+    from services.captcha import answer_from_src
+
+    async with httpx.AsyncClient(base_url=base_url, follow_redirects=False, timeout=10) as client:
+        form = await client.get("/member_login.php")
+        match = CAPTCHA_IMG_PATTERN.search(form.text)
+        answer = answer_from_src(match.group(1) if match else None)
+        if not answer:
+            raise RuntimeError("登入頁沒有可辨識的驗證碼")
+        response = await client.post("/member_login.php", data={
+            "member_userid": "loadtest",
+            "member_password": "loadtest",
+            "check_num": answer,
+            "b1": "登入",
+        })
+        if not response.is_redirect:
+            raise RuntimeError("登入失敗: " + ("驗證碼錯誤" if "驗證碼錯誤" in response.text else response.text[:80]))
+        host = httpx.URL(base_url).host
+        return [{"name": name, "value": value, "domain": host, "path": "/"} for name, value in client.cookies.items()]
+
+
+def bench_login(args: argparse.Namespace) -> dict:
+    """以 Chrome 池並行執行實際的 services.login.login
+
+    每次登入前清除該帳號的 cookies，走完整的表單登入（載入登入頁、辨識驗證碼、送出、確認），
+    同時執行的登入數為 Chrome 池大小。
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from services.driver_pool import driver_pool
+    from services.login import login
+    from utils.cookie_manager import CookieManager
+
+    timings: List[float] = []
+    errors: List[str] = []
+    lock = threading.Lock()
+
+    def one(manager: CookieManager):
+        manager.clear_cookies()
+        start = time.perf_counter()
+        try:
+            with driver_pool.borrow() as pooled:
+                status = login(pooled.driver, manager)
+                pooled.logged_in = status.success
+        except Exception as e:
+            with lock:
+                errors.append(f"{type(e).__name__}: {e}")
+            return
+        with lock:
+            if status.success:
+                timings.append(time.perf_counter() - start)
+            else:
+                errors.append(status.message)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        managers = [CookieManager(f"loadtest-{i}", Path(tmp)) for i in range(args.logins)]
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=driver_pool.size, thread_name_prefix="login") as executor:
+                list(executor.map(one, managers))
+        finally:
+            driver_pool.close()
+        elapsed = time.perf_counter() - start
+    return {
+        "phase": "login",
+        "concurrency": driver_pool.size,
+        "failures": len(errors),
+        "first_error": errors[0] if errors else None,
+        "per_s": round(len(timings) / elapsed, 2),
+        **percentiles(timings),
+    }
+
+
+async def bench_scan(base_url: str, args: argparse.Namespace) -> dict:
+    """以服務本身的快照與訂閱者執行掃描：scan_events → ChangeDetector → main.notify_changes 等訂閱者"""
+    import main  # noqa: F401  註冊 main 中的快照訂閱者
+    from services.coordination import coordinator
+    from services.history import history_store
+    from services.notifier import notifier
+    from services.snapshot import snapshot_cache as cache
+
+    # notify_changes 與 record_history 只在 leader 執行
+    if not coordinator.lock.try_acquire():
+        raise RuntimeError("無法取得 leader 鎖")
+    history_store.start()
+    await notifier.start()
+
+    timings: List[float] = []
+    flips: List[float] = []
+    changes = failures = 0
+    try:
+        async with httpx.AsyncClient(base_url=base_url) as control:
+            await cache.refresh()  # 首次掃描建立基準，不計入
+            start = time.perf_counter()
+            for i in range(args.scans):
+                if i % args.flip_every == 0:
+                    flips.append(time.time())
+                    await control.post("/_control/flip")
+                scan_start = time.perf_counter()
+                snapshot = await cache.refresh()
+                timings.append(time.perf_counter() - scan_start)
+                if snapshot is None:
+                    failures += 1
+                else:
+                    changes += len(snapshot.changes)
+            elapsed = time.perf_counter() - start
+            await notifier.close()
+            messages = (await control.get("/_telegram", params={"since": flips[0] if flips else 0})).json()
+    finally:
+        history_store.close()
+        coordinator.stop()
+
+    # 每次翻轉後第一則到達測試站的通知即為該次翻轉的端到端延遲
+    received = sorted(message["received_at"] for message in messages)
+    notify_latency = []
+    for flipped_at, next_flip in zip(flips, flips[1:] + [float("inf")]):
+        first = next((t for t in received if flipped_at <= t < next_flip), None)
+        if first is not None:
+            notify_latency.append(first - flipped_at)
+
+    return {
+        "phase": "scan",
+        "cards": args.cards,
+        "failures": failures,
+        "changes": changes,
+        "per_s": round(args.scans / elapsed, 1),
+        **percentiles(timings),
+        "notifications": len(messages),
+        "flip_to_notify": percentiles(notify_latency),
+    }
+
+
+async def bench_fetch(args: argparse.Namespace) -> dict:
+    from services.event import fetch_page_content
+
+    timings: List[float] = []
+    failures = 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one():
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            html_content = await fetch_page_content()
+            if html_content:
+                timings.append(time.perf_counter() - start)
+            else:
+                failures += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(args.fetch_requests)))
+    elapsed = time.perf_counter() - start
+    return {
+        "phase": "fetch",
+        "concurrency": args.concurrency,
+        "failures": failures,
+        "per_s": round(len(timings) / elapsed, 1),
+        **percentiles(timings),
+    }
+
+
+async def run(base_url: str, args: argparse.Namespace, cookie_dir: Path) -> List[dict]:
+    from services.http_fetcher import http_fetcher
+    from utils.cookie_manager import CookieManager
+
+    results = []
+    phases = args.only.split(",")
+
+    # 掃描與抓取使用一次 HTTP 登入取得的 cookies，不動到實際帳號的 cookie 檔
+    manager = CookieManager("loadtest", cookie_dir)
+    manager.set_cookies(await http_login(base_url))
+    http_fetcher.cookie_manager = manager
+
+    if "scan" in phases:
+        results.append(await bench_scan(base_url, args))
+    if "fetch" in phases:
+        results.append(await bench_fetch(args))
+    await http_fetcher.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="已啟動的測試站網址，未指定時自動啟動")
+    parser.add_argument("--only", default="login,scan,fetch", help="逗號分隔的階段")
+    parser.add_argument("--cards", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.0, help="測試站每個請求的延遲秒數")
+    parser.add_argument("--latency-jitter", type=float, default=0.0)
+    parser.add_argument("--flip-ratio", type=float, default=0.02)
+    parser.add_argument("--flip-every", type=int, default=5, help="每幾次掃描翻轉一次課程狀態")
+    parser.add_argument("--telegram-429-ratio", type=float, default=0.0)
+    parser.add_argument("--logins", type=int, default=10, help="以 Chrome 執行的登入次數")
+    parser.add_argument("--scans", type=int, default=100)
+    parser.add_argument("--fetch-requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--output", type=Path, help="結果 JSON 的保存位置，未指定時輸出到 stdout")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        port = None if args.base_url else free_port()
+        base_url = args.base_url or f"http://127.0.0.1:{port}"
+        # config 在匯入時讀取環境變數，需在匯入測試站與 services 之前設定
+        os.environ["WMG_BASE_URL"] = base_url
+        os.environ["TELEGRAM_API_BASE"] = base_url
+        os.environ["HISTORY_DB_PATH"] = str(Path(tmp) / "history.db")
+        os.environ["LEADER_LOCK_PATH"] = str(Path(tmp) / "leader.lock")
+        os.environ["SHARED_SNAPSHOT_PATH"] = str(Path(tmp) / "snapshot.json")
+        # 登入與通知使用測試站接受的帳號與 bot，不使用 .env 中的實際設定
+        os.environ["WMG_USERNAME"] = os.environ["WMG_PASSWORD"] = "loadtest"
+        os.environ["TELEGRAM_BOT_TOKEN"] = os.environ["TELEGRAM_CHAT_ID"] = "loadtest"
+        os.environ.setdefault("TELEGRAM_CHAT_INTERVAL", "0")
+        if port is not None:
+            start_standin(args, port)
+
+        results = asyncio.run(run(base_url, args, Path(tmp)))
+        # 登入使用 Chrome 池，最後執行並關閉池
+        if "login" in args.only.split(","):
+            results.append(bench_login(args))
+
+    report = {"base_url": base_url, "results": results}
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        args.output.write_text(text, encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""解析、搜尋與完整掃描流程的效能基準
+
+    python benchmarks/run_suite.py [--sizes 10,100,1000,10000,100000] [--output results.json]
+    python benchmarks/run_suite.py --sizes 1000 --compare old.json
+
+以 benchmarks/synthetic.py 產生的列表頁（首次執行時錄製到 benchmarks/fixtures/）量測：
+- parse: 卡片解析吞吐量與 tracemalloc 記憶體峰值：改版前的整頁解析（baseline），以及各個已安裝解析器的
+  逐張卡片解析（掃描實際使用）與整頁解析，另列出相對 baseline 的倍數
+- detect: ChangeDetector 首次解析、頁面未變與少量卡片變化時的耗時
+- search: EventStore 各種查詢的延遲
+- scan: 以 HTTP 回放列表頁，經 scan_events、SnapshotCache 與訂閱者（索引、規則比對、歷史紀錄）的完整掃描耗時
+
+結果以 JSON 輸出，--compare 會列出與先前結果的比值。
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import httpx
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import load_fixture, mutate_listing
+from services import event as event_service
+from services.changes import ChangeDetector, split_cards
+from services.event_store import EventStore
+from services.history import HistoryStore
+from services.parser import parse_cards, resolve_backend
+from services.snapshot import SnapshotCache
+from services.watch_rules import watch_engine
+
+
+def repeat(func: Callable, min_time: float = 0.2, max_runs: int = 50) -> List[float]:
+    """重複執行到累計 min_time 秒或 max_runs 次，回傳每次的秒數"""
+    timings = []
+    total = 0.0
+    while total < min_time and len(timings) < max_runs:
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        timings.append(elapsed)
+        total += elapsed
+    return timings
+
+
+def summarize(timings: List[float]) -> Dict[str, float]:
+    ordered = sorted(timings)
+    return {
+        "runs": len(ordered),
+        "median_ms": round(statistics.median(ordered) * 1000, 3),
+        "min_ms": round(ordered[0] * 1000, 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+    }
+
+
+def _measure_parse(parse: Callable[[], int], html_bytes: int) -> dict:
+    """重複解析並另外以 tracemalloc 跑一次取得記憶體峰值"""
+    parsed = []
+    stats = summarize(repeat(lambda: parsed.append(parse())))
+
+    tracemalloc.start()
+    parse()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    seconds = stats["median_ms"] / 1000
+    return {
+        "parsed": parsed[0],
+        **stats,
+        "cards_per_s": round(parsed[0] / seconds) if seconds else None,
+        "mb_per_s": round(html_bytes / 1e6 / seconds, 2) if seconds else None,
+        "peak_mb": round(peak / 1e6, 2),
+    }
+
+
+def baseline_parse(html_content: str) -> int:
+    """改版前 parse_event 的做法：以 html.parser 建立整頁的樹，再逐張卡片以 find 取欄位"""
+    count = 0
+    for card in BeautifulSoup(html_content, "html.parser").find_all('div', class_='activity-card'):
+        try:
+            card.find('h2').text.strip()
+            card.find('h3').find('span').text.strip()
+            h4s = card.find_all('h4')
+            h4s[0].text.strip(), h4s[1].text.strip(), h4s[2].text.strip()
+            card.find('b', class_='stateFull')
+        except (AttributeError, IndexError):
+            continue
+        count += 1
+    return count
+
+
+def available_backends() -> List[str]:
+    return [backend for backend in ("lxml", "html.parser") if backend == "html.parser" or importlib.util.find_spec(backend)]
+
+
+def bench_parse(html_content: str, cards: int, args: argparse.Namespace) -> List[dict]:
+    """改版前的整頁解析（baseline）與目前的逐張卡片、整頁解析，後兩者分別以各個已安裝的解析器量測"""
+    html_bytes = len(html_content.encode("utf-8"))
+    common = {"benchmark": "parse", "cards": cards, "html_mb": round(html_bytes / 1e6, 2)}
+    fragments = split_cards(html_content)
+    whole_page = cards <= args.page_limit
+    results = []
+    if whole_page:
+        results.append({**common, "variant": "baseline", **_measure_parse(lambda: baseline_parse(html_content), html_bytes)})
+    for backend in available_backends():
+        results.append({
+            **common,
+            "variant": f"fragments/{backend}",
+            **_measure_parse(lambda: sum(1 for f in fragments for _ in parse_cards(f, backend)), html_bytes),
+        })
+        if not whole_page:
+            # html.parser 建樹時對未關閉的 <img> 等空元素是 O(n²)，大頁面整頁解析要數十分鐘
+            results.append({**common, "variant": f"page/{backend}", "skipped": f"超過 --page-limit {args.page_limit}"})
+            continue
+        results.append({
+            **common,
+            "variant": f"page/{backend}",
+            **_measure_parse(lambda: sum(1 for _ in parse_cards(html_content, backend)), html_bytes),
+        })
+
+    baseline = next((r for r in results if r["variant"] == "baseline"), None)
+    if baseline:
+        for result in results:
+            if result is not baseline and "median_ms" in result:
+                result["speedup_vs_baseline"] = round(baseline["median_ms"] / result["median_ms"], 2)
+                print(f"  parse {cards} 張 {result['variant']:<22} {result['median_ms']:>10.1f} ms，"
+                      f"為 baseline 的 {result['speedup_vs_baseline']:.2f} 倍速", file=sys.stderr)
+    return results
+
+
+def bench_detect(html_content: str, cards: int, args: argparse.Namespace) -> List[dict]:
+    changed = mutate_listing(html_content, 0.01)
+    results = []
+
+    def cold():
+        ChangeDetector().update(html_content)
+
+    detector = ChangeDetector()
+    detector.update(html_content)
+
+    def unchanged():
+        detector.update(html_content)
+
+    def incremental():
+        # 在兩個版本之間切換，每次都有約 1% 的卡片變動
+        incremental.flip = not incremental.flip
+        detector.update(changed if incremental.flip else html_content)
+    incremental.flip = False
+
+    for variant, func in (("cold", cold), ("unchanged", unchanged), ("incremental", incremental)):
+        results.append({"benchmark": "detect", "variant": variant, "cards": cards, **summarize(repeat(func))})
+    return results
+
+
+def bench_search(html_content: str, cards: int, args: argparse.Namespace) -> List[dict]:
+    events = ChangeDetector().update(html_content).events
+    store = EventStore()
+    store.replace(events)
+    sample = events[len(events) // 2]
+    name_prefix = sample.name.split("-")[0]
+    queries = {
+        "name_exact": dict(name=sample.name),
+        "name_prefix": dict(name=name_prefix, name_match="prefix"),
+        "name_contains": dict(name="進階", name_match="contains"),
+        "date_range": dict(date_from="2025/03/01", date_to="2025/04/30"),
+        "location_status": dict(location=sample.location, status="開放報名"),
+    }
+    results = [{
+        "benchmark": "search",
+        "variant": "replace",
+        "cards": cards,
+        **summarize(repeat(lambda: store.replace(events))),
+    }]
+    for variant, kwargs in queries.items():
+        matched = len(store.query(**kwargs))
+        stats = summarize(repeat(lambda: store.query(**kwargs), max_runs=1000))
+        results.append({"benchmark": "search", "variant": variant, "cards": cards, "matched": matched, **stats})
+    return results
+
+
+async def _bench_scan(html_content: str, cards: int) -> List[dict]:
+    changed = mutate_listing(html_content, 0.01)
+    pages = {"current": html_content}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, text=pages["current"])
+
+    # 以 MockTransport 回放錄製的頁面，其餘流程與排程掃描相同
+    event_service.http_fetcher._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    event_service.change_detector = ChangeDetector()
+    store = EventStore()
+    with tempfile.TemporaryDirectory() as tmp:
+        history = HistoryStore(Path(tmp) / "history.db")
+        history.start()
+        cache = SnapshotCache(event_service.scan_events)
+
+        async def index_events(snapshot):
+            store.replace(snapshot.events)
+
+        async def record_history(snapshot):
+            history.record_scan(snapshot.events, snapshot.changes, snapshot.taken_at)
+
+        async def route_openings(snapshot):
+            watch_engine.route([change.event for change in snapshot.changes], ["bench"])
+
+        for callback in (index_events, record_history, route_openings):
+            cache.subscribe(callback)
+
+        results = []
+        for variant, page in (("cold", html_content), ("unchanged", html_content), ("incremental", changed)):
+            pages["current"] = page
+            start = time.perf_counter()
+            snapshot = await cache.refresh()
+            elapsed = time.perf_counter() - start
+            results.append({
+                "benchmark": "scan",
+                "variant": variant,
+                "cards": cards,
+                "events": len(snapshot.events) if snapshot else None,
+                "changes": len(snapshot.changes) if snapshot else None,
+                "ms": round(elapsed * 1000, 3),
+            })
+        history.close()
+    await event_service.http_fetcher.close()
+    return results
+
+
+def bench_scan(html_content: str, cards: int, args: argparse.Namespace) -> List[dict]:
+    return asyncio.run(_bench_scan(html_content, cards))
+
+
+def metadata() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parser_backend": resolve_backend(),
+    }
+
+
+def result_key(result: dict) -> str:
+    return f"{result['benchmark']}/{result.get('variant', '-')}/{result['cards']}"
+
+
+def compare(results: List[dict], baseline_path: Path):
+    """列出與先前結果的比值，小於 1 代表變快"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {result_key(r): r for r in json.load(f)["results"]}
+    print(f"{'benchmark':<40} {'baseline':>12} {'current':>12} {'ratio':>7}", file=sys.stderr)
+    for result in results:
+        old = baseline.get(result_key(result))
+        metric = "median_ms" if "median_ms" in result else "ms"
+        if not old or not old.get(metric) or metric not in result:
+            continue
+        ratio = result[metric] / old[metric]
+        print(f"{result_key(result):<40} {old[metric]:>12} {result[metric]:>12} {ratio:>7.2f}", file=sys.stderr)
+
+
+BENCHMARKS = {
+    "parse": bench_parse,
+    "detect": bench_detect,
+    "search": bench_search,
+    "scan": bench_scan,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,100,1000,10000,100000", help="逗號分隔的卡片數")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help="逗號分隔的項目")
+    parser.add_argument("--page-limit", type=int, default=20000, help="整頁解析的卡片數上限")
+    parser.add_argument("--output", type=Path, help="結果 JSON 的保存位置，未指定時輸出到 stdout")
+    parser.add_argument("--compare", type=Path, help="與先前的結果 JSON 比較")
+    args = parser.parse_args()
+    # 測試頁面刻意包含少量缺欄位的卡片，不輸出解析失敗的日誌
+    logging.disable(logging.ERROR)
+
+    results: List[dict] = []
+    for cards in (int(size) for size in args.sizes.split(",")):
+        html_content = load_fixture(cards)
+        for name in args.only.split(","):
+            print(f"{name} {cards} 張卡片...", file=sys.stderr)
+            outcome = BENCHMARKS[name](html_content, cards, args)
+            results.extend(outcome)
+
+    report = {"meta": metadata(), "results": results}
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        args.output.write_text(text, encoding="utf-8")
+    else:
+        print(text)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""模擬 wmg2025warmup.org.tw 與 Telegram Bot API 的本機測試站
+
+    python benchmarks/standin_site.py [--port 8765] [--cards 200] [--latency 0.05] [--flip-interval 10]
+    WMG_BASE_URL=http://127.0.0.1:8765 TELEGRAM_API_BASE=http://127.0.0.1:8765 uvicorn main:app
+
+- /member_login.php: 登入表單（member_userid、member_password、check_num、b1 與驗證碼圖片），
+  已登入時跳出「已登入」，驗證碼錯誤時跳出「驗證碼錯誤」，登入成功設定 PHPSESSID 並導向列表頁
+- /images/check/{n}.jpg: 驗證碼圖片，有下載的圖片時直接使用，否則以答案文字產生
+- /index.php: 活動列表，未登入時導向登入頁，課程狀態每 flip_interval 秒隨機翻轉一部分
+- /bot{token}/sendMessage: Telegram 替身，可設定回應 429 的比例
+- /_control: 執行中調整延遲、卡片數與翻轉設定；/_control/flip 立即翻轉；/_stats 請求統計；/_telegram 收到的通知
+"""
+import argparse
+import asyncio
+import io
+import os
+import random
+import secrets
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response
+from PIL import Image, ImageDraw
+from pydantic import BaseModel
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import render_card, render_listing
+from services.captcha import CAPTCHA_ANSWERS
+from config import CAPTCHA_IMAGE_DIR
+
+SESSION_COOKIE = "PHPSESSID"
+
+LOGIN_FORM = """<!DOCTYPE html>
+<html lang="zh-Hant"><head><meta charset="utf-8"><title>會員登入</title></head>
+<body><form method="post" action="member_login.php">
+<input type="text" name="member_userid">
+<input type="password" name="member_password">
+<img src="images/check/{number}.jpg" alt="驗證碼">
+<input type="text" name="check_num">
+<input type="submit" name="b1" value="登入">
+</form></body></html>
+"""
+ALERT_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"></head>
+<body><script>alert("{message}");location.href="{target}";</script></body></html>
+"""
+
+
+class SiteSettings(BaseModel):
+    latency: float = 0.0  # 每個請求的平均延遲秒數
+    latency_jitter: float = 0.0  # 延遲的隨機浮動比例
+    cards: int = 200
+    full_ratio: float = 0.5
+    flip_ratio: float = 0.02  # 每次翻轉的課程比例
+    flip_interval: float = 0.0  # 自動翻轉的間隔秒數，0 為不自動翻轉
+    require_login: bool = True
+    telegram_429_ratio: float = 0.0
+    seed: int = 1
+
+
+class StandinSite:
+    """測試站的狀態：課程、登入中的 session 與請求統計"""
+
+    def __init__(self, settings: SiteSettings):
+        self.settings = settings
+        self.sessions: Dict[str, Optional[str]] = {}  # session -> 待驗證的驗證碼答案，None 為已登入
+        self.stats: Counter = Counter()
+        self.telegram_messages: List[dict] = []
+        self.rebuild()
+
+    def rebuild(self):
+        """依設定重新產生課程，每張卡片預先產生開放與額滿兩種版本"""
+        s = self.settings
+        rng = random.Random(s.seed)
+        self.full = [rng.random() < s.full_ratio for _ in range(s.cards)]
+        self.variants = [
+            (render_card(i, random.Random(s.seed * 1_000_003 + i), False),
+             render_card(i, random.Random(s.seed * 1_000_003 + i), True))
+            for i in range(s.cards)
+        ]
+        self.last_flip = time.monotonic()
+        self._page: Optional[str] = None
+
+    def flip(self):
+        rng = random.Random()
+        flips = max(1, int(len(self.full) * self.settings.flip_ratio)) if self.full else 0
+        for i in rng.sample(range(len(self.full)), flips):
+            self.full[i] = not self.full[i]
+        self.last_flip = time.monotonic()
+        self._page = None
+        self.stats["flips"] += 1
+
+    def listing(self) -> str:
+        interval = self.settings.flip_interval
+        if interval and time.monotonic() - self.last_flip >= interval:
+            self.flip()
+        if self._page is None:
+            self._page = render_listing([variant[full] for variant, full in zip(self.variants, self.full)])
+        return self._page
+
+    async def delay(self):
+        s = self.settings
+        if s.latency > 0:
+            await asyncio.sleep(s.latency * (1 + random.uniform(-s.latency_jitter, s.latency_jitter)))
+
+    def logged_in(self, request: Request) -> bool:
+        session = request.cookies.get(SESSION_COOKIE)
+        return session in self.sessions and self.sessions[session] is None
+
+
+def captcha_image(number: int) -> bytes:
+    """有下載的驗證碼圖片時直接使用，否則以答案文字產生圖片"""
+    path = CAPTCHA_IMAGE_DIR / f"{number}.jpg"
+    if path.exists():
+        return path.read_bytes()
+    image = Image.new("RGB", (96, 32), "white")
+    ImageDraw.Draw(image).text((8, 10), CAPTCHA_ANSWERS.get(number, "????"), fill="black")
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def create_app(settings: Optional[SiteSettings] = None) -> FastAPI:
+    site = StandinSite(settings or SiteSettings())
+    app = FastAPI(title="WMG 測試站")
+    app.state.site = site
+    images: Dict[int, bytes] = {}
+
+    @app.middleware("http")
+    async def count_requests(request: Request, call_next):
+        site.stats[request.url.path] += 1
+        await site.delay()
+        return await call_next(request)
+
+    @app.get("/member_login.php", response_class=HTMLResponse)
+    async def login_page(request: Request):
+        if site.logged_in(request):
+            return ALERT_PAGE.format(message="您已登入", target="index.php")
+        session = request.cookies.get(SESSION_COOKIE) or secrets.token_hex(16)
+        number = random.choice(list(CAPTCHA_ANSWERS))
+        site.sessions[session] = CAPTCHA_ANSWERS[number]
+        response = HTMLResponse(LOGIN_FORM.format(number=number))
+        response.set_cookie(SESSION_COOKIE, session)
+        return response
+
+    @app.post("/member_login.php")
+    async def submit_login(request: Request):
+        # 自行解析表單，不需要額外安裝 python-multipart
+        form = {key: values[0] for key, values in parse_qs((await request.body()).decode("utf-8")).items()}
+        member_userid, member_password = form.get("member_userid"), form.get("member_password")
+        check_num = form.get("check_num", "")
+        session = request.cookies.get(SESSION_COOKIE)
+        expected = site.sessions.get(session) if session else None
+        if expected is None or check_num.strip().lower() != expected.lower():
+            site.stats["captcha_errors"] += 1
+            return HTMLResponse(ALERT_PAGE.format(message="驗證碼錯誤", target="member_login.php"))
+        if not member_userid or not member_password:
+            return HTMLResponse(ALERT_PAGE.format(message="帳號或密碼錯誤", target="member_login.php"))
+        site.sessions[session] = None
+        site.stats["logins"] += 1
+        return RedirectResponse("index.php", status_code=303)
+
+    @app.get("/images/check/{number}.jpg")
+    async def captcha(number: int):
+        if number not in images:
+            images[number] = captcha_image(number)
+        return Response(images[number], media_type="image/jpeg")
+
+    @app.get("/index.php")
+    async def listing(request: Request):
+        if site.settings.require_login and not site.logged_in(request):
+            return RedirectResponse("member_login.php", status_code=302)
+        return HTMLResponse(site.listing())
+
+    @app.get("/")
+    async def root():
+        return RedirectResponse("index.php", status_code=302)
+
+    @app.post("/bot{token}/sendMessage")
+    async def send_message(token: str, request: Request):
+        if random.random() < site.settings.telegram_429_ratio:
+            site.stats["telegram_429"] += 1
+            return JSONResponse(
+                {"ok": False, "error_code": 429, "parameters": {"retry_after": 1}}, status_code=429
+            )
+        payload = await request.json()
+        site.telegram_messages.append({"received_at": time.time(), "chat_id": payload.get("chat_id")})
+        return {"ok": True, "result": {"message_id": len(site.telegram_messages)}}
+
+    @app.get("/_stats")
+    async def stats():
+        return {
+            "requests": dict(site.stats),
+            "telegram_messages": len(site.telegram_messages),
+            "cards": len(site.full),
+            "open": site.full.count(False),
+        }
+
+    @app.get("/_telegram")
+    async def telegram_messages(since: float = 0.0):
+        """收到的 Telegram 訊息（接收時間與聊天室），壓力測試以此計算通知延遲"""
+        return [message for message in site.telegram_messages if message["received_at"] >= since]
+
+    @app.post("/_control")
+    async def control(settings: SiteSettings):
+        rebuild = (settings.cards, settings.seed, settings.full_ratio) != (
+            site.settings.cards, site.settings.seed, site.settings.full_ratio
+        )
+        site.settings = settings
+        if rebuild:
+            site.rebuild()
+        return site.settings
+
+    @app.post("/_control/flip")
+    async def flip():
+        site.flip()
+        return {"open": site.full.count(False)}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    for name, field in SiteSettings.model_fields.items():
+        option = f"--{name.replace('_', '-')}"
+        if field.annotation is bool:
+            parser.add_argument(option, type=lambda v: v.lower() == "true", default=field.default)
+        else:
+            parser.add_argument(option, type=field.annotation, default=field.default)
+    args = parser.parse_args()
+    settings = SiteSettings(**{name: getattr(args, name) for name in SiteSettings.model_fields})
+    uvicorn.run(create_app(settings), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
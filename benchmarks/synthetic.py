@@ -0,0 +1,92 @@
+"""產生結構與實際活動列表頁相同的測試頁面
+
+每張卡片為 div.activity-card，內含 h2 課程名稱、h3 > span 地點、三個 h4（活動日期、報名開始、報名截止），
+額滿的課程多一個 b.stateFull。頁首、導覽列與頁尾也有 h2 / h4，用來確認解析器只看卡片內容。
+"""
+import gzip
+import random
+from pathlib import Path
+from typing import List, Optional
+
+SPORTS = ["射箭", "游泳", "田徑", "桌球", "羽球", "籃球", "柔道", "舉重", "自由車", "網球", "划船", "擊劍"]
+KINDS = ["反曲弓進階", "複合弓基礎", "自由式", "短跑", "長跑", "單打", "雙打", "基礎", "進階", "體驗營"]
+VENUES = ["新北市輔大射箭場", "臺北市立大學天母校區", "臺北體育館", "新莊體育館", "板橋第一運動場", "新店國小"]
+WEEKDAYS = "一二三四五六日"
+
+FIXTURE_DIR = Path(__file__).resolve().parent / "fixtures"
+
+PAGE_HEAD = """<!DOCTYPE html>
+<html lang="zh-Hant"><head><meta charset="utf-8"><title>2025雙北世壯運暖身課程</title>
+<link rel="stylesheet" href="css/bootstrap.min.css"><script src="js/jquery.min.js"></script></head>
+<body><header><nav class="navbar"><h2>選單</h2><ul><li><a href="index.php">首頁</a></li>
+<li><a href="member_login.php">會員登入</a></li></ul></nav><h4>2025雙北世壯運暖身課程報名系統</h4></header>
+<section id="event"><div class="container"><div class="row">
+"""
+PAGE_TAIL = """</div></div></section>
+<footer><h4>主辦單位：臺北市政府體育局、新北市政府體育處</h4><p>客服專線：(02) 0000-0000</p></footer>
+</body></html>
+"""
+
+
+def render_card(i: int, rng: random.Random, full: bool, malformed: bool = False) -> str:
+    """產生一張活動卡片，full 為額滿，malformed 時缺少報名時間"""
+    month, day = rng.randint(1, 12), rng.randint(1, 28)
+    reg_day = rng.randint(1, 28)
+    name = f"{rng.choice(SPORTS)}-{rng.choice(KINDS)}{i // 50 or ''}"
+    state = '<b class="state stateFull">已額滿</b>' if full else '<b class="state">報名</b>'
+    dates = (
+        ""
+        if malformed
+        else f"<h4>報名開始：2025/01/{reg_day:02d} 10:00</h4>\n<h4>報名截止：2025/02/{reg_day:02d} 23:59</h4>"
+    )
+    return f"""<div class="col-md-4 col-sm-6 activity-card" data-id="{i}">
+<div class="card"><img class="card-img-top" src="upload/activity/{i % 97}.jpg" alt="">
+<div class="card-body">
+<h2 class="card-title"> {name} </h2>
+<h3>活動地點：<span> {rng.choice(VENUES)} </span></h3>
+<h4>活動日期：2025/{month:02d}/{day:02d}
+      ({WEEKDAYS[rng.randint(0, 6)]}) {rng.randint(8, 18):02d}:00</h4>
+{dates}
+<p class="card-text">名額 {rng.randint(10, 40)} 人，適合 {rng.randint(6, 60)} 歲以上</p>
+{state}
+<a class="btn btn-primary" href="activity.php?id={i}">查看詳情</a>
+</div></div></div>
+"""
+
+
+def render_listing(cards: List[str]) -> str:
+    return PAGE_HEAD + "".join(cards) + PAGE_TAIL
+
+
+def generate_listing(count: int, seed: int = 1, full_ratio: float = 0.5, malformed_ratio: float = 0.01) -> str:
+    """產生含 count 張卡片的列表頁，約 malformed_ratio 的卡片缺少報名時間"""
+    rng = random.Random(seed)
+    cards = [render_card(i, rng, rng.random() < full_ratio, rng.random() < malformed_ratio) for i in range(count)]
+    return render_listing(cards)
+
+
+def mutate_listing(html_content: str, ratio: float, seed: int = 2) -> str:
+    """將約 ratio 比例的額滿卡片改為開放報名，模擬兩次掃描之間的少量變化"""
+    rng = random.Random(seed)
+    parts: List[str] = html_content.split('<b class="state stateFull">已額滿</b>')
+    out = [parts[0]]
+    for part in parts[1:]:
+        out.append('<b class="state">報名</b>' if rng.random() < ratio else '<b class="state stateFull">已額滿</b>')
+        out.append(part)
+    return "".join(out)
+
+
+def load_fixture(count: int, seed: int = 1, fixture_dir: Optional[Path] = None) -> str:
+    """讀取錄製好的列表頁，不存在時產生並保存，之後每次執行都使用同一份內容"""
+    fixture_dir = fixture_dir or FIXTURE_DIR
+    path = fixture_dir / f"listing-{count}-{seed}.html.gz"
+    if path.exists():
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return f.read()
+    html_content = generate_listing(count, seed)
+    fixture_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        f.write(html_content)
+    tmp_path.replace(path)
+    return html_content
@@ -4,14 +4,17 @@ from pathlib import Path
 
 # 獲取項目根目錄
 BASE_DIR = Path(__file__).resolve().parent
+DATA_DIR = BASE_DIR / 'data'
 
 # 加載 .env 檔案
 load_dotenv(BASE_DIR / '.env')
 
 # 網站設定
-BASE_URL = "https://www.wmg2025warmup.org.tw"
+BASE_URL = os.getenv("WMG_BASE_URL", "https://www.wmg2025warmup.org.tw").rstrip("/")  # 壓力測試時可指向 benchmarks/standin_site.py
 LOGIN_URL = f"{BASE_URL}/member_login.php"
-TARGET_URL = f"{BASE_URL}/index.php?folder=&level=&activity_date=課程報名中#event"
+LISTING_URL = f"{BASE_URL}/index.php?folder={{folder}}&level={{level}}&activity_date={{activity_date}}#event"
+TARGET_URL = LISTING_URL.format(folder="", level="", activity_date="課程報名中")
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 
 # 從環境變數獲取敏感資訊
 class Settings:
@@ -32,6 +35,110 @@ class Settings:
             raise ValueError(f"缺少必要的環境變數: {', '.join(missing_vars)}")
 
 # 目標設定
-SCAN_INTERVAL = 300  # 5分鐘
-TARGET_EVENT = "射箭-反曲弓進階"
-TARGET_LOCATION = "新北市輔大射箭場"
\ No newline at end of file
+SCAN_INTERVAL = 300  # 5分鐘，附近沒有報名時段時的掃描間隔
+SCAN_INTERVAL_ACTIVE = 30  # 報名期間或即將開放時的掃描間隔
+SCAN_INTERVAL_BURST = 5  # 報名開放前後的密集掃描間隔
+SCAN_BURST_BEFORE = 120  # 開放前幾秒進入密集掃描
+SCAN_BURST_AFTER = 300  # 開放後幾秒內維持密集掃描
+SCAN_ACTIVE_LEAD = 60 * 60  # 開放前幾秒開始提高掃描頻率
+SCAN_JITTER = 0.1  # 掃描間隔隨機浮動比例
+
+# 瀏覽器池設定
+DRIVER_POOL_SIZE = int(os.getenv("DRIVER_POOL_SIZE", "2"))  # 同時存在的 Chrome 上限
+DRIVER_POOL_WARM = int(os.getenv("DRIVER_POOL_WARM", "1"))  # 啟動時預先開啟的數量
+DRIVER_MAX_USES = int(os.getenv("DRIVER_MAX_USES", "50"))  # 單一 Chrome 最多借出次數
+DRIVER_MAX_AGE = int(os.getenv("DRIVER_MAX_AGE", str(30 * 60)))  # 單一 Chrome 最長存活秒數
+DRIVER_CHECKOUT_TIMEOUT = 60  # 等待可用 Chrome 的秒數
+
+CHROMEDRIVER_PATH = os.getenv("CHROMEDRIVER_PATH")  # 指定時直接使用，不經 webdriver_manager 查詢版本
+CHROMEDRIVER_CACHE = DATA_DIR / 'chromedriver_path'  # 上次解析到的 chromedriver 路徑
+
+# 精簡瀏覽器設定：eager 載入策略，抓取列表頁時封鎖圖片、影音、字型與分析腳本（登入時解除，驗證碼需要圖片）
+BROWSER_LEAN = os.getenv("BROWSER_LEAN", "true").lower() == "true"
+BLOCKED_URL_PATTERNS = [
+    "*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.mp4", "*.webm", "*.mp3",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*connect.facebook.net*",
+]
+PAGE_READY_TIMEOUT = 20  # 等待活動卡片出現的秒數
+PAGE_SETTLE_SECONDS = 0.5  # 卡片數維持不變多久視為載入完成
+PAGE_POLL_INTERVAL = 0.1  # 檢查卡片數的間隔秒數
+
+# HTTP 抓取設定
+HTTP_FETCH_ENABLED = os.getenv("HTTP_FETCH_ENABLED", "true").lower() == "true"  # 關閉時一律使用瀏覽器
+HTTP_TIMEOUT = 10  # HTTP 請求逾時秒數
+HTTP_MAX_CONNECTIONS = 10  # 連線池上限
+
+# 掃描快照設定
+SNAPSHOT_TTL = int(os.getenv("SNAPSHOT_TTL", "60"))  # API 可直接使用快照的秒數
+
+# 掃描期限設定：每次掃描有總期限，各階段的期限不超過剩餘時間，逾時的階段會被取消並強制結束其 Chrome
+SCAN_DEADLINE = float(os.getenv("SCAN_DEADLINE", "45"))  # 一次掃描從抓取到解析完成的秒數上限
+HTTP_STAGE_TIMEOUT = 15  # HTTP 抓取階段的秒數上限
+BROWSER_STAGE_TIMEOUT = 40  # 瀏覽器抓取階段（借用 Chrome、載入、等待卡片）的秒數上限
+SCAN_MIN_GAP = 2  # 掃描超過間隔時，距離下一次掃描至少間隔的秒數
+
+# 瀏覽器工作執行緒設定
+BROWSER_WORKERS = DRIVER_POOL_SIZE  # 同時執行的瀏覽器工作數
+BROWSER_MAX_PENDING = int(os.getenv("BROWSER_MAX_PENDING", "4"))  # 排隊等待的工作上限，超過時回應 503
+
+# HTML 解析設定
+PARSER_BACKEND = os.getenv("PARSER_BACKEND", "auto")  # auto: 有安裝 lxml 時使用 lxml，否則使用 html.parser
+
+# 歷史紀錄設定
+HISTORY_DB_PATH = Path(os.getenv("HISTORY_DB_PATH", str(DATA_DIR / 'history.db')))
+HISTORY_BATCH_SIZE = 500  # 寫入執行緒每次交易最多處理的批次數
+HISTORY_PAGE_LIMIT = 500  # 歷史查詢每頁上限
+
+# Telegram 通知設定
+TELEGRAM_API_BASE = os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org")
+TELEGRAM_CHAT_INTERVAL = float(os.getenv("TELEGRAM_CHAT_INTERVAL", "1.0"))  # 同一聊天室兩則訊息的最短間隔秒數
+TELEGRAM_MAX_BACKOFF = 60  # 重試等待上限秒數
+TELEGRAM_MESSAGE_LIMIT = 4096  # 單則訊息長度上限
+TELEGRAM_DRAIN_TIMEOUT = 10  # 關閉時等待送出剩餘訊息的秒數
+
+# 驗證碼設定
+CAPTCHA_IMAGE_DIR = BASE_DIR / 'downloaded_captchas'  # scripts/download_captcha.py 下載的圖片
+CAPTCHA_INDEX_PATH = Path(os.getenv("CAPTCHA_INDEX_PATH", str(DATA_DIR / 'captcha_index.bin')))
+CAPTCHA_MIN_CONFIDENCE = 0.8  # 低於此信心分數時改用 OCR
+CAPTCHA_OCR_ENABLED = os.getenv("CAPTCHA_OCR_ENABLED", "false").lower() == "true"  # 需另外安裝 pytesseract 與 tesseract
+TESSERACT_CMD = os.getenv("TESSERACT_CMD")  # tesseract 不在 PATH 上時指定路徑，例如 /opt/homebrew/bin/tesseract
+
+# 登入設定
+LOGIN_MAX_RETRIES = 3  # 最大重試次數
+LOGIN_RETRY_DELAY = 1.0  # 重試基本間隔（秒），每次加倍並加上隨機浮動
+LOGIN_MAX_RETRY_DELAY = 10.0  # 重試間隔上限（秒）
+LOGIN_PAGE_TIMEOUT = 15  # 等待登入表單出現的秒數
+LOGIN_SUBMIT_TIMEOUT = 10  # 送出後等待彈窗或換頁的秒數
+LOGIN_VERIFY_TIMEOUT = 5  # 檢查登入狀態時等待的秒數
+
+# Cookie 設定
+COOKIE_DIR = DATA_DIR / 'cookies'  # 每個帳號一個 JSON 檔
+SESSION_PROBE_INTERVAL = 300  # 登入狀態探測結果的快取秒數
+SESSION_PROBE_TIMEOUT = 5  # 探測請求逾時秒數
+
+# 監控規則設定
+WATCH_RULES_PATH = DATA_DIR / 'watch_rules.json'  # 規則保存位置，沒有規則時所有開放課程都會通知
+
+# 多頁掃描設定，開啟後依 folder × level × activity_date 的組合抓取所有列表頁
+CRAWL_ENABLED = os.getenv("CRAWL_ENABLED", "false").lower() == "true"
+CRAWL_FOLDERS = os.getenv("CRAWL_FOLDERS", "").split(",")  # 逗號分隔，空字串代表不限
+CRAWL_LEVELS = os.getenv("CRAWL_LEVELS", "").split(",")  # 指定等級時該頁的課程會標記 level
+CRAWL_ACTIVITY_DATES = os.getenv("CRAWL_ACTIVITY_DATES", "課程報名中").split(",")
+CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", "4"))  # 同時抓取的列表頁上限
+
+# 追蹤與效能分析設定
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"  # 也可透過 /debug/tracing 於執行中切換
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "50"))  # 保留最近幾次掃描與 API 請求的時間軸
+PROFILE_DIR = DATA_DIR / 'profiles'  # 取樣分析結果的保存位置
+PROFILE_INTERVAL = 0.005  # 取樣間隔秒數
+
+# 多 worker 部署：取得 leader 鎖的行程負責掃描與通知，其他行程讀取共用快照
+LEADER_LOCK_PATH = Path(os.getenv("LEADER_LOCK_PATH", str(DATA_DIR / 'leader.lock')))
+SHARED_SNAPSHOT_PATH = Path(os.getenv("SHARED_SNAPSHOT_PATH", str(DATA_DIR / 'snapshot.json')))
+FOLLOWER_POLL_INTERVAL = float(os.getenv("FOLLOWER_POLL_INTERVAL", "1.0"))  # follower 檢查共用快照與嘗試接手的間隔秒數
+
+# 狀態串流設定（/events/stream、/events/ws）
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "32"))  # 每個連線最多累積的未送出訊息，超過即中斷該連線
+STREAM_HEARTBEAT = 15  # 沒有訊息時每隔幾秒送出保持連線訊號
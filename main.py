@@ -1,16 +1,29 @@
+import asyncio
 import logging
-import os
-from fastapi import FastAPI
+from datetime import datetime
+from fastapi import FastAPI, Request
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-import httpx
-import pytesseract
-from typing import Set
+from typing import Optional, Set
 
 from routes.api import router
-from services.browser import setup_driver
-from services.event import get_page_content, parse_event
-from utils.cookie_manager import CookieManager
-from config import Settings, TARGET_URL
+from services.driver_pool import driver_pool
+from services.executor import browser_executor, ExecutorBusyError
+from services.event_store import event_store
+from services.history import history_store
+from services.metrics import SCAN_SECONDS, SCANS, NEXT_SCAN_DELAY_SECONDS
+from services.tracing import tracer, span, KIND_REQUEST
+from services.changes import change_detector, event_key, CHANGE_REMOVED
+from services.parser import STATUS_OPEN
+from services.polling import plan_next_scan, PollingPlan, MODE_ACTIVE, TAIPEI
+from services.snapshot import snapshot_cache, Snapshot
+from services.http_fetcher import http_fetcher
+from services.notifier import notifier
+from services.watch_rules import watch_engine
+from services.stream import stream_hub
+from services.coordination import coordinator
+from services.supervisor import scan_supervisor, ScanTimeoutError
+from utils.cookie_manager import cookie_manager
+from config import DRIVER_POOL_WARM, SCAN_INTERVAL_ACTIVE
 
 # 設定日誌
 logging.basicConfig(
@@ -22,87 +35,179 @@ logger = logging.getLogger(__name__)
 # 關閉 hhtpx 的 INFO 日誌
 logging.getLogger("httpx").setLevel(logging.WARNING)
 
-# 設定 tesseract 路徑
-TESSERACT_CMD = '/opt/homebrew/bin/tesseract'
-if os.path.exists(TESSERACT_CMD):
-    pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
-    logger.info(f"Successfully set tesseract path to: {TESSERACT_CMD}")
-else:
-    logger.error(f"Tesseract not found at {TESSERACT_CMD}")
-    raise RuntimeError(f"Tesseract not found at {TESSERACT_CMD}. Please verify the installation.")
-
 app = FastAPI(title="世壯運訓練營課程監控系統")
 scheduler = AsyncIOScheduler()
 notified_events: Set[str] = set()
-cookie_manager = CookieManager()
-
-async def send_telegram_message(message: str):
-    """發送 Telegram 通知"""
-    url = f"https://api.telegram.org/bot{Settings.TELEGRAM_BOT_TOKEN}/sendMessage"
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(url, json={
-                "chat_id": Settings.TELEGRAM_CHAT_ID,
-                "text": message,
-                "parse_mode": "HTML"
-            })
-            response.raise_for_status()
-            logger.debug("Telegram 通知發送成功")
-        except Exception as e:
-            logger.error(f"Telegram 通知發送失敗: {str(e)}")
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """追蹤開啟時記錄每個 API 請求的時間軸"""
+    if not tracer.enabled:
+        return await call_next(request)
+    with tracer.trace(f"{request.method} {request.url.path}", KIND_REQUEST) as trace:
+        response = await call_next(request)
+        trace.attrs["status_code"] = response.status_code
+        return response
+
+async def notify_changes(snapshot: Snapshot):
+    """依本次掃描的狀態變化與監控規則發送開放報名通知，同一次掃描的開放課程合併成一則
+
+    多 worker 部署時只有 leader 發送，follower 讀到的是 leader 已處理過的變化。
+    """
+    if not coordinator.is_leader:
+        return
+    openings = []
+    for change in snapshot.changes:
+        event = change.event
+        key = event_key(event)
+        logger.info(f"課程狀態變化: {event.name} - {event.event_date} - {change.type} ({change.previous_status} → {event.status})")
+
+        # 額滿、下架或以非開放狀態出現（例如停機期間額滿，重啟後沒有共用快照而成為 new）時清除通知紀錄，
+        # 之後再次開放時會重新通知
+        if change.type == CHANGE_REMOVED or event.status != STATUS_OPEN:
+            if key in notified_events:
+                notified_events.discard(key)
+                history_store.clear_notified(key)
+            continue
+
+        if event.status == STATUS_OPEN and key not in notified_events:
+            openings.append(event)
+
+    # 只有符合監控規則的課程會通知並記錄，之後新增的規則仍可收到已開放課程的下一次變化
+    routed = watch_engine.route(openings, notifier.chat_ids)
+    sent = set()
+    for chat_id, events in routed.items():
+        notifier.notify_openings(events, [chat_id])
+        sent.update(event_key(event) for event in events)
+    for event in openings:
+        key = event_key(event)
+        if key in sent:
+            notified_events.add(key)
+            history_store.mark_notified(key, event.name)
+            logger.debug(f"發送通知: {event.name} 開放報名")
 
 async def check_event():
-    """檢查課程狀態並發送通知"""
+    """檢查課程狀態，通知由 notify_changes 依狀態變化發送"""
     logger.info("開始檢查課程狀態")
-    driver = None
     try:
-        driver = setup_driver()
-        html_content = get_page_content(driver)
+        with span("refresh_snapshot"):
+            snapshot = await snapshot_cache.refresh()
+    except ExecutorBusyError as e:
+        SCANS.labels("skipped").inc()
+        logger.warning(f"略過本次檢查: {str(e)}")
+        return
+    except ScanTimeoutError as e:
+        # 網站過慢不代表登入失效，不清除 cookies，下次掃描重試
+        SCANS.labels("timeout").inc()
+        logger.warning(f"本次檢查逾時: {str(e)}")
+        return
         
-        if not html_content:
-            error_message = "無法獲取頁面內容，可能需要重新登入"
-            logger.error(error_message)
-            await send_telegram_message(f"⚠️ 監控系統警告\n\n{error_message}")
-            cookie_manager.clear_cookies()
-            return
-            
-        events = parse_event(html_content)
+    SCANS.labels("failed" if snapshot is None else "ok").inc()
+    if snapshot is None:
+        error_message = "無法獲取頁面內容，可能需要重新登入"
+        logger.error(error_message)
+        notifier.send(f"⚠️ 監控系統警告\n\n{error_message}")
+        cookie_manager.clear_cookies()
+        driver_pool.invalidate_sessions()
+        return
         
-        if not events:
-            logger.warning("未找到任何課程")
-            return
-
-        # 遍歷所有事件
-        for event in events:
-            if event.status == "開放報名" and event.name not in notified_events:
-                clean_date = ' '.join(event.event_date.split())
-                message = f"""
-🎯 <b>課程報名開放通知！</b>
-
-課程名稱：{event.name}
-活動地點：{event.location}
-{clean_date}
-目前狀態：⭐ 開放報名中 ⭐
-
-快去報名吧！
-🔗 報名連結：{TARGET_URL}
-"""
-                await send_telegram_message(message)
-                notified_events.add(event.name)
-                logger.debug(f"發送通知: {event.name} 開放報名")
-            else:
-                logger.info(f"課程狀態: {event.name} - {clean_date} - {event.status}")
-                
+    if not snapshot.events:
+        logger.warning("未找到任何課程")
+    elif not snapshot.changes:
+        logger.info(f"課程狀態無變化，共 {len(snapshot.events)} 門課程")
+
+async def index_events(snapshot: Snapshot):
+    """以最新快照重建課程索引"""
+    event_store.replace(snapshot.events)
+
+async def record_history(snapshot: Snapshot):
+    """將本次掃描送進歷史紀錄寫入佇列，只由 leader 寫入"""
+    if not coordinator.is_leader:
+        return
+    history_store.record_scan(snapshot.events, snapshot.changes, snapshot.taken_at)
+
+async def share_snapshot(snapshot: Snapshot):
+    """leader 將快照寫入共用檔案，供其他 worker 提供 API 與串流"""
+    coordinator.publish(snapshot)
+
+async def broadcast_changes(snapshot: Snapshot):
+    """將本次掃描的狀態變化推送給 /events/stream 與 /events/ws 的連線"""
+    stream_hub.publish(snapshot)
+
+def schedule_scan(run_date: datetime):
+    """安排下一次排程掃描
+
+    同一時間只有一個掃描工作；事件迴圈忙碌而晚於預定時間時仍會執行（不因 misfire 被略過），
+    累積的多次只執行一次。
+    """
+    scheduler.add_job(
+        scheduled_check, 'date',
+        run_date=run_date,
+        id='check_event', replace_existing=True,
+        max_instances=1, coalesce=True, misfire_grace_time=None,
+    )
+
+async def scheduled_check():
+    """執行排程掃描，再依報名時段安排下一次掃描
+
+    下一次掃描從本次的預定時間起算；掃描超過間隔時錯過的排程合併為一次，見 ScanSupervisor.plan_next。
+    """
+    started_at = datetime.now(TAIPEI)
+    scan_supervisor.started(started_at)
+    try:
+        with SCAN_SECONDS.time(), tracer.trace("scheduled_scan"):
+            await check_event()
     finally:
-        if driver:
-            driver.quit()
+        snapshot = snapshot_cache.latest
+        if snapshot is None:
+            plan = PollingPlan(SCAN_INTERVAL_ACTIVE, MODE_ACTIVE, "尚無掃描結果")
+        else:
+            plan = plan_next_scan(snapshot.events)
+        logger.info(f"下次掃描: {plan.delay:.0f} 秒後 ({plan.mode}: {plan.reason})")
+        NEXT_SCAN_DELAY_SECONDS.clear()
+        NEXT_SCAN_DELAY_SECONDS.labels(plan.mode).set(plan.delay)
+        schedule_scan(scan_supervisor.plan_next(started_at, plan.delay, datetime.now(TAIPEI)))
 
-@app.on_event("startup")
-async def startup_event():
-    """啟動排程器"""
-    scheduler.add_job(check_event, 'interval', seconds=30, id='check_event')
+snapshot_cache.subscribe(index_events)
+snapshot_cache.subscribe(share_snapshot)
+snapshot_cache.subscribe(record_history)
+snapshot_cache.subscribe(notify_changes)
+snapshot_cache.subscribe(broadcast_changes)
+
+async def start_scanner(previous: Optional[Snapshot]):
+    """成為 leader 後啟動通知佇列、排程掃描與 Chrome 預熱"""
+    if previous is not None:
+        # 沿用前一個 leader 最後的結果作為比對基準，接手後不會把所有課程當成新課程
+        change_detector.restore(previous.events)
+    await notifier.start()
+    notified_events.update(history_store.load_notified())
+    logger.info(f"已載入 {len(notified_events)} 筆通知紀錄")
+    scan_supervisor.next_run_at = datetime.now(TAIPEI)
+    schedule_scan(scan_supervisor.next_run_at)
     scheduler.start()
     logger.info("排程器已啟動")
+    # 在背景預熱 Chrome，不阻塞啟動
+    asyncio.ensure_future(browser_executor.run(driver_pool.warm_up, DRIVER_POOL_WARM))
+
+@app.on_event("startup")
+async def startup_event():
+    """載入資料後嘗試成為 leader，只有 leader 啟動排程器"""
+    history_store.start()
+    watch_engine.load()
+    await coordinator.start(start_scanner)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """關閉排程器、串流連線、通知佇列、HTTP 連線、瀏覽器執行緒、Chrome 池與歷史紀錄，最後釋放 leader 鎖"""
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
+    stream_hub.close()
+    await notifier.close()
+    await http_fetcher.close()
+    browser_executor.shutdown()
+    driver_pool.close()
+    history_store.close()
+    coordinator.stop()
 
 # 註冊路由
 app.include_router(router)
@@ -1,10 +1,12 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Dict, Optional, List
 
 class LoginStatus(BaseModel):
     success: bool
     message: str
     cookies_saved: bool = False
+    attempts: int = 0
+    stage_timings: Dict[str, float] = {}  # 各階段耗時（秒）
 
 class EventStatus(BaseModel):
     name: str
@@ -14,7 +16,61 @@ class EventStatus(BaseModel):
     registration_end: str
     status: str
     last_checked: str
+    level: Optional[str] = None  # 課程等級，列表頁未提供時為 None
 
 class EventQuery(BaseModel):
     event_name: Optional[str] = None
+    name_match: str = "exact"  # exact / prefix / contains
     event_date: Optional[str] = None
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
+    location: Optional[str] = None
+    status: Optional[str] = None
+
+class EventChange(BaseModel):
+    type: str  # opened / filled / new / removed
+    event: EventStatus
+    previous_status: Optional[str] = None
+
+class EventObservation(BaseModel):
+    observed_at: str
+    name: str
+    location: str
+    event_date: str
+    registration_start: str
+    registration_end: str
+    status: str
+
+class EventTransition(BaseModel):
+    changed_at: str
+    name: str
+    location: str
+    event_date: str
+    type: str
+    previous_status: Optional[str] = None
+    status: str
+
+class ObservationPage(BaseModel):
+    name: str
+    limit: int
+    offset: int
+    items: List[EventObservation]
+
+class TransitionPage(BaseModel):
+    name: str
+    limit: int
+    offset: int
+    items: List[EventTransition]
+
+class WatchRuleInput(BaseModel):
+    name: Optional[str] = None  # 課程名稱，未指定時不限
+    name_match: str = "exact"  # exact / prefix / contains
+    location: Optional[str] = None
+    date_from: Optional[str] = None  # 活動日期起 (YYYY/MM/DD，含)
+    date_to: Optional[str] = None  # 活動日期迄 (YYYY/MM/DD，含)
+    level: Optional[str] = None
+    chat_ids: List[str] = []  # 未指定時通知預設的聊天室
+    enabled: bool = True
+
+class WatchRule(WatchRuleInput):
+    id: str
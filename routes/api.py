@@ -1,88 +1,275 @@
+import asyncio
 import logging
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, WebSocket
+from fastapi.responses import StreamingResponse
 from datetime import datetime
-from typing import List, Optional
-import pytz
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from typing import Dict, List, Optional
 
-from models.schemas import LoginStatus, EventStatus, EventQuery
-from services.browser import setup_driver
-from services.login import login
-from services.event import get_page_content, parse_event
-from utils.cookie_manager import CookieManager
+from models.schemas import LoginStatus, EventStatus, EventQuery, ObservationPage, TransitionPage, WatchRule, WatchRuleInput
+from services.driver_pool import driver_pool
+from services.executor import browser_executor, ExecutorBusyError
+from services.login import login, last_login_timings
+from services.event_store import event_store, NAME_MATCH_MODES
+from services.history import history_store
+from services.event import crawler, last_page_load
+from services.snapshot import snapshot_cache
+from services.tracing import tracer, KIND_SCAN, KIND_REQUEST
+from services.watch_rules import watch_engine
+from services.stream import stream_hub, format_sse
+from services.coordination import coordinator
+from services.supervisor import scan_supervisor, ScanTimeoutError
+from utils.cookie_manager import cookie_manager
+from config import HISTORY_PAGE_LIMIT, TRACE_BUFFER_SIZE
 
 router = APIRouter()
-cookie_manager = CookieManager()
+
+async def get_snapshot():
+    """取得掃描快照，瀏覽器佇列已滿時回應 503，掃描逾時且沒有舊快照時回應 504"""
+    try:
+        return await snapshot_cache.get()
+    except ExecutorBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except ScanTimeoutError as e:
+        # 網站過慢時先回舊快照
+        if snapshot_cache.latest is not None:
+            return snapshot_cache.latest
+        raise HTTPException(status_code=504, detail=str(e))
+
+def login_with_pool() -> LoginStatus:
+    """向 Chrome 池借用瀏覽器登入，會阻塞，需在瀏覽器執行緒中呼叫"""
+    with driver_pool.borrow(prefer_logged_in=True) as pooled:
+        login_status = login(pooled.driver, cookie_manager)
+        pooled.logged_in = login_status.success
+    return login_status
 
 @router.get("/status")
 async def get_status():
     """獲取目前監控狀態"""
-    driver = None
-    try:
-        driver = setup_driver()
-        html_content = get_page_content(driver)
-        event = parse_event(html_content)
-        return {
-            "status": "running",
-            "last_checked": datetime.now(pytz.timezone('Asia/Taipei')).strftime('%Y-%m-%d %H:%M:%S'),
-            "current_event": event,
-            "cookies_valid": cookie_manager.is_cookie_valid()
-        }
-    finally:
-        if driver:
-            driver.quit()
+    snapshot = await get_snapshot()
+    return {
+        "status": "running",
+        "role": coordinator.role,
+        "last_checked": snapshot.taken_at if snapshot else None,
+        "snapshot_age": round(snapshot.age, 1) if snapshot else None,
+        "current_event": snapshot.events if snapshot else None,
+        "cookies_valid": cookie_manager.is_cookie_valid(),
+        "login_timings": last_login_timings,
+        "browser_page_load": last_page_load,
+        "scan_supervisor": scan_supervisor.status(),
+        "listing_fetches": [fetch._asdict() for fetch in crawler.last_fetches],
+    }
 
 @router.get("/events", response_model=List[EventStatus])
-async def get_events():
+async def get_events(response: Response):
     """獲取所有課程狀態"""
-    driver = None
+    snapshot = await get_snapshot()
+    if not snapshot:
+        return []
+    response.headers["X-Snapshot-Age"] = f"{snapshot.age:.1f}"
+    return snapshot.events
+
+@router.get("/events/stream")
+async def stream_events():
+    """以 Server-Sent Events 推送課程狀態：連線時一次完整列表（snapshot），之後每次掃描的變化（delta）
+
+    接收過慢的連線會收到 dropped 後被中斷，重新連線即可取得最新的完整列表。
+    """
+    client = stream_hub.connect()
+
+    async def body():
+        try:
+            async for message in stream_hub.messages(client):
+                yield format_sse(message)
+        finally:
+            stream_hub.disconnect(client)
+
+    return StreamingResponse(body(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # 避免 nginx 緩衝整個回應
+    })
+
+@router.websocket("/events/ws")
+async def stream_events_ws(websocket: WebSocket):
+    """以 WebSocket 推送課程狀態，訊息格式與 /events/stream 的 data 相同，沒有訊息時送出 ping"""
+    await websocket.accept()
+    client = stream_hub.connect()
+
+    async def send():
+        async for message in stream_hub.messages(client):
+            await websocket.send_text(message.data if message else '{"type": "ping"}')
+        await websocket.close()
+
+    async def wait_disconnect():
+        # 持續讀取才能即時得知客戶端已斷線，而不是等到下一則訊息送出失敗
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    tasks = [asyncio.ensure_future(send()), asyncio.ensure_future(wait_disconnect())]
     try:
-        driver = setup_driver()
-        html_content = get_page_content(driver)
-        events = parse_event(html_content)
-        if not events:
-            return []
-        return events if isinstance(events, list) else [events]
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
     finally:
-        if driver:
-            driver.quit()
+        for task in tasks:
+            task.cancel()
+        stream_hub.disconnect(client)
 
-@router.get("/events/search", response_model=Optional[EventStatus])
-async def search_event(event_name: Optional[str] = None, event_date: Optional[str] = None):
-    """搜尋特定課程狀態
+@router.get("/events/search", response_model=List[EventStatus])
+async def search_event(response: Response, query: EventQuery = Depends()):
+    """搜尋課程狀態，回傳所有符合條件的課程
     
     Args:
         event_name: 課程名稱
+        name_match: 名稱比對方式 exact / prefix / contains
         event_date: 活動日期 (YYYY/MM/DD格式)
+        date_from: 活動日期起 (YYYY/MM/DD格式，含)
+        date_to: 活動日期迄 (YYYY/MM/DD格式，含)
+        location: 活動地點
+        status: 課程狀態
     """
-    if not event_name and not event_date:
-        raise HTTPException(status_code=400, detail="必須提供課程名稱或活動日期")
+    if not any([query.event_name, query.event_date, query.date_from, query.date_to, query.location, query.status]):
+        raise HTTPException(status_code=400, detail="必須提供至少一個搜尋條件")
+    if query.name_match not in NAME_MATCH_MODES:
+        raise HTTPException(status_code=400, detail=f"name_match 必須是 {', '.join(NAME_MATCH_MODES)} 之一")
+    for date in (query.event_date, query.date_from, query.date_to):
+        if date:
+            try:
+                datetime.strptime(date, "%Y/%m/%d")
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"日期格式錯誤: {date}")
         
-    driver = None
+    snapshot = await get_snapshot()
+    if not snapshot:
+        raise HTTPException(status_code=503, detail="尚無可用的掃描結果")
+    response.headers["X-Snapshot-Age"] = f"{snapshot.age:.1f}"
+    events = event_store.query(
+        name=query.event_name,
+        name_match=query.name_match,
+        date_from=query.event_date or query.date_from,
+        date_to=query.event_date or query.date_to,
+        location=query.location,
+        status=query.status,
+    )
+    if not events:
+        raise HTTPException(status_code=404, detail="未找到符合條件的課程")
+    return events
+
+@router.get("/events/{name}/history", response_model=ObservationPage)
+async def get_event_history(name: str, limit: int = Query(100, ge=1, le=HISTORY_PAGE_LIMIT), offset: int = Query(0, ge=0)):
+    """分頁查詢課程的歷史觀測紀錄，由新到舊排列"""
+    items = await asyncio.get_running_loop().run_in_executor(
+        None, history_store.get_observations, name, limit, offset
+    )
+    return ObservationPage(name=name, limit=limit, offset=offset, items=items)
+
+@router.get("/events/{name}/transitions", response_model=TransitionPage)
+async def get_event_transitions(name: str, limit: int = Query(100, ge=1, le=HISTORY_PAGE_LIMIT), offset: int = Query(0, ge=0)):
+    """分頁查詢課程的狀態變化紀錄，由新到舊排列"""
+    items = await asyncio.get_running_loop().run_in_executor(
+        None, history_store.get_transitions, name, limit, offset
+    )
+    return TransitionPage(name=name, limit=limit, offset=offset, items=items)
+
+@router.get("/rules", response_model=List[WatchRule])
+async def list_rules():
+    """列出所有監控規則"""
+    return watch_engine.list()
+
+@router.post("/rules", response_model=WatchRule, status_code=201)
+async def create_rule(rule: WatchRuleInput):
+    """新增監控規則"""
     try:
-        driver = setup_driver()
-        html_content = get_page_content(driver)
-        event = parse_event(html_content, event_name, event_date)
-        if not event:
-            raise HTTPException(status_code=404, detail="未找到符合條件的課程")
-        return event
-    finally:
-        if driver:
-            driver.quit()
+        return watch_engine.add(rule)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.put("/rules", response_model=List[WatchRule])
+async def replace_rules(rules: List[WatchRuleInput]):
+    """以新的規則列表取代全部監控規則"""
+    try:
+        return watch_engine.replace_all(rules)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/rules/{rule_id}", response_model=WatchRule)
+async def get_rule(rule_id: str):
+    """取得單一監控規則"""
+    rule = watch_engine.get(rule_id)
+    if rule is None:
+        raise HTTPException(status_code=404, detail="找不到監控規則")
+    return rule
+
+@router.put("/rules/{rule_id}", response_model=WatchRule)
+async def update_rule(rule_id: str, rule: WatchRuleInput):
+    """修改監控規則"""
+    try:
+        updated = watch_engine.update(rule_id, rule)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if updated is None:
+        raise HTTPException(status_code=404, detail="找不到監控規則")
+    return updated
+
+@router.delete("/rules/{rule_id}")
+async def delete_rule(rule_id: str):
+    """刪除監控規則"""
+    if not watch_engine.delete(rule_id):
+        raise HTTPException(status_code=404, detail="找不到監控規則")
+    return {"message": "監控規則已刪除"}
+
+@router.get("/events/matches", response_model=Dict[str, List[str]])
+async def get_rule_matches():
+    """以最新快照列出每門課程符合的規則編號"""
+    snapshot = await get_snapshot()
+    if not snapshot:
+        raise HTTPException(status_code=503, detail="尚無可用的掃描結果")
+    return {
+        f"{event.name} {event.event_date}": [rule.id for rule in watch_engine.match(event)]
+        for event in snapshot.events
+    }
+
+@router.get("/metrics")
+async def get_metrics():
+    """Prometheus 指標"""
+    return Response(content=generate_latest(), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+@router.get("/debug/scans")
+async def get_scan_traces(limit: int = Query(10, ge=1, le=TRACE_BUFFER_SIZE)):
+    """最近幾次掃描的各階段時間軸，由新到舊排列"""
+    return {"tracing": tracer.enabled, "scans": tracer.recent(KIND_SCAN, limit)}
+
+@router.get("/debug/requests")
+async def get_request_traces(limit: int = Query(10, ge=1, le=TRACE_BUFFER_SIZE)):
+    """最近幾個 API 請求的時間軸，由新到舊排列"""
+    return {"tracing": tracer.enabled, "requests": tracer.recent(KIND_REQUEST, limit)}
+
+@router.post("/debug/tracing")
+async def set_tracing(enabled: bool):
+    """開啟或關閉追蹤"""
+    tracer.enabled = enabled
+    return {"tracing": tracer.enabled}
+
+@router.post("/debug/profile")
+async def request_profile():
+    """下一次掃描時開啟取樣分析，結果保存為 folded stack 檔案"""
+    tracer.request_profile()
+    return {"message": "下一次掃描將開啟取樣分析"}
+
+@router.get("/debug/profile")
+async def get_profile():
+    """最近一次取樣分析的結果摘要"""
+    return {"pending": tracer.profile_pending, "last_profile": tracer.last_profile}
 
 @router.get("/login/test")
 async def test_login():
     """測試登入功能"""
-    driver = None
     try:
-        driver = setup_driver()
-        login_status = login(driver, cookie_manager)
-        return login_status
-    finally:
-        if driver:
-            driver.quit()
+        return await browser_executor.run(login_with_pool)
+    except ExecutorBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
 
 @router.get("/cookies/clear")
 async def clear_cookies():
     """清除已保存的 cookies"""
     cookie_manager.clear_cookies()
+    driver_pool.invalidate_sessions()
     return {"message": "Cookies 已清除"}
@@ -1,38 +1,166 @@
-import requests
-import os
+"""下載驗證碼圖片並建立登入時使用的驗證碼索引
+
+    python scripts/download_captcha.py [--base-url URL] [--concurrency N]
+
+已下載的圖片會以 ETag / Last-Modified 做條件式請求，中斷後重新執行只會補抓缺少或已更新的圖片。
+"""
+import argparse
+import asyncio
+import hashlib
 import json
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Optional
+
+import httpx
 from tqdm import tqdm
 
-def download_image(url, save_path):
-    response = requests.get(url)
-    if response.status_code == 200:
-        with open(save_path, 'wb') as f:
-            f.write(response.content)
-        return True
-    return False
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.captcha import CaptchaSolver, CAPTCHA_ANSWERS
+from config import BASE_URL, CAPTCHA_IMAGE_DIR, CAPTCHA_INDEX_PATH, DATA_DIR, USER_AGENT
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+MAX_ATTEMPTS = 4
+
+
+def load_manifest(image_dir: Path) -> Dict[str, dict]:
+    path = image_dir / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_json(path: Path, data):
+    """先寫暫存檔再取代，避免中斷時留下寫一半的檔案"""
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+async def download_image(
+    client: httpx.AsyncClient, url: str, save_path: Path, entry: Optional[dict]
+) -> Optional[dict]:
+    """下載單張圖片，回傳新的 manifest 紀錄；未變更時回傳原紀錄，失敗時回傳 None"""
+    headers = {}
+    if entry and save_path.exists():
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            response = await client.get(url, headers=headers)
+            if response.status_code == 304:
+                return entry
+            if response.status_code == 200:
+                content = response.content
+                tmp_path = save_path.with_suffix(".tmp")
+                tmp_path.write_bytes(content)
+                os.replace(tmp_path, save_path)
+                return {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "sha256": hashlib.sha256(content).hexdigest(),
+                }
+            if response.status_code < 500 and response.status_code != 429:
+                logger.warning(f"下載失敗 {url}: HTTP {response.status_code}")
+                return None
+            logger.warning(f"下載失敗 {url}: HTTP {response.status_code}，重試中")
+        except httpx.HTTPError as e:
+            logger.warning(f"下載失敗 {url}: {str(e)}，重試中")
+        await asyncio.sleep(0.5 * 2 ** attempt)
+    return None
+
+
+async def download_all(
+    base_url: str,
+    image_dir: Path,
+    numbers,
+    concurrency: int = 8,
+    client: Optional[httpx.AsyncClient] = None,
+) -> Dict[int, bool]:
+    """並行下載所有圖片並更新 manifest，回傳每張圖片是否可用"""
+    image_dir.mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest(image_dir)
+    semaphore = asyncio.Semaphore(concurrency)
+    own_client = client is None
+    if own_client:
+        client = httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT},
+            timeout=15,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        )
+
+    progress = tqdm(total=len(numbers))
+
+    async def fetch(number: int):
+        async with semaphore:
+            url = f"{base_url.rstrip('/')}/images/check/{number}.jpg"
+            entry = await download_image(client, url, image_dir / f"{number}.jpg", manifest.get(str(number)))
+        if entry is not None:
+            manifest[str(number)] = entry
+        progress.update(1)
+        return number, entry is not None
+
+    try:
+        results = dict(await asyncio.gather(*(fetch(number) for number in numbers)))
+    finally:
+        progress.close()
+        if own_client:
+            await client.aclose()
+        save_json(image_dir / MANIFEST_NAME, manifest)
+    return results
+
+
+def find_duplicates(image_dir: Path, numbers) -> Dict[str, list]:
+    """依內容雜湊找出重複的圖片"""
+    manifest = load_manifest(image_dir)
+    groups: Dict[str, list] = {}
+    for number in numbers:
+        entry = manifest.get(str(number))
+        if entry:
+            groups.setdefault(entry["sha256"], []).append(number)
+    return {digest: group for digest, group in groups.items() if len(group) > 1}
+
 
 def main():
-    # 創建保存圖片的目錄
-    if not os.path.exists('downloaded_captchas'):
-        os.makedirs('downloaded_captchas')
-
-    base_url = "https://www.wmg2025warmup.org.tw/images/check/{}.jpg"
-    results = {}
-
-    # 使用tqdm顯示進度條
-    for i in tqdm(range(1, 106)):
-        url = base_url.format(i)
-        save_path = f'downloaded_captchas/{i}.jpg'
-        
-        # 下載圖片
-        if download_image(url, save_path):
-            results[str(i)] = ""  # 留空供手動填寫
-        else:
-            results[str(i)] = "download_failed"
-
-    # 保存空的結果字典到JSON文件，供後續填寫
-    with open('data/captcha_mapping.json', 'w', encoding='utf-8') as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--count", type=int, default=105, help="圖片數量，編號從 1 開始")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--image-dir", type=Path, default=CAPTCHA_IMAGE_DIR)
+    parser.add_argument("--index", type=Path, default=CAPTCHA_INDEX_PATH)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    numbers = list(range(1, args.count + 1))
+    results = asyncio.run(download_all(args.base_url, args.image_dir, numbers, args.concurrency))
+
+    for group in find_duplicates(args.image_dir, numbers).values():
+        answers = {CAPTCHA_ANSWERS.get(number, "") for number in group}
+        logger.info(f"內容相同的圖片: {group} 答案: {', '.join(sorted(answers))}")
+
+    # 保存結果字典到JSON文件，未知的答案留空供手動填寫
+    mapping = {
+        str(number): CAPTCHA_ANSWERS.get(number, "") if ok else "download_failed"
+        for number, ok in sorted(results.items())
+    }
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    save_json(DATA_DIR / "captcha_mapping.json", mapping)
+
+    # 以下載的圖片建立登入時使用的驗證碼索引
+    answers = {number: CAPTCHA_ANSWERS.get(number, "") for number, ok in results.items() if ok}
+    CaptchaSolver.build_index(args.image_dir, answers, args.index)
+
 
 if __name__ == "__main__":
     main()
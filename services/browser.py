@@ -1,27 +1,198 @@
 import logging
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
+import os
+import signal
+import threading
+import time
+from typing import Dict, List, Optional
+
+from selenium.common.exceptions import SessionNotCreatedException, WebDriverException
+
+from config import (
+    USER_AGENT,
+    CHROMEDRIVER_PATH,
+    CHROMEDRIVER_CACHE,
+    BROWSER_LEAN,
+    BLOCKED_URL_PATTERNS,
+    PAGE_READY_TIMEOUT,
+    PAGE_SETTLE_SECONDS,
+    PAGE_POLL_INTERVAL,
+)
 
 logger = logging.getLogger(__name__)
 
-def setup_driver():
-    """設置 Chrome WebDriver"""
+# 由 Performance API 取得本頁的傳輸量與載入時間，被封鎖的請求不會出現在 resource 項目中
+PAGE_LOAD_STATS_SCRIPT = """
+const nav = performance.getEntriesByType('navigation')[0] || {};
+const resources = performance.getEntriesByType('resource');
+let resourceBytes = 0;
+for (const r of resources) resourceBytes += r.transferSize || 0;
+return {
+    document_bytes: nav.transferSize || 0,
+    resource_bytes: resourceBytes,
+    resources: resources.length,
+    dom_content_loaded_ms: Math.round(nav.domContentLoadedEventEnd || 0),
+    load_event_ms: Math.round(nav.loadEventEnd || 0),
+};
+"""
+
+_chromedriver_path: Optional[str] = None
+_chromedriver_lock = threading.Lock()
+
+def _is_executable(path: Optional[str]) -> bool:
+    return bool(path) and os.path.isfile(path) and os.access(path, os.X_OK)
+
+def resolve_chromedriver(refresh: bool = False) -> str:
+    """取得 chromedriver 路徑，每個行程只解析一次
+
+    依序使用 CHROMEDRIVER_PATH、上次保存在 CHROMEDRIVER_CACHE 的路徑，都沒有時才由 webdriver_manager
+    查詢版本並下載，結果寫入快取檔，之後重啟不需連網。refresh 時忽略快取重新下載（例如 Chrome 升級後版本不符）。
+    """
+    global _chromedriver_path
+    with _chromedriver_lock:
+        if _chromedriver_path and not refresh:
+            return _chromedriver_path
+        if _is_executable(CHROMEDRIVER_PATH):
+            _chromedriver_path = CHROMEDRIVER_PATH
+            return _chromedriver_path
+
+        if not refresh:
+            try:
+                cached = CHROMEDRIVER_CACHE.read_text(encoding="utf-8").strip()
+            except OSError:
+                cached = None
+            if _is_executable(cached):
+                _chromedriver_path = cached
+                return _chromedriver_path
+
+        from webdriver_manager.chrome import ChromeDriverManager
+
+        path = ChromeDriverManager().install()
+        try:
+            CHROMEDRIVER_CACHE.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = CHROMEDRIVER_CACHE.with_suffix(".tmp")
+            tmp_path.write_text(path, encoding="utf-8")
+            os.replace(tmp_path, CHROMEDRIVER_CACHE)
+        except OSError as e:
+            logger.warning(f"保存 chromedriver 路徑失敗: {str(e)}")
+        logger.info(f"chromedriver: {path}")
+        _chromedriver_path = path
+        return _chromedriver_path
+
+def setup_driver(lean: bool = BROWSER_LEAN):
+    """設置 Chrome WebDriver，lean 時使用 eager 載入策略，DOM 解析完成即返回，不等待圖片與樣式
+
+    selenium.webdriver 在第一次開啟 Chrome 時才匯入，不拖慢服務啟動。
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+
     chrome_options = Options()
     chrome_options.add_argument("--headless=new")
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
     chrome_options.add_argument("--window-size=1920,1080")
-    
+    if lean:
+        chrome_options.page_load_strategy = "eager"
+
     # 模擬真實瀏覽器
     chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-    chrome_options.add_argument("user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-    
+    chrome_options.add_argument(f"user-agent={USER_AGENT}")
+
     chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
     chrome_options.add_experimental_option('useAutomationExtension', False)
-    
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-    driver.implicitly_wait(10)
+
+    try:
+        driver = webdriver.Chrome(service=Service(resolve_chromedriver()), options=chrome_options)
+    except SessionNotCreatedException:
+        if _is_executable(CHROMEDRIVER_PATH):
+            raise
+        # 快取的 chromedriver 與已升級的 Chrome 版本不符，重新下載一次
+        logger.warning("chromedriver 與 Chrome 版本不符，重新下載")
+        driver = webdriver.Chrome(service=Service(resolve_chromedriver(refresh=True)), options=chrome_options)
+    # 不設定 implicit wait：所有等待都以 WebDriverWait 明確指定期限，
+    # implicit wait 會讓等待條件中每次 find_elements 在元素不存在時阻塞，超過外層的期限
     return driver
+
+def block_resources(driver, enabled: bool = True):
+    """以 CDP 封鎖或解除封鎖 BLOCKED_URL_PATTERNS，設定會保留到下次呼叫
+
+    池中的 Chrome 同時用於抓取列表頁與登入，登入頁的驗證碼需要圖片，登入前需解除封鎖。
+    """
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS if enabled else []})
+    except WebDriverException as e:
+        logger.warning(f"設定資源封鎖失敗: {str(e)}")
+
+def wait_for_cards(
+    driver,
+    class_name: str = "activity-card",
+    timeout: float = PAGE_READY_TIMEOUT,
+    settle: float = PAGE_SETTLE_SECONDS,
+) -> int:
+    """等待卡片出現且數量維持 settle 秒不變，回傳卡片數；逾時回傳最後看到的數量
+
+    取代固定等待，卡片一次全部輸出的頁面只需多等一個 settle。
+    """
+    script = f"return [document.getElementsByClassName('{class_name}').length, document.readyState];"
+    deadline = time.monotonic() + timeout
+    last_count: Optional[int] = None
+    stable_since = time.monotonic()
+    while True:
+        count, ready_state = driver.execute_script(script)
+        now = time.monotonic()
+        if count != last_count:
+            last_count, stable_since = count, now
+        elif count and ready_state != "loading" and now - stable_since >= settle:
+            return count
+        if now >= deadline:
+            return last_count or 0
+        time.sleep(PAGE_POLL_INTERVAL)
+
+def page_load_stats(driver) -> Dict[str, int]:
+    """目前頁面的傳輸位元組數、資源數與 DOMContentLoaded / load 時間"""
+    try:
+        stats = driver.execute_script(PAGE_LOAD_STATS_SCRIPT)
+    except WebDriverException as e:
+        logger.warning(f"讀取載入統計失敗: {str(e)}")
+        return {}
+    stats["transfer_bytes"] = stats["document_bytes"] + stats["resource_bytes"]
+    return stats
+
+def _descendants(pid: int) -> List[int]:
+    """由 /proc 找出所有子孫行程，沒有 /proc 的平台回傳空列表"""
+    result = []
+    stack = [pid]
+    while stack:
+        parent = stack.pop()
+        try:
+            with open(f"/proc/{parent}/task/{parent}/children") as f:
+                children = [int(child) for child in f.read().split()]
+        except (OSError, ValueError):
+            continue
+        result.extend(children)
+        stack.extend(children)
+    return result
+
+def kill_driver(driver) -> int:
+    """以 SIGKILL 結束 chromedriver 與其開啟的 Chrome，回傳結束的行程數
+
+    不經過 WebDriver 協定：chromedriver 一次只處理一個指令，卡住時 quit 也會被擋住。
+    行程結束後，執行緒中卡住的 WebDriver 呼叫會因連線中斷立即失敗。
+    """
+    process = getattr(getattr(driver, "service", None), "process", None)
+    if process is None or process.poll() is not None:
+        return 0
+    killed = 0
+    for pid in _descendants(process.pid) + [process.pid]:
+        try:
+            os.kill(pid, signal.SIGKILL)
+            killed += 1
+        except OSError:
+            pass
+    try:
+        process.wait(timeout=5)
+    except Exception as e:
+        logger.warning(f"等待 chromedriver 結束失敗: {str(e)}")
+    return killed
@@ -0,0 +1,258 @@
+import hashlib
+import logging
+import re
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+from config import CAPTCHA_INDEX_PATH, CAPTCHA_MIN_CONFIDENCE, CAPTCHA_OCR_ENABLED, TESSERACT_CMD
+
+logger = logging.getLogger(__name__)
+
+# 驗證碼圖片編號 (images/check/<編號>.jpg) 對應的答案
+CAPTCHA_ANSWERS: Dict[int, str] = {
+    1: "14687",
+    2: "14689",
+    3: "15698",
+    4: "15937",
+    5: "18139",
+    6: "19534",
+    7: "19734",
+    8: "23498",
+    9: "24395",
+    10: "25463",
+    11: "25489",
+    12: "25843",
+    13: "26459",
+    14: "27951",
+    15: "28549",
+    16: "29514",
+    17: "31244",
+    18: "32236",
+    19: "33468",
+    20: "34974",
+    21: "37192",
+    22: "39631",
+    23: "39716",
+    24: "42217",
+    25: "42368",
+    26: "42467",
+    27: "43971",
+    28: "44431",
+    29: "45621",
+    30: "45628",
+    31: "47641",
+    32: "48379",
+    33: "48461",
+    34: "49389",
+    35: "49431",
+    36: "49731",
+    37: "49768",
+    38: "49837",
+    39: "18139",
+    40: "51456",
+    41: "52168",
+    42: "52497",
+    43: "54682",
+    44: "54936",
+    45: "55518",
+    46: "56197",
+    47: "59318",
+    48: "19534",
+    49: "62551",
+    50: "62893",
+    51: "63594",
+    52: "64379",
+    53: "64568",
+    54: "64587",
+    55: "64829",
+    56: "64939",
+    57: "65628",
+    58: "69697",
+    59: "19734",
+    60: "71234",
+    61: "71395",
+    62: "71598",
+    63: "72956",
+    64: "73198",
+    65: "73597",
+    66: "74927",
+    67: "75188",
+    68: "75318",
+    69: "76138",
+    70: "76249",
+    71: "77539",
+    72: "79513",
+    73: "79841",
+    74: "23498",
+    75: "81394",
+    76: "82643",
+    77: "82964",
+    78: "83461",
+    79: "84379",
+    80: "84399",
+    81: "84638",
+    82: "84679",
+    83: "84918",
+    84: "84974",
+    85: "85246",
+    86: "86324",
+    87: "86648",
+    88: "87344",
+    89: "88248",
+    90: "89134",
+    91: "89374",
+    92: "24395",
+    93: "91974",
+    94: "92468",
+    95: "92954",
+    96: "93468",
+    97: "93492",
+    98: "95713",
+    99: "96352",
+    100: "96548",
+    101: "96567",
+    102: "96846",
+    103: "96934",
+    104: "98165",
+    105: "99624",
+}
+
+CAPTCHA_SRC_PATTERN = re.compile(r"images/check/(\d+)\.jpg")
+CANDIDATE_DISTANCE = 6  # 與最近雜湊距離在此範圍內的圖片都會再比對特徵向量
+
+
+class CaptchaMatch(NamedTuple):
+    answer: str
+    confidence: float  # 0 ~ 1
+    source: str  # hash / ocr / src
+
+
+def answer_from_src(image_src: Optional[str]) -> Optional[str]:
+    """由圖片路徑中的編號查答案，不受網域、協定或查詢字串影響"""
+    match = CAPTCHA_SRC_PATTERN.search(image_src or "")
+    return CAPTCHA_ANSWERS.get(int(match.group(1))) if match else None
+
+
+class CaptchaSolver:
+    """以圖片內容辨識驗證碼
+
+    先以 dHash 漢明距離找出候選圖片，再以特徵向量的餘弦相似度決定答案與信心分數，
+    都低於門檻時可選擇使用 pytesseract 辨識。
+    numpy / OpenCV 與索引檔都在第一次辨識時才載入，不拖慢服務啟動。
+    """
+
+    def __init__(self, index_path: Path = CAPTCHA_INDEX_PATH):
+        self.index_path = Path(index_path)
+        self.index = None  # 載入後為索引檔的 memory-map
+        self._loaded = False
+
+    def __len__(self) -> int:
+        return len(self.index) if self.index is not None else 0
+
+    def load(self) -> bool:
+        """載入索引檔，檔案不存在或格式不符時回傳 False"""
+        from services.captcha_index import read_index
+
+        self._loaded = True
+        if not self.index_path.exists():
+            logger.warning(f"找不到驗證碼索引: {self.index_path}")
+            return False
+        try:
+            self.index = read_index(self.index_path)
+        except (OSError, ValueError) as e:
+            logger.error(f"載入驗證碼索引失敗: {str(e)}")
+            return False
+        logger.info(f"已載入 {len(self)} 筆驗證碼索引")
+        return True
+
+    @staticmethod
+    def build_index(image_dir: Path, answers: Dict[int, str], index_path: Path = CAPTCHA_INDEX_PATH) -> int:
+        """由下載的圖片 (<編號>.jpg) 與答案建立索引檔，內容相同的圖片只收錄一次，回傳收錄筆數"""
+        from services.captcha_index import decode_image, difference_hash, thumbnail, write_index
+
+        entries = []
+        seen: Dict[str, str] = {}
+        for number, answer in sorted(answers.items()):
+            path = Path(image_dir) / f"{number}.jpg"
+            if not path.exists() or not answer:
+                continue
+            image_bytes = path.read_bytes()
+            digest = hashlib.sha256(image_bytes).hexdigest()
+            if digest in seen:
+                if seen[digest] != answer:
+                    logger.warning(f"相同圖片有不同答案: {number}.jpg ({seen[digest]} / {answer})")
+                continue
+            seen[digest] = answer
+            gray = decode_image(image_bytes)
+            entries.append((difference_hash(gray), thumbnail(gray), answer))
+        write_index(index_path, entries)
+        logger.info(f"已建立驗證碼索引，共 {len(entries)} 筆: {index_path}")
+        return len(entries)
+
+    def match(self, image_bytes: bytes) -> Optional[CaptchaMatch]:
+        """在索引中找出最相似的圖片"""
+        import numpy as np
+        from services.captcha_index import decode_image, difference_hash, thumbnail, normalize, hamming_distances
+
+        if not self._loaded:
+            self.load()
+        if not len(self):
+            return None
+        gray = decode_image(image_bytes)
+        distances = hamming_distances(self.index["hash"], difference_hash(gray))
+        candidates = np.flatnonzero(distances <= distances.min() + CANDIDATE_DISTANCE)
+        similarities = normalize(self.index["thumbnail"][candidates]) @ normalize(thumbnail(gray))
+        best = int(np.argmax(similarities))
+        index = candidates[best]
+        confidence = float(max(0.0, similarities[best]) * (1 - distances[index] / 64))
+        return CaptchaMatch(self.index["answer"][index].decode("ascii"), confidence, "hash")
+
+    def ocr(self, image_bytes: bytes) -> Optional[CaptchaMatch]:
+        """以 pytesseract 辨識數字，未安裝或失敗時回傳 None"""
+        try:
+            import pytesseract
+        except ImportError:
+            return None
+        from services.captcha_index import decode_image
+
+        if TESSERACT_CMD:
+            pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+        try:
+            data = pytesseract.image_to_data(
+                decode_image(image_bytes),
+                config="--psm 7 -c tessedit_char_whitelist=0123456789",
+                output_type=pytesseract.Output.DICT,
+            )
+        except Exception as e:
+            logger.warning(f"OCR 辨識驗證碼失敗: {str(e)}")
+            return None
+        words = [(text, float(conf)) for text, conf in zip(data["text"], data["conf"]) if text.strip()]
+        if not words:
+            return None
+        answer = "".join(text.strip() for text, _ in words)
+        confidence = min(conf for _, conf in words) / 100
+        return CaptchaMatch(answer, max(0.0, confidence), "ocr")
+
+    def solve(self, image_bytes: Optional[bytes] = None, image_src: Optional[str] = None) -> Optional[CaptchaMatch]:
+        """辨識驗證碼：先比對圖片索引，信心不足時依序改用圖片編號與 OCR"""
+        match = None
+        if image_bytes:
+            try:
+                match = self.match(image_bytes)
+            except ValueError as e:
+                logger.warning(str(e))
+        if match and match.confidence >= CAPTCHA_MIN_CONFIDENCE:
+            return match
+
+        answer = answer_from_src(image_src)
+        if answer:
+            return CaptchaMatch(answer, 1.0, "src")
+
+        if CAPTCHA_OCR_ENABLED and image_bytes:
+            ocr_match = self.ocr(image_bytes)
+            if ocr_match and (match is None or ocr_match.confidence > match.confidence):
+                return ocr_match
+        return match
+
+
+captcha_solver = CaptchaSolver()
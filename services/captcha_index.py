@@ -0,0 +1,78 @@
+# 驗證碼圖片特徵與索引檔格式，依賴 numpy / OpenCV，由 services.captcha 在第一次辨識時才匯入
+import os
+import struct
+from pathlib import Path
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+FEATURE_SHAPE = (12, 32)  # 特徵縮圖大小 (高, 寬)
+
+# 索引檔格式：標頭 (魔術字、筆數、特徵長度) 後接固定長度的紀錄，可直接 memory-map
+INDEX_MAGIC = b"WMGCAPT1"
+INDEX_HEADER = struct.Struct("<8sII")
+INDEX_DTYPE = np.dtype([
+    ("hash", "<u8"),
+    ("thumbnail", "u1", (FEATURE_SHAPE[0] * FEATURE_SHAPE[1],)),
+    ("answer", "S8"),
+])
+
+
+def decode_image(image_bytes: bytes) -> np.ndarray:
+    """將圖片內容解碼為灰階陣列"""
+    image = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        raise ValueError("無法解碼驗證碼圖片")
+    return image
+
+
+def difference_hash(gray: np.ndarray) -> np.uint64:
+    """64 位元 dHash，縮圖後比較相鄰像素亮度，不受尺寸與壓縮差異影響"""
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return np.packbits(bits).view('>u8')[0].astype(np.uint64)
+
+
+def thumbnail(gray: np.ndarray) -> np.ndarray:
+    """特徵縮圖，以 uint8 保存於索引中"""
+    return cv2.resize(gray, FEATURE_SHAPE[::-1], interpolation=cv2.INTER_AREA).ravel()
+
+
+def normalize(thumbnails: np.ndarray) -> np.ndarray:
+    """將縮圖轉為零均值、單位長度的特徵向量，用內積即可求餘弦相似度"""
+    vectors = thumbnails.astype(np.float32)
+    vectors -= vectors.mean(axis=-1, keepdims=True)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def hamming_distances(hashes: np.ndarray, target: np.uint64) -> np.ndarray:
+    """一次計算 target 與所有雜湊的漢明距離"""
+    xor = np.bitwise_xor(hashes, target)
+    return np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+def write_index(index_path: Path, entries: List[Tuple[np.uint64, np.ndarray, str]]):
+    """寫入索引檔，先寫暫存檔再取代，讀取端不會讀到寫一半的檔案"""
+    records = np.zeros(len(entries), dtype=INDEX_DTYPE)
+    for i, (image_hash, thumb, answer) in enumerate(entries):
+        records[i] = (image_hash, thumb, answer.encode("ascii"))
+    index_path = Path(index_path)
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = index_path.with_suffix(index_path.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(INDEX_HEADER.pack(INDEX_MAGIC, len(records), INDEX_DTYPE["thumbnail"].shape[0]))
+        f.write(records.tobytes())
+    os.replace(tmp_path, index_path)
+
+
+def read_index(index_path: Path) -> np.ndarray:
+    """以 memory-map 開啟索引檔"""
+    with open(index_path, "rb") as f:
+        magic, count, feature_len = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+    if magic != INDEX_MAGIC or feature_len != INDEX_DTYPE["thumbnail"].shape[0]:
+        raise ValueError(f"驗證碼索引格式不符: {index_path}")
+    if count == 0:
+        return np.zeros(0, dtype=INDEX_DTYPE)
+    return np.memmap(index_path, dtype=INDEX_DTYPE, mode="r", offset=INDEX_HEADER.size, shape=(count,))
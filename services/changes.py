@@ -0,0 +1,176 @@
+import hashlib
+import logging
+import re
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import pytz
+
+from models.schemas import EventStatus, EventChange
+from services.metrics import PARSE_SECONDS, CARDS_PARSED, CARDS_REUSED, STATUS_TRANSITIONS
+from services.tracing import span
+from services.parser import parse_cards, to_event_status, STATUS_OPEN, STATUS_FULL
+
+logger = logging.getLogger(__name__)
+
+CHANGE_OPENED = "opened"
+CHANGE_FILLED = "filled"
+CHANGE_NEW = "new"
+CHANGE_REMOVED = "removed"
+
+# 活動卡片的起始標籤，用來把頁面切成每張卡片一段
+CARD_START_PATTERN = re.compile(
+    r"""<div\b[^>]*\bclass\s*=\s*["'][^"']*(?<![\w-])activity-card(?![\w-])""",
+    re.IGNORECASE,
+)
+
+
+class ScanResult(NamedTuple):
+    events: List[EventStatus]
+    changes: List[EventChange]
+    unchanged: bool  # 頁面與上次完全相同，未重新解析
+
+
+def event_key(event: EventStatus) -> str:
+    """識別同一門課程的鍵值"""
+    return f"{event.name}|{event.location}|{event.event_date}"
+
+
+def _keyed(events: Sequence[EventStatus]) -> List[Tuple[str, EventStatus]]:
+    """為同一頁的課程產生比對用的鍵值
+
+    同一頁中名稱、地點、日期都相同的卡片仍是不同的卡片，第二張起在鍵值後加上序號，
+    合併多個列表頁時只會合併不同頁中序號相同的卡片。
+    """
+    occurrences: Dict[str, int] = {}
+    keyed = []
+    for event in events:
+        key = event_key(event)
+        n = occurrences.get(key, 0)
+        occurrences[key] = n + 1
+        keyed.append((f"{key}#{n}" if n else key, event))
+    return keyed
+
+
+def _fingerprint(text: str) -> bytes:
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+def split_cards(html_content: str) -> List[str]:
+    """依卡片起始標籤切出每張卡片的原始 HTML，找不到卡片時回傳空列表"""
+    starts = [m.start() for m in CARD_START_PATTERN.finditer(html_content)]
+    ends = starts[1:] + [len(html_content)]
+    return [html_content[start:end] for start, end in zip(starts, ends)]
+
+
+class ChangeDetector:
+    """比對前後兩次掃描，只重新解析有變動的卡片並產生狀態變化
+
+    頁面完全相同時直接沿用上次結果；否則以每張卡片原始 HTML 的雜湊判斷，
+    只有新增或內容變動的卡片才會重新解析。
+    """
+
+    def __init__(self):
+        self._page_fingerprint: Optional[bytes] = None
+        self._by_fingerprint: Dict[bytes, List[EventStatus]] = {}
+        self._by_key: Dict[str, EventStatus] = {}
+        self._events: List[EventStatus] = []
+
+    def _parse_fragment(self, fragment: str, last_checked: str, level: Optional[str]) -> List[EventStatus]:
+        return [to_event_status(card, last_checked, level) for card in parse_cards(fragment)]
+
+    def _parse(self, pages: Sequence[Tuple[str, Optional[str]]], last_checked: str):
+        """解析所有列表頁，回傳每頁的課程列表與新的卡片雜湊表"""
+        pages_events = []
+        by_fingerprint = {}
+        reparsed = total = 0
+        for html_content, level in pages:
+            events = []
+            pages_events.append(events)
+            fragments = split_cards(html_content)
+            if not fragments:
+                # 切不出卡片時改為完整解析
+                events.extend(self._parse_fragment(html_content, last_checked, level))
+                continue
+            for fragment in fragments:
+                # 同一張卡片出現在不同等級的列表頁時 level 不同，雜湊需包含 level
+                fingerprint = _fingerprint(f"{level or ''}\0{fragment}")
+                cached = self._by_fingerprint.get(fingerprint)
+                if cached is None:
+                    cached = self._parse_fragment(fragment, last_checked, level)
+                    reparsed += 1
+                else:
+                    cached = [event.model_copy(update={'last_checked': last_checked}) for event in cached]
+                by_fingerprint[fingerprint] = cached
+                events.extend(cached)
+            total += len(fragments)
+        CARDS_PARSED.inc(reparsed)
+        CARDS_REUSED.inc(total - reparsed)
+        logger.debug(f"重新解析 {reparsed}/{total} 張卡片")
+        return pages_events, by_fingerprint
+
+    def _diff(self, by_key: Dict[str, EventStatus]) -> List[EventChange]:
+        changes = []
+        for key, event in by_key.items():
+            previous = self._by_key.get(key)
+            if previous is None:
+                changes.append(EventChange(type=CHANGE_NEW, event=event))
+            elif previous.status != event.status:
+                if event.status == STATUS_OPEN:
+                    change_type = CHANGE_OPENED
+                elif event.status == STATUS_FULL:
+                    change_type = CHANGE_FILLED
+                else:
+                    continue
+                changes.append(EventChange(type=change_type, event=event, previous_status=previous.status))
+        for key, previous in self._by_key.items():
+            if key not in by_key:
+                changes.append(EventChange(type=CHANGE_REMOVED, event=previous, previous_status=previous.status))
+        return changes
+
+    def restore(self, events: List[EventStatus]):
+        """以其他行程最後的掃描結果作為比對基準，接手掃描後第一次掃描只回報真正的變化"""
+        self._by_key = dict(_keyed(events))
+        self._events = list(events)
+        self._page_fingerprint = None
+
+    def update(self, html_content: str) -> ScanResult:
+        """處理新抓取的頁面並回傳課程列表與狀態變化"""
+        return self.update_pages([(html_content, None)])
+
+    def update_pages(self, pages: Sequence[Tuple[str, Optional[str]]]) -> ScanResult:
+        """處理同一次掃描抓取的所有列表頁 (HTML, level)，合併不同頁中重複的課程後回傳課程列表與狀態變化"""
+        last_checked = datetime.now(pytz.timezone('Asia/Taipei')).strftime('%Y-%m-%d %H:%M:%S')
+        hasher = hashlib.blake2b(digest_size=16)
+        for html_content, level in pages:
+            hasher.update(f"{level or ''}\0{html_content}\0".encode('utf-8'))
+        page_fingerprint = hasher.digest()
+        if page_fingerprint == self._page_fingerprint:
+            self._events = [event.model_copy(update={'last_checked': last_checked}) for event in self._events]
+            return ScanResult(self._events, [], True)
+
+        with PARSE_SECONDS.time(), span("parse", pages=len(pages)):
+            pages_events, by_fingerprint = self._parse(pages, last_checked)
+        by_key: Dict[str, EventStatus] = {}
+        for page_events in pages_events:
+            for key, event in _keyed(page_events):
+                previous = by_key.get(key)
+                if previous is None:
+                    by_key[key] = event
+                    continue
+                logger.debug(f"重複的課程卡片: {key}")
+                if previous.level is None and event.level:
+                    by_key[key] = previous.model_copy(update={'level': event.level})
+        events = list(by_key.values())
+        changes = self._diff(by_key)
+        for change in changes:
+            STATUS_TRANSITIONS.labels(change.type).inc()
+
+        self._page_fingerprint = page_fingerprint
+        self._by_fingerprint = by_fingerprint
+        self._by_key = by_key
+        self._events = events
+        return ScanResult(events, changes, False)
+
+
+change_detector = ChangeDetector()
@@ -0,0 +1,197 @@
+import asyncio
+import fcntl
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Awaitable, Callable, Optional, TextIO
+
+from models.schemas import EventChange, EventStatus
+from services.snapshot import Snapshot, SnapshotCache, snapshot_cache
+from config import LEADER_LOCK_PATH, SHARED_SNAPSHOT_PATH, FOLLOWER_POLL_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+ROLE_LEADER = "leader"
+ROLE_FOLLOWER = "follower"
+
+
+class LeaderLock:
+    """以 flock 實作的單機 leader 鎖
+
+    持有鎖的行程結束（包含當機或被 kill）時核心會自動釋放，其他行程下次嘗試即可取得，不需要租約或心跳。
+    """
+
+    def __init__(self, path: Path = LEADER_LOCK_PATH):
+        self.path = Path(path)
+        self._file: Optional[TextIO] = None
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None
+
+    def try_acquire(self) -> bool:
+        if self._file is not None:
+            return True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        f = open(self.path, "a+")
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        # 記錄持有者，方便排查；內容不影響鎖本身
+        f.seek(0)
+        f.truncate()
+        f.write(f"{os.getpid()}\n")
+        f.flush()
+        self._file = f
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
+
+
+class SharedSnapshotFile:
+    """leader 寫入、其他 worker 讀取的快照檔
+
+    寫入時先寫暫存檔再以 os.replace 取代，讀取端只會看到完整的檔案；
+    讀取端每次只做一次 stat，inode 或修改時間不同時才重新讀取解析。
+    """
+
+    def __init__(self, path: Path = SHARED_SNAPSHOT_PATH):
+        self.path = Path(path)
+        self.seq = 0
+        self._stat_key: Optional[tuple] = None
+
+    def write(self, snapshot: Snapshot):
+        self.seq += 1
+        data = {
+            "seq": self.seq,
+            "pid": os.getpid(),
+            "taken_at": snapshot.taken_at,
+            "published_at": snapshot.published_at,
+            "events": [event.model_dump() for event in snapshot.events],
+            "changes": [change.model_dump() for change in snapshot.changes],
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def read_if_changed(self) -> Optional[dict]:
+        """檔案自上次讀取後有更新時回傳內容，否則回傳 None"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if key == self._stat_key:
+            return None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"讀取共用快照失敗: {str(e)}")
+            return None
+        self._stat_key = key
+        # 接手成為 leader 後從最後讀到的序號繼續編號
+        self.seq = data["seq"]
+        return data
+
+
+class Coordinator:
+    """多個 uvicorn worker 之間的分工
+
+    同一台主機上只有取得 leader 鎖的行程執行排程掃描、開啟 Chrome 與發送通知，
+    並在每次掃描後寫入共用快照；其他行程不自行掃描，定期讀取共用快照並發布到自己的 SnapshotCache，
+    API、搜尋索引與串流都由此提供。leader 結束時，下一個嘗試取得鎖的 follower 接手掃描。
+    """
+
+    def __init__(
+        self,
+        cache: SnapshotCache,
+        lock: Optional[LeaderLock] = None,
+        shared: Optional[SharedSnapshotFile] = None,
+        poll_interval: float = FOLLOWER_POLL_INTERVAL,
+    ):
+        self.cache = cache
+        self.lock = lock or LeaderLock()
+        self.shared = shared or SharedSnapshotFile()
+        self.poll_interval = poll_interval
+        self._on_promote: Optional[Callable[[Optional[Snapshot]], Awaitable[None]]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self.lock.held
+
+    @property
+    def role(self) -> str:
+        return ROLE_LEADER if self.is_leader else ROLE_FOLLOWER
+
+    async def start(self, on_promote: Callable[[Optional[Snapshot]], Awaitable[None]]):
+        """嘗試成為 leader；失敗時改為 follower，並持續嘗試接手
+
+        啟動時先載入共用快照，重啟後 API 立即有資料；
+        on_promote 在成為 leader 後呼叫，參數為接手前最後讀到的共用快照（沒有時為 None）。
+        """
+        self._on_promote = on_promote
+        self.cache.scanning = False
+        await self._sync()
+        if self.lock.try_acquire():
+            await self._promote()
+            return
+        logger.info(f"以 follower 身分啟動 (pid {os.getpid()})，掃描由其他 worker 負責")
+        self._task = asyncio.ensure_future(self._follow())
+
+    async def _promote(self):
+        logger.info(f"已成為 leader (pid {os.getpid()})，由此行程負責掃描與通知")
+        self.cache.scanning = True
+        await self._on_promote(self.cache.latest)
+
+    async def _sync(self):
+        """讀取 leader 寫入的新快照並發布到本行程的快取"""
+        data = self.shared.read_if_changed()
+        if data is None:
+            return
+        await self.cache.publish(
+            [EventStatus(**event) for event in data["events"]],
+            [EventChange(**change) for change in data["changes"]],
+            taken_at=data["taken_at"],
+            published_at=data["published_at"],
+        )
+
+    async def _follow(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self._sync()
+                if self.lock.try_acquire():
+                    await self._promote()
+                    return
+            except Exception as e:
+                logger.error(f"同步共用快照失敗: {str(e)}", exc_info=True)
+
+    def publish(self, snapshot: Snapshot):
+        """leader 在每次掃描後寫入共用快照"""
+        if not self.is_leader:
+            return
+        try:
+            self.shared.write(snapshot)
+        except OSError as e:
+            logger.error(f"寫入共用快照失敗: {str(e)}")
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.lock.release()
+
+
+coordinator = Coordinator(snapshot_cache)
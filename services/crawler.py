@@ -0,0 +1,108 @@
+import asyncio
+import itertools
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+from services.tracing import span
+from config import (
+    LISTING_URL,
+    CRAWL_FOLDERS,
+    CRAWL_LEVELS,
+    CRAWL_ACTIVITY_DATES,
+    CRAWL_CONCURRENCY,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ListingPage(NamedTuple):
+    url: str
+    level: Optional[str]  # 列表頁的等級篩選，未指定時為 None
+
+
+class PageFetch(NamedTuple):
+    url: str
+    seconds: float
+    ok: bool
+    stale: bool  # 本次抓取失敗，沿用上次成功的內容
+
+
+def listing_pages(
+    folders: Sequence[str] = CRAWL_FOLDERS,
+    levels: Sequence[str] = CRAWL_LEVELS,
+    activity_dates: Sequence[str] = CRAWL_ACTIVITY_DATES,
+) -> List[ListingPage]:
+    """列出 folder × level × activity_date 所有組合的列表頁網址"""
+    pages = []
+    for folder, level, activity_date in itertools.product(folders, levels, activity_dates):
+        url = LISTING_URL.format(
+            folder=quote(folder.strip()),
+            level=quote(level.strip()),
+            activity_date=quote(activity_date.strip()),
+        )
+        pages.append(ListingPage(url, level.strip() or None))
+    return pages
+
+
+class Crawler:
+    """並行抓取多個列表頁
+
+    同時抓取的頁數以 semaphore 限制，整輪掃描的時間約等於最慢的一頁。
+    某頁抓取失敗時沿用該頁上次成功的內容，避免課程被誤判為下架後又重新通知。
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str], Awaitable[Optional[str]]],
+        pages: Optional[List[ListingPage]] = None,
+        concurrency: int = CRAWL_CONCURRENCY,
+    ):
+        self._fetch = fetch
+        self.pages = pages if pages is not None else listing_pages()
+        self.concurrency = concurrency
+        self._last_html: Dict[str, str] = {}
+        self.last_fetches: List[PageFetch] = []
+
+    async def _fetch_page(self, semaphore: asyncio.Semaphore, page: ListingPage) -> Tuple[Optional[str], PageFetch]:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                with span("listing_page", url=page.url):
+                    html_content = await self._fetch(page.url)
+            except Exception as e:
+                logger.warning(f"抓取列表頁失敗 {page.url}: {str(e)}")
+                html_content = None
+            seconds = round(time.perf_counter() - start, 3)
+
+        if html_content:
+            self._last_html[page.url] = html_content
+            return html_content, PageFetch(page.url, seconds, True, False)
+        stale = self._last_html.get(page.url)
+        return stale, PageFetch(page.url, seconds, False, stale is not None)
+
+    async def crawl(self) -> Optional[List[Tuple[str, Optional[str]]]]:
+        """抓取所有列表頁，回傳 (HTML, level) 列表；所有頁面都失敗時回傳 None"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        start = time.perf_counter()
+        results = await asyncio.gather(*(self._fetch_page(semaphore, page) for page in self.pages))
+        elapsed = time.perf_counter() - start
+
+        self.last_fetches = [fetch for _, fetch in results]
+        failed = [fetch.url for fetch in self.last_fetches if not fetch.ok]
+        slowest = max((fetch.seconds for fetch in self.last_fetches), default=0.0)
+        logger.info(
+            f"已抓取 {len(self.pages) - len(failed)}/{len(self.pages)} 個列表頁，"
+            f"耗時 {elapsed:.2f} 秒（最慢一頁 {slowest:.2f} 秒）"
+        )
+        if failed:
+            logger.warning(f"列表頁抓取失敗，沿用上次內容: {', '.join(failed)}")
+        if len(failed) == len(self.pages):
+            return None
+
+        return [
+            (html_content, page.level)
+            for page, (html_content, _) in zip(self.pages, results)
+            if html_content
+        ]
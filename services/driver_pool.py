@@ -0,0 +1,219 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+
+from selenium.common.exceptions import WebDriverException
+
+from services.browser import setup_driver, kill_driver
+from services.metrics import DRIVER_STARTUP_SECONDS, CHROME_PROCESSES, CHROME_KILLS
+from services.tracing import span
+from config import (
+    DRIVER_POOL_SIZE,
+    DRIVER_MAX_USES,
+    DRIVER_MAX_AGE,
+    DRIVER_CHECKOUT_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class PooledDriver:
+    """池中的 Chrome WebDriver 與其使用紀錄"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.created_at = time.monotonic()
+        self.uses = 0
+        self.logged_in = False
+        self.session = 0  # 借出時池的登入世代，歸還時已過期則視為未登入
+        self.killed = False  # 因逾時被強制結束，歸還時不放回池中
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.created_at
+
+
+class DriverPool:
+    """有上限的 Chrome WebDriver 池
+
+    借出前會做健康檢查，超過借出次數或存活時間的 Chrome 會被回收重開，
+    已登入的 Chrome 會優先借給需要登入狀態的呼叫者。
+    """
+
+    def __init__(
+        self,
+        size: int = DRIVER_POOL_SIZE,
+        max_uses: int = DRIVER_MAX_USES,
+        max_age: float = DRIVER_MAX_AGE,
+        checkout_timeout: float = DRIVER_CHECKOUT_TIMEOUT,
+        factory: Callable = setup_driver,
+    ):
+        self.size = size
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.checkout_timeout = checkout_timeout
+        self._factory = factory
+        self._idle: List[PooledDriver] = []
+        self._total = 0  # 閒置 + 借出中
+        self._closed = False
+        self._session = 0  # 每次清除 cookies 加一
+        self._cond = threading.Condition()
+
+    @property
+    def total(self) -> int:
+        return self._total
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    def _is_expired(self, entry: PooledDriver) -> bool:
+        return entry.uses >= self.max_uses or entry.age >= self.max_age
+
+    def _is_healthy(self, entry: PooledDriver) -> bool:
+        try:
+            entry.driver.execute_script("return 1")
+            return True
+        except WebDriverException as e:
+            logger.warning(f"Chrome 健康檢查失敗，將重新開啟: {str(e)}")
+            return False
+
+    def _destroy(self, entry: PooledDriver):
+        try:
+            if entry.killed:
+                # 行程已結束，只需清理 Service 的狀態
+                entry.driver.service.stop()
+            else:
+                entry.driver.quit()
+        except Exception as e:
+            logger.error(f"關閉 Chrome 失敗: {str(e)}")
+        finally:
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+
+    def _take_idle(self, prefer_logged_in: bool) -> PooledDriver:
+        """從閒置列表取出一個 Chrome，呼叫前需持有鎖"""
+        index = -1  # 後進先出，優先使用最近用過的 Chrome
+        if prefer_logged_in:
+            index = next((i for i in range(len(self._idle) - 1, -1, -1) if self._idle[i].logged_in), -1)
+        entry = self._idle.pop(index)
+        entry.session = self._session
+        return entry
+
+    def _reserve(self, prefer_logged_in: bool, deadline: float) -> Optional[PooledDriver]:
+        """取得閒置的 Chrome，或預留一個新 Chrome 的名額（回傳 None）"""
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Chrome 池已關閉")
+                if self._idle:
+                    return self._take_idle(prefer_logged_in)
+                if self._total < self.size:
+                    self._total += 1
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"等待可用 Chrome 超過 {self.checkout_timeout} 秒")
+                self._cond.wait(remaining)
+
+    def _create(self) -> PooledDriver:
+        try:
+            start = time.monotonic()
+            with span("driver_startup"):
+                driver = self._factory()
+            elapsed = time.monotonic() - start
+            DRIVER_STARTUP_SECONDS.observe(elapsed)
+            logger.info(f"已開啟新的 Chrome，耗時 {elapsed:.2f} 秒")
+            entry = PooledDriver(driver)
+            with self._cond:
+                entry.session = self._session
+            return entry
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            raise
+
+    def checkout(self, prefer_logged_in: bool = False, timeout: Optional[float] = None) -> PooledDriver:
+        """借出一個可用的 Chrome"""
+        deadline = time.monotonic() + (timeout if timeout is not None else self.checkout_timeout)
+        with span("driver_checkout"):
+            while True:
+                entry = self._reserve(prefer_logged_in, deadline)
+                if entry is None:
+                    entry = self._create()
+                elif self._is_expired(entry) or not self._is_healthy(entry):
+                    logger.info(f"回收 Chrome (使用 {entry.uses} 次，存活 {entry.age:.0f} 秒)")
+                    self._destroy(entry)
+                    continue
+                entry.uses += 1
+                return entry
+
+    def checkin(self, entry: PooledDriver, discard: bool = False):
+        """歸還 Chrome，損壞或過期的 Chrome 直接關閉"""
+        with self._cond:
+            if entry.session != self._session:
+                # 借出期間 cookies 已被清除，登入狀態不再有效
+                entry.logged_in = False
+            if not discard and not entry.killed and not self._closed and not self._is_expired(entry):
+                self._idle.append(entry)
+                self._cond.notify()
+                return
+        self._destroy(entry)
+
+    def kill(self, entry: PooledDriver):
+        """強制結束借出中卡住的 Chrome，借用者的 WebDriver 呼叫會立即失敗，歸還時直接關閉"""
+        entry.killed = True
+        killed = kill_driver(entry.driver)
+        CHROME_KILLS.inc()
+        logger.warning(f"已強制結束卡住的 Chrome ({killed} 個行程)")
+
+    @contextmanager
+    def borrow(self, prefer_logged_in: bool = False, timeout: Optional[float] = None):
+        """借用 Chrome 的 context manager，發生 WebDriver 錯誤時不放回池中"""
+        entry = self.checkout(prefer_logged_in=prefer_logged_in, timeout=timeout)
+        discard = False
+        try:
+            yield entry
+        except WebDriverException:
+            discard = True
+            raise
+        finally:
+            self.checkin(entry, discard=discard)
+
+    def warm_up(self, count: int):
+        """預先開啟 Chrome，讓第一次掃描不必等待冷啟動"""
+        entries = []
+        try:
+            for _ in range(min(count, self.size)):
+                entries.append(self.checkout())
+        except Exception as e:
+            logger.error(f"預熱 Chrome 失敗: {str(e)}")
+        for entry in entries:
+            entry.uses -= 1
+            self.checkin(entry)
+        logger.info(f"Chrome 池預熱完成，共 {len(entries)} 個")
+
+    def invalidate_sessions(self):
+        """清除 cookies 後，標記所有 Chrome 為未登入，借出中的在歸還時標記"""
+        with self._cond:
+            self._session += 1
+            for entry in self._idle:
+                entry.logged_in = False
+
+    def close(self):
+        """關閉池中所有閒置的 Chrome，借出中的會在歸還時關閉"""
+        with self._cond:
+            self._closed = True
+            entries, self._idle = self._idle, []
+            self._cond.notify_all()
+        for entry in entries:
+            self._destroy(entry)
+        logger.info("Chrome 池已關閉")
+
+
+driver_pool = DriverPool()
+CHROME_PROCESSES.set_function(lambda: driver_pool.total)
@@ -1,46 +1,117 @@
 import logging
-import re
-from typing import Optional, List, Union
+from typing import Any, Dict, Optional, List, Union
 from datetime import datetime
 import pytz
 import time
-from bs4 import BeautifulSoup
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.by import By
-from selenium.common.exceptions import TimeoutException
 
 from models.schemas import EventStatus
-from config import TARGET_URL
+from services.browser import block_resources, wait_for_cards, page_load_stats
+from services.driver_pool import driver_pool
+from services.changes import change_detector, ScanResult
+from services.parser import parse_cards, to_event_status, ACTIVITY_DATE_PATTERN
+from services.http_fetcher import http_fetcher
+from services.crawler import Crawler
+from services.metrics import PAGE_FETCH_SECONDS, BROWSER_PAGE_BYTES
+from services.tracing import span
+from services.supervisor import stage_timeout, lease_driver, run_stage, run_browser_stage, ScanTimeoutError
+from config import (
+    TARGET_URL,
+    HTTP_FETCH_ENABLED,
+    CRAWL_ENABLED,
+    BROWSER_LEAN,
+    PAGE_READY_TIMEOUT,
+    DRIVER_CHECKOUT_TIMEOUT,
+    HTTP_STAGE_TIMEOUT,
+    BROWSER_STAGE_TIMEOUT,
+)
 
 logger = logging.getLogger(__name__)
 
-def get_page_content(driver):
-    """獲取活動頁面內容"""
+# 最近一次瀏覽器載入的傳輸量與耗時，供 /status 顯示
+last_page_load: Dict[str, Any] = {}
+
+def get_page_content(driver, url: str = TARGET_URL):
+    """獲取活動頁面內容，載入統計記錄在 last_page_load"""
     try:
+        if BROWSER_LEAN:
+            block_resources(driver)
         # 訪問目標頁面
         logger.info("訪問活動頁面")
-        driver.get(TARGET_URL)
-        wait = WebDriverWait(driver, 20)
-        
-        try:
-            # 等待頁面載入
-            wait.until(EC.presence_of_element_located((
-                By.CLASS_NAME, "activity-card"
-            )))
-        except TimeoutException:
+        start = time.perf_counter()
+        with span("page_load"):
+            driver.get(url)
+
+        # 卡片數不再變化即視為載入完成，不再固定捲動後等待
+        with span("wait_cards"):
+            cards = wait_for_cards(driver, timeout=stage_timeout(PAGE_READY_TIMEOUT))
+        if not cards:
             logger.warning("等待活動列表超時，嘗試直接獲取頁面內容")
-        
-        # 滾動頁面以確保所有內容載入
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(2)
-        
-        return driver.page_source
+
+        with span("page_source"):
+            html_content = driver.page_source
+
+        stats = page_load_stats(driver)
+        stats.update(seconds=round(time.perf_counter() - start, 3), cards=cards, lean=BROWSER_LEAN)
+        if "transfer_bytes" in stats:
+            BROWSER_PAGE_BYTES.observe(stats["transfer_bytes"])
+        last_page_load.clear()
+        last_page_load.update(stats)
+        logger.info(f"瀏覽器載入 {cards} 張卡片，耗時 {stats['seconds']:.2f} 秒，傳輸 {stats.get('transfer_bytes', 0) / 1024:.0f} KB")
+        return html_content
         
     except Exception as e:
         logger.error(f"獲取頁面失敗: {str(e)}", exc_info=True)
         return None
 
+def get_page_content_with_pool(url: str = TARGET_URL):
+    """向 Chrome 池借用瀏覽器抓取活動頁面，會阻塞，需在瀏覽器執行緒中呼叫
+
+    借到的 Chrome 登記在本次瀏覽器階段，階段逾時時會被強制結束。
+    """
+    checkout_timeout = stage_timeout(DRIVER_CHECKOUT_TIMEOUT)
+    with driver_pool.borrow(prefer_logged_in=True, timeout=checkout_timeout) as pooled, lease_driver(pooled):
+        with PAGE_FETCH_SECONDS.labels("browser").time():
+            return get_page_content(pooled.driver, url)
+
+async def fetch_page_content(url: str = TARGET_URL) -> Optional[str]:
+    """優先以 HTTP 抓取活動頁面，取不到活動卡片、登入失效或逾時才改用瀏覽器
+
+    Raises:
+        ExecutorBusyError: 需要使用瀏覽器但瀏覽器工作佇列已滿
+        ScanTimeoutError: 瀏覽器抓取超過期限
+    """
+    if HTTP_FETCH_ENABLED:
+        with PAGE_FETCH_SECONDS.labels("http").time(), span("http_fetch"):
+            try:
+                html_content = await run_stage("http_fetch", http_fetcher.fetch_listing(url), HTTP_STAGE_TIMEOUT)
+            except ScanTimeoutError:
+                html_content = None
+        if html_content:
+            logger.info("已透過 HTTP 取得活動頁面")
+            return html_content
+        logger.info("改用瀏覽器抓取活動頁面")
+
+    with span("browser_fetch"):
+        return await run_browser_stage("browser_fetch", get_page_content_with_pool, url, limit=BROWSER_STAGE_TIMEOUT)
+
+crawler = Crawler(fetch_page_content)
+
+async def scan_events(url: str = TARGET_URL) -> Optional[ScanResult]:
+    """抓取活動頁面並比對上次結果，無法取得頁面時回傳 None
+
+    CRAWL_ENABLED 時改為並行抓取所有列表頁並合併結果。
+    """
+    if CRAWL_ENABLED:
+        pages = await crawler.crawl()
+        if not pages:
+            return None
+        return change_detector.update_pages(pages)
+
+    html_content = await fetch_page_content(url)
+    if not html_content:
+        return None
+    return change_detector.update(html_content)
+
 def parse_event(html_content: str, target_event: Optional[str] = None, target_date: Optional[str] = None) -> Optional[Union[EventStatus, List[EventStatus]]]:
     """解析課程資訊
     
@@ -60,65 +131,32 @@ def parse_event(html_content: str, target_event: Optional[str] = None, target_da
             logger.error(f"目標日期格式錯誤: {target_date}")
             return None
             
-    soup = BeautifulSoup(html_content, 'html.parser')
-    cards = soup.find_all('div', class_='activity-card')
-    
+    last_checked = datetime.now(pytz.timezone('Asia/Taipei')).strftime('%Y-%m-%d %H:%M:%S')
     events = []
-    for card in cards:
-        try:
-            name = card.find('h2').text.strip()
+    for card in parse_cards(html_content):
+        # 如果指定了課程名稱且不匹配，則跳過
+        if target_event and card.name != target_event:
+            continue
             
-            # 如果指定了課程名稱且不匹配，則跳過
-            if target_event and name != target_event:
+        # 使用正則表達式提取日期
+        if target_date:
+            match = ACTIVITY_DATE_PATTERN.search(card.event_date)
+            if not match:
+                logger.warning(f"無法從 {card.event_date} 提取日期")
                 continue
-                
-            location = card.find('h3').find('span').text.strip()
-            event_date = card.find('h4').text.strip()
-            
-            # 使用正則表達式提取日期
-            if target_date:
-                date_pattern = r"活動日期：(\d{4}/\d{2}/\d{2})"
-                match = re.search(date_pattern, event_date)
-                if not match:
-                    logger.warning(f"無法從 {event_date} 提取日期")
-                    continue
-                    
-                extracted_date = match.group(1)
-                if extracted_date != target_date:
-                    continue
-            
-            # 清理日期字串中的換行和多餘空格
-            event_date = ' '.join(event_date.split())
-            
-            reg_start = card.find_all('h4')[1].text.strip()
-            reg_end = card.find_all('h4')[2].text.strip()
-            
-            # 檢查狀態
-            state_full = card.find('b', class_='stateFull')
-            status = "已額滿" if state_full else "開放報名"
-            
-            event = EventStatus(
-                name=name,
-                location=location,
-                event_date=event_date,
-                registration_start=reg_start,
-                registration_end=reg_end,
-                status=status,
-                last_checked=datetime.now(pytz.timezone('Asia/Taipei')).strftime('%Y-%m-%d %H:%M:%S')
-            )
-            
-            # 如果指定了特定課程和日期，直接返回匹配的結果
-            if target_event and target_date:
-                return event
-            events.append(event)
-            
-        except Exception as e:
-            logger.error(f"解析活動卡片失敗: {str(e)}")
-            continue
+            if match.group(1) != target_date:
+                continue
+        
+        event = to_event_status(card, last_checked)
+        
+        # 如果指定了特定課程和日期，直接返回匹配的結果
+        if target_event and target_date:
+            return event
+        events.append(event)
     
     # 如果指定了搜尋條件但沒找到，返回None
     if (target_event or target_date) and not events:
         return None
         
     # 返回所有找到的課程
-    return events
\ No newline at end of file
+    return events
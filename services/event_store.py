@@ -0,0 +1,127 @@
+import bisect
+import logging
+from typing import Dict, Iterable, List, Optional, Set
+
+from models.schemas import EventStatus
+from services.parser import ACTIVITY_DATE_PATTERN
+
+logger = logging.getLogger(__name__)
+
+NAME_MATCH_EXACT = "exact"
+NAME_MATCH_PREFIX = "prefix"
+NAME_MATCH_CONTAINS = "contains"
+NAME_MATCH_MODES = (NAME_MATCH_EXACT, NAME_MATCH_PREFIX, NAME_MATCH_CONTAINS)
+
+
+def activity_date(event: EventStatus) -> Optional[str]:
+    """取出 YYYY/MM/DD 格式的活動日期，字串可直接比較大小"""
+    match = ACTIVITY_DATE_PATTERN.search(event.event_date)
+    return match.group(1) if match else None
+
+
+class EventStore:
+    """最新課程列表的記憶體索引
+
+    依課程名稱、活動日期、地點及狀態建立索引，每次掃描後整批重建。
+    """
+
+    def __init__(self):
+        self._events: List[EventStatus] = []
+        self._by_name: Dict[str, List[int]] = {}
+        self._by_date: Dict[str, List[int]] = {}
+        self._by_location: Dict[str, List[int]] = {}
+        self._by_status: Dict[str, List[int]] = {}
+        self._names: List[str] = []  # 已排序，供前綴搜尋
+        self._dates: List[str] = []  # 已排序，供日期區間搜尋
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def replace(self, events: List[EventStatus]):
+        """以新的課程列表重建所有索引"""
+        by_name: Dict[str, List[int]] = {}
+        by_date: Dict[str, List[int]] = {}
+        by_location: Dict[str, List[int]] = {}
+        by_status: Dict[str, List[int]] = {}
+        for i, event in enumerate(events):
+            by_name.setdefault(event.name, []).append(i)
+            by_location.setdefault(event.location, []).append(i)
+            by_status.setdefault(event.status, []).append(i)
+            date = activity_date(event)
+            if date:
+                by_date.setdefault(date, []).append(i)
+
+        # 最後一次指派，讀取端不會看到建到一半的索引
+        self._events = list(events)
+        self._by_name = by_name
+        self._by_date = by_date
+        self._by_location = by_location
+        self._by_status = by_status
+        self._names = sorted(by_name)
+        self._dates = sorted(by_date)
+
+    def _name_ids(self, name: str, mode: str) -> Set[int]:
+        if mode == NAME_MATCH_EXACT:
+            return set(self._by_name.get(name, ()))
+        if mode == NAME_MATCH_PREFIX:
+            names = self._names
+            start = bisect.bisect_left(names, name)
+            end = bisect.bisect_left(names, name + "\U0010ffff")
+            matched: Iterable[str] = names[start:end]
+        else:
+            matched = (n for n in self._names if name in n)
+        ids: Set[int] = set()
+        for n in matched:
+            ids.update(self._by_name[n])
+        return ids
+
+    def _date_ids(self, date_from: Optional[str], date_to: Optional[str]) -> Set[int]:
+        dates = self._dates
+        start = bisect.bisect_left(dates, date_from) if date_from else 0
+        end = bisect.bisect_right(dates, date_to) if date_to else len(dates)
+        ids: Set[int] = set()
+        for date in dates[start:end]:
+            ids.update(self._by_date[date])
+        return ids
+
+    def query(
+        self,
+        name: Optional[str] = None,
+        name_match: str = NAME_MATCH_EXACT,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        location: Optional[str] = None,
+        status: Optional[str] = None,
+    ) -> List[EventStatus]:
+        """回傳符合所有條件的課程，依頁面順序排列
+
+        Args:
+            name: 課程名稱
+            name_match: 名稱比對方式 exact / prefix / contains
+            date_from: 活動日期起 (YYYY/MM/DD，含)
+            date_to: 活動日期迄 (YYYY/MM/DD，含)
+            location: 活動地點
+            status: 課程狀態
+        """
+        if name_match not in NAME_MATCH_MODES:
+            raise ValueError(f"不支援的名稱比對方式: {name_match}")
+
+        candidates: List[Set[int]] = []
+        if name:
+            candidates.append(self._name_ids(name, name_match))
+        if date_from or date_to:
+            candidates.append(self._date_ids(date_from, date_to))
+        if location:
+            candidates.append(set(self._by_location.get(location, ())))
+        if status:
+            candidates.append(set(self._by_status.get(status, ())))
+
+        if not candidates:
+            return list(self._events)
+
+        candidates.sort(key=len)
+        ids = candidates[0].intersection(*candidates[1:])
+        return [self._events[i] for i in sorted(ids)]
+
+
+event_store = EventStore()
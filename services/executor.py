@@ -0,0 +1,68 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from config import BROWSER_WORKERS, BROWSER_MAX_PENDING
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorBusyError(Exception):
+    """瀏覽器工作佇列已滿"""
+
+
+class BrowserExecutor:
+    """在專用執行緒中執行會阻塞的 Selenium 工作，避免卡住 event loop
+
+    執行中加排隊的工作數超過上限時直接拒絕，由呼叫者回應 503。
+    """
+
+    def __init__(self, max_workers: int = BROWSER_WORKERS, max_pending: int = BROWSER_MAX_PENDING):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="browser")
+        self._lock = threading.Lock()
+        self._inflight = 0
+
+    @property
+    def inflight(self) -> int:
+        """執行中加排隊中的工作數"""
+        return self._inflight
+
+    def _release(self, _future):
+        with self._lock:
+            self._inflight -= 1
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """在瀏覽器執行緒中執行 func 並等待結果
+
+        Raises:
+            ExecutorBusyError: 佇列已滿
+        """
+        with self._lock:
+            if self._inflight >= self.max_workers + self.max_pending:
+                raise ExecutorBusyError(f"瀏覽器工作佇列已滿 ({self._inflight})")
+            self._inflight += 1
+
+        try:
+            # 帶著目前的 context 執行，追蹤的時間軸才能記錄執行緒中的階段
+            context = contextvars.copy_context()
+            future = self._executor.submit(context.run, functools.partial(func, *args, **kwargs))
+        except Exception:
+            with self._lock:
+                self._inflight -= 1
+            raise
+        # 工作在執行緒中真正結束才釋放名額，呼叫者取消等待也不會提早釋放
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        logger.info("瀏覽器執行緒已關閉")
+
+
+browser_executor = BrowserExecutor()
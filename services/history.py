@@ -0,0 +1,191 @@
+import logging
+import queue
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Set
+
+import pytz
+
+from models.schemas import EventStatus, EventChange, EventObservation, EventTransition
+from services.changes import event_key
+from config import HISTORY_DB_PATH, HISTORY_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS observations (
+    id INTEGER PRIMARY KEY,
+    observed_at TEXT NOT NULL,
+    event_key TEXT NOT NULL,
+    name TEXT NOT NULL,
+    location TEXT NOT NULL,
+    event_date TEXT NOT NULL,
+    registration_start TEXT NOT NULL,
+    registration_end TEXT NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_observations_name_time ON observations (name, observed_at);
+CREATE INDEX IF NOT EXISTS idx_observations_key_time ON observations (event_key, observed_at);
+
+CREATE TABLE IF NOT EXISTS transitions (
+    id INTEGER PRIMARY KEY,
+    changed_at TEXT NOT NULL,
+    event_key TEXT NOT NULL,
+    name TEXT NOT NULL,
+    location TEXT NOT NULL,
+    event_date TEXT NOT NULL,
+    type TEXT NOT NULL,
+    previous_status TEXT,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_transitions_name_time ON transitions (name, changed_at);
+
+CREATE TABLE IF NOT EXISTS notifications (
+    event_key TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    notified_at TEXT NOT NULL
+);
+"""
+
+INSERT_OBSERVATION = """
+INSERT INTO observations (observed_at, event_key, name, location, event_date,
+                          registration_start, registration_end, status)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+INSERT_TRANSITION = """
+INSERT INTO transitions (changed_at, event_key, name, location, event_date, type, previous_status, status)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+UPSERT_NOTIFICATION = "INSERT OR REPLACE INTO notifications (event_key, name, notified_at) VALUES (?, ?, ?)"
+DELETE_NOTIFICATION = "DELETE FROM notifications WHERE event_key = ?"
+
+
+def _now() -> str:
+    return datetime.now(pytz.timezone('Asia/Taipei')).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class HistoryStore:
+    """以 SQLite 保存課程觀測紀錄、狀態變化與通知紀錄
+
+    寫入都送進佇列，由單一背景執行緒批次寫入，不佔用請求與掃描的時間。
+    """
+
+    def __init__(self, db_path: Path = HISTORY_DB_PATH):
+        self.db_path = Path(db_path)
+        self._queue: "queue.Queue" = queue.Queue()
+        self._local = threading.local()
+        self._writer: Optional[threading.Thread] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def start(self):
+        """建立資料表並啟動寫入執行緒"""
+        if self._writer is not None:
+            return
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.close()
+        self._writer = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._writer.start()
+        logger.info(f"歷史紀錄資料庫: {self.db_path}")
+
+    def close(self):
+        """寫完佇列中剩餘的資料後停止寫入執行緒"""
+        if self._writer is None:
+            return
+        self._queue.put(None)
+        self._writer.join()
+        self._writer = None
+
+    def _run(self):
+        conn = self._connect()
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            # 把已排隊的工作併入同一個交易
+            while len(batch) < HISTORY_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                stopping = True
+                batch = [item for item in batch if item is not None]
+            try:
+                with conn:
+                    for sql, rows in batch:
+                        conn.executemany(sql, rows)
+            except sqlite3.Error as e:
+                logger.error(f"寫入歷史紀錄失敗: {str(e)}")
+        conn.close()
+
+    def _write(self, sql: str, rows: list):
+        if rows:
+            self._queue.put((sql, rows))
+
+    def record_scan(self, events: List[EventStatus], changes: List[EventChange], scanned_at: Optional[str] = None):
+        """記錄一次掃描的所有課程及狀態變化"""
+        scanned_at = scanned_at or _now()
+        self._write(INSERT_OBSERVATION, [
+            (event.last_checked, event_key(event), event.name, event.location, event.event_date,
+             event.registration_start, event.registration_end, event.status)
+            for event in events
+        ])
+        self._write(INSERT_TRANSITION, [
+            (scanned_at, event_key(change.event), change.event.name, change.event.location,
+             change.event.event_date, change.type, change.previous_status, change.event.status)
+            for change in changes
+        ])
+
+    def mark_notified(self, key: str, name: str):
+        self._write(UPSERT_NOTIFICATION, [(key, name, _now())])
+
+    def clear_notified(self, key: str):
+        self._write(DELETE_NOTIFICATION, [(key,)])
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def load_notified(self) -> Set[str]:
+        """讀取已發送過通知的課程，重新啟動後不會重複通知"""
+        if not self.db_path.exists():
+            return set()
+        rows = self._reader().execute("SELECT event_key FROM notifications").fetchall()
+        return {row["event_key"] for row in rows}
+
+    def get_observations(self, name: str, limit: int, offset: int = 0) -> List[EventObservation]:
+        """依時間由新到舊回傳課程的觀測紀錄"""
+        rows = self._reader().execute(
+            """
+            SELECT observed_at, name, location, event_date, registration_start, registration_end, status
+            FROM observations WHERE name = ? ORDER BY observed_at DESC, id DESC LIMIT ? OFFSET ?
+            """,
+            (name, limit, offset),
+        ).fetchall()
+        return [EventObservation(**dict(row)) for row in rows]
+
+    def get_transitions(self, name: str, limit: int, offset: int = 0) -> List[EventTransition]:
+        """依時間由新到舊回傳課程的狀態變化"""
+        rows = self._reader().execute(
+            """
+            SELECT changed_at, name, location, event_date, type, previous_status, status
+            FROM transitions WHERE name = ? ORDER BY changed_at DESC, id DESC LIMIT ? OFFSET ?
+            """,
+            (name, limit, offset),
+        ).fetchall()
+        return [EventTransition(**dict(row)) for row in rows]
+
+
+history_store = HistoryStore()
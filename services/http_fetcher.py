@@ -0,0 +1,79 @@
+import logging
+from typing import Optional
+
+import httpx
+
+from utils.cookie_manager import CookieManager, cookie_manager
+from config import TARGET_URL, USER_AGENT, HTTP_TIMEOUT, HTTP_MAX_CONNECTIONS
+
+logger = logging.getLogger(__name__)
+
+
+class SessionExpiredError(Exception):
+    """HTTP 請求被導回登入頁，表示保存的登入狀態已失效"""
+
+
+class HttpFetcher:
+    """以共用的 httpx.AsyncClient 直接抓取活動頁面，不啟動瀏覽器"""
+
+    def __init__(self, cookie_manager: CookieManager, timeout: float = HTTP_TIMEOUT):
+        self.cookie_manager = cookie_manager
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers={"User-Agent": USER_AGENT},
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+                ),
+            )
+        return self._client
+
+    async def fetch(self, url: str = TARGET_URL) -> str:
+        """抓取頁面 HTML
+
+        Raises:
+            SessionExpiredError: 被導向登入頁
+            httpx.HTTPError: 網路錯誤或非 2xx 回應
+        """
+        client = self._get_client()
+        with_cookies = self.cookie_manager.apply_to_client(client.cookies)
+        response = await client.get(url)
+        if "member_login.php" in str(response.url) or response.status_code in (401, 403):
+            self.cookie_manager.mark_session(False)
+            raise SessionExpiredError(f"登入狀態已失效: {response.url}")
+        response.raise_for_status()
+        # 帶著 cookies 成功取得頁面即證明登入狀態有效，省下一次探測請求；
+        # 沒有帶 cookies（登入已失效）時不能據此恢復登入狀態，否則下次掃描會略過需要的重新登入
+        if with_cookies:
+            self.cookie_manager.mark_session(True)
+        return response.text
+
+    async def fetch_listing(self, url: str = TARGET_URL) -> Optional[str]:
+        """抓取活動列表，回應中沒有活動卡片或登入失效時回傳 None"""
+        try:
+            html_content = await self.fetch(url)
+        except SessionExpiredError as e:
+            logger.warning(str(e))
+            return None
+        except httpx.HTTPError as e:
+            logger.warning(f"HTTP 抓取活動頁面失敗: {str(e)}")
+            return None
+
+        if "activity-card" not in html_content:
+            logger.info("HTTP 回應中沒有活動卡片")
+            return None
+        return html_content
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+http_fetcher = HttpFetcher(cookie_manager)
@@ -0,0 +1,52 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# 所有 Prometheus 指標集中在這裡定義，各模組只呼叫 observe / inc，每次只是幾次查表與加法；
+# 數量類的 gauge 以 set_function 在 /metrics 被讀取時才計算。
+
+# Chrome 冷啟動需數秒，頁面抓取與登入可能到數十秒
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+# 解析與 Telegram 發送通常在一秒內
+FAST_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+# 瀏覽器載入一頁的傳輸量，精簡設定下通常在數十 KB，完整載入可到數 MB
+BYTES_BUCKETS = (10e3, 50e3, 100e3, 250e3, 500e3, 1e6, 2.5e6, 5e6, 10e6)
+
+DRIVER_STARTUP_SECONDS = Histogram(
+    "wmg_driver_startup_seconds", "開啟一個新 Chrome 的耗時", buckets=SLOW_BUCKETS
+)
+PAGE_FETCH_SECONDS = Histogram(
+    "wmg_page_fetch_seconds", "抓取一個活動列表頁的耗時", ["source"], buckets=SLOW_BUCKETS
+)
+BROWSER_PAGE_BYTES = Histogram(
+    "wmg_browser_page_bytes", "瀏覽器載入一個活動列表頁的傳輸量", buckets=BYTES_BUCKETS
+)
+PARSE_SECONDS = Histogram(
+    "wmg_parse_seconds", "解析一次掃描所有列表頁的耗時", buckets=FAST_BUCKETS
+)
+SCAN_SECONDS = Histogram(
+    "wmg_scan_seconds", "一次排程掃描從抓取到發布快照的耗時", buckets=SLOW_BUCKETS
+)
+LOGIN_STAGE_SECONDS = Histogram(
+    "wmg_login_stage_seconds", "登入各階段的耗時", ["stage"], buckets=SLOW_BUCKETS
+)
+TELEGRAM_SEND_SECONDS = Histogram(
+    "wmg_telegram_send_seconds", "單次 Telegram sendMessage 請求的耗時", buckets=FAST_BUCKETS
+)
+
+CARDS_PARSED = Counter("wmg_cards_parsed_total", "從 HTML 重新解析的活動卡片數")
+CARDS_REUSED = Counter("wmg_cards_reused_total", "內容未變而沿用上次結果的活動卡片數")
+STATUS_TRANSITIONS = Counter("wmg_status_transitions_total", "課程狀態變化次數", ["type"])
+CAPTCHA_MISSES = Counter("wmg_captcha_misses_total", "驗證碼無法辨識或被網站判定錯誤的次數", ["reason"])
+LOGIN_ATTEMPTS = Counter("wmg_login_attempts_total", "登入結果", ["result"])
+LOGIN_RETRIES = Counter("wmg_login_retries_total", "表單登入重試次數")
+TELEGRAM_RETRIES = Counter("wmg_telegram_retries_total", "Telegram 發送重試次數", ["reason"])
+SCANS = Counter("wmg_scans_total", "排程掃描次數", ["result"])
+STREAM_MESSAGES = Counter("wmg_stream_messages_total", "推送給串流連線的訊息數（每則只計一次）", ["type"])
+STREAM_DROPPED = Counter("wmg_stream_dropped_total", "因接收過慢而中斷的串流連線數")
+SCAN_STAGE_TIMEOUTS = Counter("wmg_scan_stage_timeouts_total", "掃描階段超過期限被取消的次數", ["stage"])
+CHROME_KILLS = Counter("wmg_chrome_kills_total", "因掃描階段逾時被強制結束的 Chrome 數")
+SCAN_OVERRUNS = Counter("wmg_scan_overruns_total", "掃描耗時超過排程間隔、錯過的排程合併為一次的次數")
+
+CHROME_PROCESSES = Gauge("wmg_chrome_processes", "目前存在的 Chrome 數（閒置加借出中）")
+STREAM_CLIENTS = Gauge("wmg_stream_clients", "目前的 SSE 與 WebSocket 連線數")
+SCHEDULER_LAG_SECONDS = Gauge("wmg_scheduler_lag_seconds", "排程掃描實際執行時間與預定時間的差距")
+NEXT_SCAN_DELAY_SECONDS = Gauge("wmg_next_scan_delay_seconds", "距離下次掃描的秒數", ["mode"])
@@ -0,0 +1,198 @@
+import asyncio
+import html
+import logging
+import random
+import time
+from typing import Dict, Iterable, List, Optional
+
+import httpx
+
+from models.schemas import EventStatus
+from services.metrics import TELEGRAM_SEND_SECONDS, TELEGRAM_RETRIES
+from config import (
+    Settings,
+    TARGET_URL,
+    TELEGRAM_API_BASE,
+    TELEGRAM_CHAT_INTERVAL,
+    TELEGRAM_MAX_BACKOFF,
+    TELEGRAM_MESSAGE_LIMIT,
+    TELEGRAM_DRAIN_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def parse_chat_ids(value: Optional[str]) -> List[str]:
+    """TELEGRAM_CHAT_ID 可用逗號分隔多個聊天室"""
+    return [chat_id.strip() for chat_id in (value or "").split(",") if chat_id.strip()]
+
+
+def format_event(event: EventStatus) -> str:
+    return (
+        f"課程名稱：{html.escape(event.name)}\n"
+        f"活動地點：{html.escape(event.location)}\n"
+        f"{html.escape(event.event_date)}\n"
+        f"目前狀態：⭐ 開放報名中 ⭐"
+    )
+
+
+def format_openings(events: List[EventStatus]) -> List[str]:
+    """將同一次掃描的開放課程合併成訊息，超過長度上限時拆成多則"""
+    footer = f"\n\n快去報名吧！\n🔗 報名連結：{TARGET_URL}"
+    if len(events) == 1:
+        header = "🎯 <b>課程報名開放通知！</b>\n\n"
+    else:
+        header = f"🎯 <b>課程報名開放通知！</b>（{len(events)} 門課程）\n\n"
+
+    messages = []
+    blocks: List[str] = []
+    length = len(header) + len(footer)
+    for block in (format_event(event) for event in events):
+        if blocks and length + len(block) + 2 > TELEGRAM_MESSAGE_LIMIT:
+            messages.append(header + "\n\n".join(blocks) + footer)
+            blocks, length = [], len(header) + len(footer)
+        blocks.append(block)
+        length += len(block) + 2
+    if blocks:
+        messages.append(header + "\n\n".join(blocks) + footer)
+    return messages
+
+
+class TelegramNotifier:
+    """Telegram 通知佇列
+
+    共用一個長連線的 httpx.AsyncClient，每個聊天室一個佇列與背景工作，
+    依 TELEGRAM_CHAT_INTERVAL 控制發送頻率，遇到 429 依 retry_after 等待、
+    網路錯誤或 5xx 以指數退避重試，訊息不會因暫時性錯誤而遺失。
+    """
+
+    def __init__(
+        self,
+        token: Optional[str] = Settings.TELEGRAM_BOT_TOKEN,
+        chat_ids: Optional[List[str]] = None,
+        api_base: str = TELEGRAM_API_BASE,
+        chat_interval: float = TELEGRAM_CHAT_INTERVAL,
+    ):
+        self.token = token
+        self.chat_ids = chat_ids if chat_ids is not None else parse_chat_ids(Settings.TELEGRAM_CHAT_ID)
+        self.api_base = api_base.rstrip("/")
+        self.chat_interval = chat_interval
+        self._client: Optional[httpx.AsyncClient] = None
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._last_sent: Dict[str, float] = {}
+        self._started = False
+
+    @property
+    def url(self) -> str:
+        return f"{self.api_base}/bot{self.token}/sendMessage"
+
+    @property
+    def pending(self) -> int:
+        return sum(q.qsize() for q in self._queues.values())
+
+    async def start(self):
+        self._client = httpx.AsyncClient(timeout=10, limits=httpx.Limits(max_keepalive_connections=5))
+        self._started = True
+        for chat_id in self._queues:
+            self._ensure_worker(chat_id)
+
+    def _ensure_worker(self, chat_id: str):
+        if self._started and chat_id not in self._workers:
+            self._workers[chat_id] = asyncio.ensure_future(self._run(chat_id))
+
+    def send(self, text: str, chat_ids: Optional[Iterable[str]] = None):
+        """將訊息放入佇列，不等待發送完成"""
+        for chat_id in chat_ids or self.chat_ids:
+            if chat_id not in self._queues:
+                self._queues[chat_id] = asyncio.Queue()
+            self._queues[chat_id].put_nowait(text)
+            self._ensure_worker(chat_id)
+
+    def notify_openings(self, events: List[EventStatus], chat_ids: Optional[Iterable[str]] = None):
+        """同一次掃描的開放課程合併成一則通知"""
+        if not events:
+            return
+        chat_ids = list(chat_ids or self.chat_ids)
+        for message in format_openings(events):
+            self.send(message, chat_ids)
+        logger.debug(f"已排入 {len(events)} 門課程的開放通知")
+
+    async def _run(self, chat_id: str):
+        queue = self._queues[chat_id]
+        while True:
+            text = await queue.get()
+            try:
+                await self._deliver(chat_id, text)
+            except Exception as e:
+                logger.error(f"Telegram 通知發送失敗 ({chat_id}): {str(e)}", exc_info=True)
+            finally:
+                queue.task_done()
+
+    async def _throttle(self, chat_id: str):
+        wait = self._last_sent.get(chat_id, 0) + self.chat_interval - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def _deliver(self, chat_id: str, text: str):
+        """發送單則訊息，暫時性錯誤持續重試直到成功"""
+        attempt = 0
+        while True:
+            await self._throttle(chat_id)
+            self._last_sent[chat_id] = time.monotonic()
+            start = time.perf_counter()
+            try:
+                response = await self._client.post(self.url, json={
+                    "chat_id": chat_id,
+                    "text": text,
+                    "parse_mode": "HTML"
+                })
+            except httpx.HTTPError as e:
+                TELEGRAM_RETRIES.labels("network").inc()
+                delay = self._backoff(attempt)
+                logger.warning(f"Telegram 連線失敗，{delay:.1f} 秒後重試: {str(e)}")
+            else:
+                TELEGRAM_SEND_SECONDS.observe(time.perf_counter() - start)
+                if response.status_code == 429:
+                    TELEGRAM_RETRIES.labels("rate_limited").inc()
+                    try:
+                        delay = float(response.json()["parameters"]["retry_after"])
+                    except Exception:
+                        delay = self._backoff(attempt)
+                    logger.warning(f"Telegram 速率限制，{delay:.1f} 秒後重試")
+                elif response.status_code >= 500:
+                    TELEGRAM_RETRIES.labels("server_error").inc()
+                    delay = self._backoff(attempt)
+                    logger.warning(f"Telegram 伺服器錯誤 {response.status_code}，{delay:.1f} 秒後重試")
+                elif response.is_error:
+                    # 其餘 4xx 代表訊息或設定有誤，重試也不會成功
+                    logger.error(f"Telegram 拒絕訊息 ({chat_id}): {response.status_code} {response.text}")
+                    return
+                else:
+                    logger.debug("Telegram 通知發送成功")
+                    return
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def _backoff(self, attempt: int) -> float:
+        return min(TELEGRAM_MAX_BACKOFF, 2 ** attempt) * (0.5 + random.random() / 2)
+
+    async def close(self, timeout: float = TELEGRAM_DRAIN_TIMEOUT):
+        """等待佇列送完（最多 timeout 秒）後關閉連線"""
+        if self._queues:
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(*(q.join() for q in self._queues.values())), timeout
+                )
+            except asyncio.TimeoutError:
+                logger.warning(f"關閉時仍有 {self.pending} 則通知未送出")
+        for worker in self._workers.values():
+            worker.cancel()
+        self._workers.clear()
+        self._started = False
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+notifier = TelegramNotifier()
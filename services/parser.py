@@ -0,0 +1,169 @@
+import importlib.util
+import logging
+import re
+from typing import Iterator, NamedTuple, Optional
+
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+
+from models.schemas import EventStatus
+from config import PARSER_BACKEND
+
+logger = logging.getLogger(__name__)
+
+
+def _has_card_class(value) -> bool:
+    # 解析途中 class 仍是未分割的字串，例如 "col activity-card"
+    if not value:
+        return False
+    classes = value.split() if isinstance(value, str) else value
+    return 'activity-card' in classes
+
+
+# 只建立活動卡片的子樹，略過頁首、頁尾與其他內容
+CARD_STRAINER = SoupStrainer('div', class_=_has_card_class)
+ACTIVITY_DATE_PATTERN = re.compile(r"活動日期：(\d{4}/\d{2}/\d{2})")
+
+STATUS_OPEN = "開放報名"
+STATUS_FULL = "已額滿"
+
+
+class CardFields(NamedTuple):
+    """單張活動卡片的欄位"""
+    name: str
+    location: str
+    event_date: str  # 原始活動日期文字，未清理空白
+    registration_start: str
+    registration_end: str
+    status: str
+
+
+def resolve_backend(backend: Optional[str] = None) -> str:
+    """決定 BeautifulSoup 使用的解析器"""
+    backend = backend or PARSER_BACKEND
+    if backend != "auto":
+        return backend
+    return "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+
+
+def extract_card(card: Tag) -> CardFields:
+    """走訪一次卡片子樹取得所有欄位，缺少必要欄位時拋出例外"""
+    h2 = h3 = state_full = None
+    h4s = []
+    for tag in card.descendants:
+        if not isinstance(tag, Tag):
+            continue
+        name = tag.name
+        if name == 'h4':
+            h4s.append(tag)
+        elif name == 'h2':
+            if h2 is None:
+                h2 = tag
+        elif name == 'h3':
+            if h3 is None:
+                h3 = tag
+        elif name == 'b' and state_full is None and 'stateFull' in tag.get('class', ()):
+            state_full = tag
+
+    if h2 is None:
+        raise ValueError("缺少課程名稱")
+    if h3 is None or h3.find('span') is None:
+        raise ValueError("缺少活動地點")
+    if len(h4s) < 3:
+        raise ValueError(f"日期欄位不足: {len(h4s)}")
+
+    return CardFields(
+        name=h2.text.strip(),
+        location=h3.find('span').text.strip(),
+        event_date=h4s[0].text.strip(),
+        registration_start=h4s[1].text.strip(),
+        registration_end=h4s[2].text.strip(),
+        status=STATUS_FULL if state_full is not None else STATUS_OPEN,
+    )
+
+
+def find_cards(html_content: str, backend: Optional[str] = None):
+    """只解析活動卡片子樹並回傳所有卡片節點"""
+    soup = BeautifulSoup(html_content, resolve_backend(backend), parse_only=CARD_STRAINER)
+    return soup.find_all('div', class_='activity-card')
+
+
+def _lxml_text(element) -> str:
+    return element.text_content().strip()
+
+
+def extract_card_lxml(card) -> CardFields:
+    """與 extract_card 相同的欄位規則，直接走訪 lxml 的元素，不經過 BeautifulSoup 建樹"""
+    h2 = h3 = state_full = None
+    h4s = []
+    for tag in card.iterdescendants():
+        name = tag.tag
+        if name == 'h4':
+            h4s.append(tag)
+        elif name == 'h2':
+            if h2 is None:
+                h2 = tag
+        elif name == 'h3':
+            if h3 is None:
+                h3 = tag
+        elif name == 'b' and state_full is None and 'stateFull' in (tag.get('class') or '').split():
+            state_full = tag
+
+    span = next(h3.iterdescendants('span'), None) if h3 is not None else None
+    if h2 is None:
+        raise ValueError("缺少課程名稱")
+    if span is None:
+        raise ValueError("缺少活動地點")
+    if len(h4s) < 3:
+        raise ValueError(f"日期欄位不足: {len(h4s)}")
+
+    return CardFields(
+        name=_lxml_text(h2),
+        location=_lxml_text(span),
+        event_date=_lxml_text(h4s[0]),
+        registration_start=_lxml_text(h4s[1]),
+        registration_end=_lxml_text(h4s[2]),
+        status=STATUS_FULL if state_full is not None else STATUS_OPEN,
+    )
+
+
+def find_cards_lxml(html_content: str):
+    """以 lxml 解析並回傳所有活動卡片元素（包含片段本身就是卡片的情況）"""
+    from lxml import html as lxml_html
+
+    if not html_content.strip():
+        return []
+    root = lxml_html.fromstring(html_content)
+    return [div for div in root.iter('div') if _has_card_class(div.get('class'))]
+
+
+def parse_cards(html_content: str, backend: Optional[str] = None) -> Iterator[CardFields]:
+    """逐張解析活動卡片，無法解析的卡片會記錄錯誤並略過
+
+    lxml 可用時直接以 lxml 走訪元素，BeautifulSoup 建樹的成本比 lxml 解析本身高數倍；否則以 html.parser 只建卡片子樹。
+    """
+    if resolve_backend(backend) == "lxml":
+        cards, extract = find_cards_lxml(html_content), extract_card_lxml
+    else:
+        cards, extract = find_cards(html_content, backend), extract_card
+    for card in cards:
+        try:
+            yield extract(card)
+        except Exception as e:
+            logger.error(f"解析活動卡片失敗: {str(e)}")
+
+
+def to_event_status(card: CardFields, last_checked: str, level: Optional[str] = None) -> EventStatus:
+    """將卡片欄位轉為 EventStatus，活動日期會清理換行和多餘空格
+
+    卡片本身沒有等級欄位，level 由抓取時的列表頁篩選條件決定。
+    """
+    return EventStatus(
+        name=card.name,
+        location=card.location,
+        event_date=' '.join(card.event_date.split()),
+        registration_start=card.registration_start,
+        registration_end=card.registration_end,
+        status=card.status,
+        last_checked=last_checked,
+        level=level or None,
+    )
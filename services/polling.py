@@ -0,0 +1,92 @@
+import logging
+import random
+import re
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Iterable, NamedTuple, Optional
+
+import pytz
+
+from models.schemas import EventStatus
+from config import (
+    SCAN_INTERVAL,
+    SCAN_INTERVAL_ACTIVE,
+    SCAN_INTERVAL_BURST,
+    SCAN_BURST_BEFORE,
+    SCAN_BURST_AFTER,
+    SCAN_ACTIVE_LEAD,
+    SCAN_JITTER,
+)
+
+logger = logging.getLogger(__name__)
+
+TAIPEI = pytz.timezone('Asia/Taipei')
+DATETIME_PATTERN = re.compile(r"(\d{4})/(\d{1,2})/(\d{1,2})(?:\D+?(\d{1,2}):(\d{2}))?")
+
+MODE_IDLE = "idle"
+MODE_ACTIVE = "active"
+MODE_BURST = "burst"
+
+
+class PollingPlan(NamedTuple):
+    delay: float  # 距離下次掃描的秒數，已加上隨機浮動
+    mode: str
+    reason: str
+
+
+@lru_cache(maxsize=4096)
+def parse_registration_time(text: str, end_of_day: bool = False) -> Optional[datetime]:
+    """從「報名開始：2025/01/13 10:00」之類的文字取出台北時間，沒有時間時取當天起點或終點"""
+    match = DATETIME_PATTERN.search(text)
+    if not match:
+        return None
+    year, month, day, hour, minute = match.groups()
+    try:
+        if hour is None:
+            parsed = datetime(int(year), int(month), int(day), 23 if end_of_day else 0, 59 if end_of_day else 0)
+        else:
+            parsed = datetime(int(year), int(month), int(day), int(hour), int(minute))
+    except ValueError:
+        return None
+    return TAIPEI.localize(parsed)
+
+
+def _jitter(seconds: float) -> float:
+    return max(1.0, seconds * (1 + random.uniform(-SCAN_JITTER, SCAN_JITTER)))
+
+
+def plan_next_scan(events: Iterable[EventStatus], now: Optional[datetime] = None) -> PollingPlan:
+    """依各課程的報名時段決定下次掃描的時間
+
+    - 任一課程的報名開始時間在密集時段內：SCAN_INTERVAL_BURST
+    - 有課程正在報名期間，或即將在 SCAN_ACTIVE_LEAD 內開放：SCAN_INTERVAL_ACTIVE
+    - 其他情況：SCAN_INTERVAL，但不會睡過下一個密集時段的起點
+    """
+    now = now or datetime.now(TAIPEI)
+    burst_before = timedelta(seconds=SCAN_BURST_BEFORE)
+    burst_after = timedelta(seconds=SCAN_BURST_AFTER)
+    active_lead = timedelta(seconds=SCAN_ACTIVE_LEAD)
+
+    mode, reason = MODE_IDLE, "附近沒有報名時段"
+    next_burst: Optional[datetime] = None
+    for event in events:
+        start = parse_registration_time(event.registration_start)
+        end = parse_registration_time(event.registration_end, end_of_day=True)
+        if start is None:
+            continue
+        if start - burst_before <= now <= start + burst_after:
+            return PollingPlan(_jitter(SCAN_INTERVAL_BURST), MODE_BURST, f"{event.name} 於 {start:%m/%d %H:%M} 開放報名")
+        if now < start - burst_before and (next_burst is None or start - burst_before < next_burst):
+            next_burst = start - burst_before
+        if mode == MODE_IDLE:
+            if now < start <= now + active_lead:
+                mode, reason = MODE_ACTIVE, f"{event.name} 即將於 {start:%m/%d %H:%M} 開放報名"
+            elif start <= now and (end is None or now <= end):
+                mode, reason = MODE_ACTIVE, f"{event.name} 報名中"
+
+    interval = SCAN_INTERVAL_ACTIVE if mode == MODE_ACTIVE else SCAN_INTERVAL
+    delay = _jitter(interval)
+    if next_burst is not None:
+        # 不要睡過密集時段的起點
+        delay = max(1.0, min(delay, (next_burst - now).total_seconds()))
+    return PollingPlan(delay, mode, reason)
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional
+
+import pytz
+
+from models.schemas import EventStatus, EventChange
+from services.changes import ScanResult
+from services.event import scan_events
+from services.supervisor import scan_supervisor
+from services.tracing import span
+from config import SNAPSHOT_TTL
+
+logger = logging.getLogger(__name__)
+
+
+class Snapshot:
+    """某次掃描解析出的課程列表與相對上次掃描的狀態變化"""
+
+    def __init__(
+        self,
+        events: List[EventStatus],
+        changes: Optional[List[EventChange]] = None,
+        taken_at: Optional[str] = None,
+        published_at: Optional[float] = None,
+    ):
+        self.events = events
+        self.changes = changes or []
+        # 由其他 worker 掃描的快照沿用原本的時間，age 從實際掃描時算起
+        self.published_at = published_at if published_at is not None else time.time()
+        self.created_at = time.monotonic() - max(0.0, time.time() - self.published_at)
+        self.taken_at = taken_at or datetime.now(pytz.timezone('Asia/Taipei')).strftime('%Y-%m-%d %H:%M:%S')
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.created_at
+
+
+class SnapshotCache:
+    """保存最新掃描結果的快取
+
+    排程掃描會發布新的快照；API 在快照過期時觸發更新，
+    同一時間只會有一個更新在進行，其他呼叫者共用其結果。
+    不論由誰觸發，每個新快照都會交給所有訂閱者處理。
+    scanning 為 False 時（多 worker 部署的 follower）不自行掃描，快照只來自 publish。
+    """
+
+    def __init__(self, loader: Callable[[], Awaitable[Optional[ScanResult]]], ttl: float = SNAPSHOT_TTL):
+        self._loader = loader
+        self.ttl = ttl
+        self._snapshot: Optional[Snapshot] = None
+        self._inflight: Optional[asyncio.Future] = None
+        self._subscribers: List[Callable[[Snapshot], Awaitable[None]]] = []
+        self.scanning = True
+
+    def subscribe(self, callback: Callable[[Snapshot], Awaitable[None]]):
+        """註冊新快照發布後要執行的 async 函式"""
+        self._subscribers.append(callback)
+
+    @property
+    def latest(self) -> Optional[Snapshot]:
+        return self._snapshot
+
+    async def publish(
+        self,
+        events: List[EventStatus],
+        changes: Optional[List[EventChange]] = None,
+        taken_at: Optional[str] = None,
+        published_at: Optional[float] = None,
+    ) -> Snapshot:
+        snapshot = Snapshot(events, changes, taken_at, published_at)
+        self._snapshot = snapshot
+        for callback in self._subscribers:
+            try:
+                with span(callback.__name__):
+                    await callback(snapshot)
+            except Exception as e:
+                logger.error(f"處理快照失敗: {str(e)}", exc_info=True)
+        return snapshot
+
+    async def _load(self) -> Optional[Snapshot]:
+        try:
+            result = await self._loader()
+            if result is None:
+                return None
+            return await self.publish(result.events, result.changes)
+        finally:
+            self._inflight = None
+
+    async def refresh(self) -> Optional[Snapshot]:
+        """重新掃描並發布快照，掃描失敗時回傳 None；不自行掃描時回傳目前的快照"""
+        if not self.scanning:
+            return self._snapshot
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._load())
+        else:
+            logger.debug("共用進行中的掃描")
+        # shield 避免單一呼叫者取消時中斷共用的掃描
+        return await asyncio.shield(self._inflight)
+
+    async def get(self, max_age: Optional[float] = None) -> Optional[Snapshot]:
+        """取得未超過 max_age 秒的快照，過期時更新；更新失敗則回傳舊快照"""
+        max_age = self.ttl if max_age is None else max_age
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.age <= max_age:
+            return snapshot
+        return await self.refresh() or snapshot
+
+
+snapshot_cache = SnapshotCache(scan_supervisor.supervise(scan_events))
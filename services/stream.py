@@ -0,0 +1,152 @@
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, List, NamedTuple, Optional, Set
+
+from services.metrics import STREAM_CLIENTS, STREAM_DROPPED, STREAM_MESSAGES
+from services.snapshot import Snapshot
+from config import STREAM_QUEUE_SIZE, STREAM_HEARTBEAT
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_SNAPSHOT = "snapshot"  # 完整課程列表，連線時與掃描結果尚未送達過時傳送
+MESSAGE_DELTA = "delta"  # 一次掃描的狀態變化（opened / filled / new / removed）
+MESSAGE_DROPPED = "dropped"  # 接收太慢而被中斷，客戶端重新連線後會收到新的完整列表
+
+
+class StreamMessage(NamedTuple):
+    type: str
+    seq: int
+    data: str  # 已編碼的 JSON，同一則訊息只序列化一次，所有客戶端共用
+
+
+class StreamClient:
+    """一個 SSE 或 WebSocket 連線的待送訊息佇列"""
+
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.has_baseline = False  # 是否已收到完整列表，之後只需要差異
+
+    def offer(self, message: Optional[StreamMessage]) -> bool:
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def close(self, message: Optional[StreamMessage] = None):
+        """清空佇列並放入結束標記，message 為結束前最後送出的訊息"""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        if message is not None:
+            self.queue.put_nowait(message)
+        self.queue.put_nowait(None)
+
+
+class StreamHub:
+    """將掃描結果推送給所有串流連線
+
+    客戶端連線時收到一次完整課程列表，之後每次掃描只收到狀態變化。
+    每則訊息只編碼一次再放進各客戶端的有界佇列，發布端不等待任何客戶端；
+    佇列已滿代表客戶端接收太慢，直接中斷該連線，不讓它拖慢其他客戶端或累積記憶體。
+    """
+
+    def __init__(self, queue_size: int = STREAM_QUEUE_SIZE):
+        self.queue_size = max(2, queue_size)  # 中斷時需放入 dropped 訊息與結束標記
+        self._clients: Set[StreamClient] = set()
+        self._seq = 0
+        self._snapshot: Optional[Snapshot] = None
+        self._snapshot_message: Optional[StreamMessage] = None
+
+    @property
+    def client_count(self) -> int:
+        return len(self._clients)
+
+    def _encode(self, message_type: str, **payload) -> StreamMessage:
+        data = json.dumps({"type": message_type, "seq": self._seq, **payload}, ensure_ascii=False)
+        STREAM_MESSAGES.labels(message_type).inc()
+        return StreamMessage(message_type, self._seq, data)
+
+    def _full_message(self) -> StreamMessage:
+        """目前快照的完整列表，編碼結果保留到下一個快照發布"""
+        if self._snapshot_message is None:
+            snapshot = self._snapshot
+            self._snapshot_message = self._encode(
+                MESSAGE_SNAPSHOT,
+                taken_at=snapshot.taken_at,
+                events=[event.model_dump() for event in snapshot.events],
+            )
+        return self._snapshot_message
+
+    def connect(self) -> StreamClient:
+        """建立連線，已有快照時先放入完整列表，否則在第一次掃描完成時送出"""
+        client = StreamClient(self.queue_size)
+        if self._snapshot is not None:
+            client.offer(self._full_message())
+            client.has_baseline = True
+        self._clients.add(client)
+        return client
+
+    def disconnect(self, client: StreamClient):
+        self._clients.discard(client)
+
+    def publish(self, snapshot: Snapshot):
+        """送出本次掃描的狀態變化，尚未收到完整列表的客戶端改送完整列表"""
+        self._snapshot = snapshot
+        self._snapshot_message = None
+        self._seq += 1
+        delta: Optional[StreamMessage] = None
+        slow: List[StreamClient] = []
+        for client in self._clients:
+            if not client.has_baseline:
+                message = self._full_message()
+                client.has_baseline = True
+            elif snapshot.changes:
+                if delta is None:
+                    delta = self._encode(
+                        MESSAGE_DELTA,
+                        taken_at=snapshot.taken_at,
+                        changes=[change.model_dump() for change in snapshot.changes],
+                    )
+                message = delta
+            else:
+                continue
+            if not client.offer(message):
+                slow.append(client)
+
+        if not slow:
+            return
+        dropped = self._encode(MESSAGE_DROPPED, reason="接收速度過慢，請重新連線")
+        for client in slow:
+            self._clients.discard(client)
+            client.close(dropped)
+            STREAM_DROPPED.inc()
+        logger.warning(f"已中斷 {len(slow)} 個接收過慢的串流連線")
+
+    def close(self):
+        """結束所有連線，關閉服務時呼叫"""
+        for client in self._clients:
+            client.close()
+        self._clients.clear()
+
+    async def messages(self, client: StreamClient, heartbeat: float = STREAM_HEARTBEAT) -> AsyncIterator[Optional[StreamMessage]]:
+        """依序取出客戶端的訊息，超過 heartbeat 秒沒有訊息時產生 None 作為保持連線用"""
+        while True:
+            try:
+                message = await asyncio.wait_for(client.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            if message is None:
+                return
+            yield message
+
+
+def format_sse(message: Optional[StreamMessage]) -> str:
+    if message is None:
+        return ": keepalive\n\n"
+    return f"event: {message.type}\nid: {message.seq}\ndata: {message.data}\n\n"
+
+
+stream_hub = StreamHub()
+STREAM_CLIENTS.set_function(lambda: stream_hub.client_count)
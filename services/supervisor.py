@@ -0,0 +1,214 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from services.driver_pool import driver_pool, PooledDriver
+from services.executor import browser_executor
+from services.metrics import SCAN_STAGE_TIMEOUTS, SCHEDULER_LAG_SECONDS, SCAN_OVERRUNS
+from config import SCAN_DEADLINE, SCAN_MIN_GAP
+
+logger = logging.getLogger(__name__)
+
+STAGE_SCAN = "scan"  # 整次掃描的期限，各階段之外的保險
+
+
+class ScanTimeoutError(Exception):
+    """掃描階段超過期限被取消"""
+
+    def __init__(self, stage: str, timeout: float):
+        super().__init__(f"{stage} 超過期限 ({timeout:.1f} 秒)")
+        self.stage = stage
+        self.timeout = timeout
+
+
+class ScanBudget:
+    """一次掃描的總期限，各階段的期限不超過剩餘時間"""
+
+    def __init__(self, total: float):
+        self.total = total
+        self.deadline = time.monotonic() + total
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.monotonic())
+
+    def limit(self, stage_limit: float) -> float:
+        return min(stage_limit, self.remaining())
+
+
+class BrowserLease:
+    """瀏覽器階段借用中的 Chrome
+
+    瀏覽器執行緒借到 Chrome 後登記在這裡；階段逾時時在背景執行緒強制結束該 Chrome，
+    執行緒中卡住的 WebDriver 呼叫隨即失敗，執行緒與池的名額都會釋放。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entry: Optional[PooledDriver] = None
+        self.expired = False
+
+    def attach(self, entry: PooledDriver):
+        with self._lock:
+            if self.expired:
+                # 等到 Chrome 時階段已逾時，直接歸還，不再使用
+                raise ScanTimeoutError("browser_checkout", 0)
+            self._entry = entry
+
+    def detach(self):
+        with self._lock:
+            self._entry = None
+
+    def expire(self) -> Optional[PooledDriver]:
+        """標記逾時，回傳需要強制結束的 Chrome
+
+        強制結束可能要等上數秒，由呼叫端在其他執行緒進行，不在持有鎖時或 event loop 上等待。
+        """
+        with self._lock:
+            self.expired = True
+            entry, self._entry = self._entry, None
+            if entry is not None:
+                # 先標記，執行緒在強制結束前歸還時也不會放回池中
+                entry.killed = True
+            return entry
+
+
+_current_budget: contextvars.ContextVar[Optional[ScanBudget]] = contextvars.ContextVar("scan_budget", default=None)
+_current_lease: contextvars.ContextVar[Optional[BrowserLease]] = contextvars.ContextVar("browser_lease", default=None)
+
+def stage_timeout(limit: float) -> float:
+    """階段的秒數上限：掃描中時不超過本次掃描的剩餘時間"""
+    budget = _current_budget.get()
+    return limit if budget is None else budget.limit(limit)
+
+@contextmanager
+def lease_driver(entry: PooledDriver):
+    """在瀏覽器執行緒中登記借到的 Chrome，讓逾時的階段能強制結束它"""
+    lease = _current_lease.get()
+    if lease is None:
+        yield entry
+        return
+    lease.attach(entry)
+    try:
+        yield entry
+    finally:
+        lease.detach()
+
+async def run_stage(stage: str, awaitable: Awaitable, limit: float) -> Any:
+    """在期限內等待一個掃描階段，逾時時取消並拋出 ScanTimeoutError"""
+    timeout = stage_timeout(limit)
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        SCAN_STAGE_TIMEOUTS.labels(stage).inc()
+        logger.warning(f"掃描階段 {stage} 超過期限 ({timeout:.1f} 秒)，已取消")
+        raise ScanTimeoutError(stage, timeout) from None
+
+async def run_browser_stage(stage: str, func: Callable, *args, limit: float) -> Any:
+    """在瀏覽器執行緒中執行 func，逾時或被取消時強制結束其借用的 Chrome
+
+    Raises:
+        ExecutorBusyError: 瀏覽器工作佇列已滿
+        ScanTimeoutError: 超過期限
+    """
+    lease = BrowserLease()
+    token = _current_lease.set(lease)
+    try:
+        # 建立 task 時複製目前的 context，瀏覽器執行緒才看得到這次的 lease
+        task = asyncio.ensure_future(browser_executor.run(func, *args))
+    finally:
+        _current_lease.reset(token)
+    try:
+        return await run_stage(stage, task, limit)
+    except (ScanTimeoutError, asyncio.CancelledError):
+        entry = lease.expire()
+        if entry is not None:
+            asyncio.get_running_loop().run_in_executor(None, driver_pool.kill, entry)
+        raise
+
+
+class ScanSupervisor:
+    """監督掃描的期限與排程
+
+    每次掃描有 SCAN_DEADLINE 秒的總期限，由各階段分用；排程依預定時間固定步調執行，
+    掃描超過間隔時錯過的排程合併為一次，並記錄實際執行與預定時間的差距。
+    """
+
+    def __init__(self, deadline: float = SCAN_DEADLINE, min_gap: float = SCAN_MIN_GAP):
+        self.deadline = deadline
+        self.min_gap = min_gap
+        self.last_scan: Dict[str, Any] = {}
+        self.lag: Optional[float] = None
+        self.next_run_at: Optional[datetime] = None
+        self.overruns = 0
+
+    def supervise(self, loader: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        """以總期限包裝掃描函式，逾時時拋出 ScanTimeoutError"""
+
+        @functools.wraps(loader)
+        async def supervised(*args, **kwargs):
+            budget = ScanBudget(self.deadline)
+            token = _current_budget.set(budget)
+            result, stage = "failed", None
+            try:
+                # 總期限稍晚於各階段的期限，只在階段之外（例如解析）卡住時才觸發
+                scanned = await asyncio.wait_for(loader(*args, **kwargs), self.deadline + 1)
+                result = "ok" if scanned is not None else "failed"
+                return scanned
+            except asyncio.TimeoutError:
+                SCAN_STAGE_TIMEOUTS.labels(STAGE_SCAN).inc()
+                result, stage = "timeout", STAGE_SCAN
+                raise ScanTimeoutError(STAGE_SCAN, self.deadline) from None
+            except ScanTimeoutError as e:
+                result, stage = "timeout", e.stage
+                raise
+            finally:
+                _current_budget.reset(token)
+                self.last_scan = {
+                    "result": result,
+                    "timed_out_stage": stage,
+                    "seconds": round(budget.total - budget.remaining(), 3),
+                    "deadline": budget.total,
+                }
+
+        return supervised
+
+    def started(self, now: datetime):
+        """排程掃描開始時記錄與預定時間的差距"""
+        if self.next_run_at is None:
+            return
+        self.lag = max(0.0, (now - self.next_run_at).total_seconds())
+        SCHEDULER_LAG_SECONDS.set(self.lag)
+
+    def plan_next(self, started_at: datetime, delay: float, now: datetime) -> datetime:
+        """以本次預定時間加上間隔安排下一次掃描
+
+        掃描耗時超過間隔時不補跑錯過的次數，只在 min_gap 秒後執行一次；
+        預定時間雖未錯過但距離現在不到 min_gap 秒時，只延後到 min_gap 秒後，不計為超時。
+        """
+        planned = (self.next_run_at or started_at) + timedelta(seconds=delay)
+        if planned < now:
+            missed = int((now - planned).total_seconds() // delay) + 1 if delay > 0 else 1
+            self.overruns += 1
+            SCAN_OVERRUNS.inc()
+            logger.warning(f"掃描耗時超過間隔 {delay:.0f} 秒，錯過的 {missed} 次排程合併為一次")
+        planned = max(planned, now + timedelta(seconds=self.min_gap))
+        self.next_run_at = planned
+        return planned
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "deadline": self.deadline,
+            "last_scan": self.last_scan,
+            "lag_seconds": None if self.lag is None else round(self.lag, 3),
+            "next_run_at": self.next_run_at.isoformat() if self.next_run_at else None,
+            "overruns": self.overruns,
+        }
+
+
+scan_supervisor = ScanSupervisor()
@@ -0,0 +1,209 @@
+import collections
+import contextvars
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Counter, Deque, Dict, List, Optional
+
+import pytz
+
+from config import TRACING_ENABLED, TRACE_BUFFER_SIZE, PROFILE_DIR, PROFILE_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+KIND_SCAN = "scan"
+KIND_REQUEST = "request"
+
+
+class Trace:
+    """一次掃描或 API 請求的時間軸"""
+
+    def __init__(self, name: str, kind: str):
+        self.name = name
+        self.kind = kind
+        self.started_at = datetime.now(pytz.timezone('Asia/Taipei')).strftime('%Y-%m-%d %H:%M:%S')
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+        self.profile: Optional[str] = None
+        self.attrs: dict = {}
+        self.spans: List[dict] = []
+        self._start = time.perf_counter()
+
+    def add_span(self, name: str, start: float, end: float, depth: int, attrs: dict):
+        # list.append 是原子操作，瀏覽器執行緒可直接寫入
+        self.spans.append({
+            "name": name,
+            "start_ms": round((start - self._start) * 1000, 1),
+            "duration_ms": round((end - start) * 1000, 1),
+            "depth": depth,
+            "thread": threading.current_thread().name,
+            **attrs,
+        })
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 1) if self.duration is not None else None,
+            "error": self.error,
+            "profile": self.profile,
+            **self.attrs,
+            "spans": sorted(self.spans, key=lambda span: span["start_ms"]),
+        }
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("current_trace", default=None)
+_span_depth: contextvars.ContextVar[int] = contextvars.ContextVar("span_depth", default=0)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """記錄一段階段的耗時；沒有進行中的追蹤時不做任何事"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    depth = _span_depth.get()
+    token = _span_depth.set(depth + 1)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _span_depth.reset(token)
+        trace.add_span(name, start, time.perf_counter(), depth, attrs)
+
+
+class SamplingProfiler:
+    """以背景執行緒定時擷取所有執行緒的呼叫堆疊
+
+    結果為 folded stack 格式（每行「堆疊;以;分號;分隔 次數」），可直接交給 flamegraph.pl 或 speedscope。
+    只在擷取時讀取 sys._current_frames，不會像 cProfile 一樣拖慢每次函式呼叫，也涵蓋瀏覽器執行緒。
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self.samples: Counter[str] = collections.Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def dump(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def top_functions(self, limit: int = 15) -> List[dict]:
+        """依最內層函式統計樣本數"""
+        leaves: Counter[str] = collections.Counter()
+        for stack, count in self.samples.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(self.samples.values()) or 1
+        return [
+            {"function": function, "samples": count, "ratio": round(count / total, 3)}
+            for function, count in leaves.most_common(limit)
+        ]
+
+
+class Tracer:
+    """保存最近的掃描與 API 請求時間軸，並可為下一次掃描開啟取樣分析"""
+
+    def __init__(self, enabled: bool = TRACING_ENABLED, buffer_size: int = TRACE_BUFFER_SIZE, profile_dir: Path = PROFILE_DIR):
+        self.enabled = enabled
+        self.profile_dir = Path(profile_dir)
+        self._buffers: Dict[str, Deque[Trace]] = {
+            KIND_SCAN: collections.deque(maxlen=buffer_size),
+            KIND_REQUEST: collections.deque(maxlen=buffer_size),
+        }
+        self._profile_next = False
+        self.last_profile: Optional[dict] = None
+
+    def request_profile(self):
+        """下一次掃描時開啟取樣分析"""
+        self._profile_next = True
+
+    @property
+    def profile_pending(self) -> bool:
+        return self._profile_next
+
+    @contextmanager
+    def trace(self, name: str, kind: str = KIND_SCAN):
+        """追蹤一次掃描或請求；掃描時若已要求分析則同時開啟取樣分析"""
+        profiler = None
+        if kind == KIND_SCAN and self._profile_next:
+            self._profile_next = False
+            profiler = SamplingProfiler()
+            profiler.start()
+
+        if not self.enabled and profiler is None:
+            yield None
+            return
+
+        trace = Trace(name, kind)
+        token = _current_trace.set(trace)
+        try:
+            yield trace
+        except BaseException as e:
+            trace.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_trace.reset(token)
+            trace.duration = time.perf_counter() - trace._start
+            if profiler is not None:
+                profiler.stop()
+                self._save_profile(trace, profiler)
+            self._buffers[kind].append(trace)
+
+    def _save_profile(self, trace: Trace, profiler: SamplingProfiler):
+        path = self.profile_dir / f"scan-{datetime.now():%Y%m%d-%H%M%S}.folded"
+        try:
+            profiler.dump(path)
+        except OSError as e:
+            logger.error(f"保存分析結果失敗: {str(e)}")
+            return
+        trace.profile = str(path)
+        self.last_profile = {
+            "path": str(path),
+            "started_at": trace.started_at,
+            "samples": sum(profiler.samples.values()),
+            "top": profiler.top_functions(),
+        }
+        logger.info(f"掃描分析結果已保存: {path}")
+
+    def recent(self, kind: str, limit: int) -> List[dict]:
+        """由新到舊回傳最近的時間軸"""
+        traces = list(self._buffers[kind])[-limit:]
+        return [trace.to_dict() for trace in reversed(traces)]
+
+
+tracer = Tracer()
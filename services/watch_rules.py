@@ -0,0 +1,340 @@
+import bisect
+import fcntl
+import json
+import logging
+import os
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import AbstractSet, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from models.schemas import EventStatus, WatchRule, WatchRuleInput
+from services.event_store import activity_date, NAME_MATCH_MODES, NAME_MATCH_EXACT, NAME_MATCH_PREFIX
+from config import WATCH_RULES_PATH
+
+logger = logging.getLogger(__name__)
+
+DATE_MIN = ""
+DATE_MAX = "9999/99/99"
+
+
+def validate_rule(rule: WatchRuleInput):
+    """檢查規則內容，有誤時拋出 ValueError"""
+    if rule.name_match not in NAME_MATCH_MODES:
+        raise ValueError(f"name_match 必須是 {', '.join(NAME_MATCH_MODES)} 之一")
+    if rule.name_match != NAME_MATCH_EXACT and not rule.name:
+        raise ValueError(f"name_match 為 {rule.name_match} 時必須提供 name")
+    for date in (rule.date_from, rule.date_to):
+        if date:
+            try:
+                datetime.strptime(date, "%Y/%m/%d")
+            except ValueError:
+                raise ValueError(f"日期格式錯誤: {date}")
+    if rule.date_from and rule.date_to and rule.date_from > rule.date_to:
+        raise ValueError("date_from 不可晚於 date_to")
+
+
+class IntervalTree:
+    """靜態的中心點區間樹，查詢包含某一點的所有區間
+
+    區間為閉區間，端點可以是任何可比較大小的值（這裡是 YYYY/MM/DD 字串）。
+    """
+
+    __slots__ = ("center", "by_start", "by_end", "left", "right")
+
+    def __init__(self, intervals: Sequence[Tuple[str, str, int]]):
+        points = sorted(p for start, end, _ in intervals for p in (start, end))
+        self.center = points[len(points) // 2]
+        left, right, here = [], [], []
+        for interval in intervals:
+            if interval[1] < self.center:
+                left.append(interval)
+            elif interval[0] > self.center:
+                right.append(interval)
+            else:
+                here.append(interval)
+        self.by_start = sorted(here, key=lambda i: i[0])
+        self.by_end = sorted(here, key=lambda i: i[1], reverse=True)
+        self.left = IntervalTree(left) if left else None
+        self.right = IntervalTree(right) if right else None
+
+    def stab(self, point: str) -> Set[int]:
+        """回傳包含 point 的區間值"""
+        found: Set[int] = set()
+        node = self
+        while node is not None:
+            if point < node.center:
+                for start, _, value in node.by_start:
+                    if start > point:
+                        break
+                    found.add(value)
+                node = node.left
+            elif point > node.center:
+                for _, end, value in node.by_end:
+                    if end < point:
+                        break
+                    found.add(value)
+                node = node.right
+            else:
+                found.update(value for _, _, value in node.by_start)
+                break
+        return found
+
+
+class NameIndex:
+    """課程名稱索引：完全相符用雜湊、前綴依長度查表、包含比對以樣式的第一個雙字元索引"""
+
+    def __init__(self):
+        self.exact: Dict[str, Set[int]] = {}
+        self.prefix: Dict[str, Set[int]] = {}
+        self.prefix_lengths: List[int] = []
+        self.chars: Dict[str, Set[int]] = {}  # 單一字元的包含比對
+        self.bigrams: Dict[str, List[Tuple[str, int]]] = {}
+
+    def add(self, rule: WatchRule, i: int):
+        if rule.name_match == NAME_MATCH_EXACT:
+            self.exact.setdefault(rule.name, set()).add(i)
+        elif rule.name_match == NAME_MATCH_PREFIX:
+            self.prefix.setdefault(rule.name, set()).add(i)
+            if len(rule.name) not in self.prefix_lengths:
+                bisect.insort(self.prefix_lengths, len(rule.name))
+        elif len(rule.name) == 1:
+            self.chars.setdefault(rule.name, set()).add(i)
+        else:
+            self.bigrams.setdefault(rule.name[:2], []).append((rule.name, i))
+
+    def lookup(self, name: str) -> Set[int]:
+        found = set(self.exact.get(name, ()))
+        for length in self.prefix_lengths:
+            if length > len(name):
+                break
+            found.update(self.prefix.get(name[:length], ()))
+        if self.chars:
+            for char in set(name):
+                found.update(self.chars.get(char, ()))
+        if self.bigrams:
+            for bigram in {name[j:j + 2] for j in range(len(name) - 1)}:
+                for pattern, i in self.bigrams.get(bigram, ()):
+                    if pattern in name:
+                        found.add(i)
+        return found
+
+
+class RuleGroup:
+    """限制相同欄位的一組規則，只為有限制的欄位建立索引"""
+
+    def __init__(self, signature: Tuple[bool, bool, bool, bool], rules: List[Tuple[int, WatchRule]]):
+        self.has_name, self.has_location, self.has_level, self.has_date = signature
+        self.ids = [i for i, _ in rules]
+        self.names = NameIndex()
+        self.locations: Dict[str, Set[int]] = {}
+        self.levels: Dict[str, Set[int]] = {}
+        intervals: List[Tuple[str, str, int]] = []
+        for i, rule in rules:
+            if self.has_name:
+                self.names.add(rule, i)
+            if self.has_location:
+                self.locations.setdefault(rule.location, set()).add(i)
+            if self.has_level:
+                self.levels.setdefault(rule.level, set()).add(i)
+            if self.has_date:
+                intervals.append((rule.date_from or DATE_MIN, rule.date_to or DATE_MAX, i))
+        self.dates = IntervalTree(intervals) if intervals else None
+
+    def match(self, event: EventStatus, date: Optional[str]) -> Iterable[int]:
+        hits: List[AbstractSet[int]] = []
+        # 先查成本低的雜湊索引，任一條件沒有命中就提早結束
+        if self.has_location:
+            hit = self.locations.get(event.location)
+            if not hit:
+                return ()
+            hits.append(hit)
+        if self.has_level:
+            hit = self.levels.get(event.level) if event.level else None
+            if not hit:
+                return ()
+            hits.append(hit)
+        if self.has_date:
+            if date is None:
+                return ()
+            hit = self.dates.stab(date)
+            if not hit:
+                return ()
+            hits.append(hit)
+        if self.has_name:
+            hit = self.names.lookup(event.name)
+            if not hit:
+                return ()
+            hits.append(hit)
+        if not hits:
+            return self.ids
+        hits.sort(key=len)
+        return hits[0].intersection(*hits[1:])
+
+
+class CompiledRules:
+    """啟用中規則的索引，建立後不再修改
+
+    規則依限制的欄位（名稱、地點、等級、日期）分成最多 16 組，每組只為有限制的欄位
+    建立索引，比對一門課程就是在每組內取各索引命中集合的交集，成本與規則總數無關。
+    """
+
+    def __init__(self, rules: List[WatchRule]):
+        self.rules = rules
+        grouped: Dict[Tuple[bool, bool, bool, bool], List[Tuple[int, WatchRule]]] = {}
+        for i, rule in enumerate(rules):
+            signature = (bool(rule.name), bool(rule.location), bool(rule.level), bool(rule.date_from or rule.date_to))
+            grouped.setdefault(signature, []).append((i, rule))
+        self.groups = [RuleGroup(signature, members) for signature, members in grouped.items()]
+
+    def match(self, event: EventStatus) -> List[int]:
+        """回傳符合這門課程的規則編號，依規則順序排列"""
+        date = activity_date(event)
+        matched: List[int] = []
+        for group in self.groups:
+            matched.extend(group.match(event, date))
+        matched.sort()
+        return matched
+
+
+class WatchRuleEngine:
+    """監控規則的保存與比對
+
+    規則保存在 JSON 檔，每次修改後整批重新編譯索引；讀取端只會看到完整的索引。
+    多個 worker 共用同一個檔案：讀取前以一次 stat 檢查檔案是否被其他 worker 修改過，
+    修改時持有檔案鎖並先讀入最新內容，不會蓋掉其他 worker 的變更。
+    """
+
+    def __init__(self, path: Path = WATCH_RULES_PATH):
+        self.path = Path(path)
+        self._rules: List[WatchRule] = []
+        self._compiled = CompiledRules([])
+        self._stat_key: Optional[tuple] = None
+
+    def __len__(self) -> int:
+        return len(self._compiled.rules)
+
+    def _file_key(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def load(self):
+        """讀取保存的規則"""
+        self._stat_key = self._file_key()
+        try:
+            if self.path.exists():
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._rules = [WatchRule(**data) for data in json.load(f)]
+        except Exception as e:
+            logger.error(f"讀取監控規則失敗: {str(e)}")
+            self._rules = []
+        self._compile()
+        logger.info(f"已載入 {len(self._rules)} 條監控規則，啟用 {len(self)} 條")
+
+    def refresh(self):
+        """規則檔自上次讀取後被修改過（例如由其他 worker）時重新讀取"""
+        if self._file_key() != self._stat_key:
+            self.load()
+
+    @contextmanager
+    def _locked(self):
+        """修改規則時持有的跨行程鎖，取得鎖後先讀入最新的規則"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_suffix(".lock"), "a") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                self.refresh()
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _save(self):
+        """先寫暫存檔再取代，避免中斷時留下寫一半的檔案"""
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump([rule.model_dump() for rule in self._rules], f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+        self._stat_key = self._file_key()
+
+    def _compile(self):
+        self._compiled = CompiledRules([rule for rule in self._rules if rule.enabled])
+
+    def _commit(self, rules: List[WatchRule]):
+        self._rules = rules
+        self._compile()
+        self._save()
+
+    def list(self) -> List[WatchRule]:
+        self.refresh()
+        return list(self._rules)
+
+    def get(self, rule_id: str) -> Optional[WatchRule]:
+        self.refresh()
+        return next((rule for rule in self._rules if rule.id == rule_id), None)
+
+    def add(self, rule: WatchRuleInput) -> WatchRule:
+        validate_rule(rule)
+        created = WatchRule(id=uuid.uuid4().hex[:12], **rule.model_dump())
+        with self._locked():
+            self._commit(self._rules + [created])
+        return created
+
+    def replace_all(self, rules: Iterable[WatchRuleInput]) -> List[WatchRule]:
+        """以新的規則列表取代全部規則"""
+        rules = list(rules)
+        for rule in rules:
+            validate_rule(rule)
+        created = [WatchRule(id=uuid.uuid4().hex[:12], **rule.model_dump()) for rule in rules]
+        with self._locked():
+            self._commit(created)
+        return created
+
+    def update(self, rule_id: str, rule: WatchRuleInput) -> Optional[WatchRule]:
+        validate_rule(rule)
+        updated = WatchRule(id=rule_id, **rule.model_dump())
+        with self._locked():
+            if all(r.id != rule_id for r in self._rules):
+                return None
+            self._commit([updated if r.id == rule_id else r for r in self._rules])
+        return updated
+
+    def delete(self, rule_id: str) -> bool:
+        with self._locked():
+            rules = [r for r in self._rules if r.id != rule_id]
+            if len(rules) == len(self._rules):
+                return False
+            self._commit(rules)
+        return True
+
+    def match(self, event: EventStatus) -> List[WatchRule]:
+        """回傳符合這門課程的啟用規則"""
+        self.refresh()
+        compiled = self._compiled
+        return [compiled.rules[i] for i in compiled.match(event)]
+
+    def route(self, events: List[EventStatus], default_chat_ids: List[str]) -> Dict[str, List[EventStatus]]:
+        """依規則決定每門課程要通知的聊天室，回傳 {chat_id: 課程列表}
+
+        沒有任何啟用規則時所有課程都通知預設聊天室；規則未指定聊天室時也使用預設聊天室。
+        """
+        self.refresh()
+        routed: Dict[str, List[EventStatus]] = {}
+        compiled = self._compiled
+        for event in events:
+            if not compiled.rules:
+                chat_ids: Iterable[str] = default_chat_ids
+            else:
+                chat_ids = {}
+                for i in compiled.match(event):
+                    # dict 保留順序並去除重複
+                    chat_ids.update(dict.fromkeys(compiled.rules[i].chat_ids or default_chat_ids))
+            for chat_id in chat_ids:
+                routed.setdefault(chat_id, []).append(event)
+        return routed
+
+
+watch_engine = WatchRuleEngine()
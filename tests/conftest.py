@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.schemas import EventStatus  # noqa: E402
+
+
+@pytest.fixture
+def make_event():
+    """建立測試用的 EventStatus，未指定的欄位使用固定值"""
+
+    def make(name="游泳-初級", location="板橋第一運動場", date="2025/03/01", status="開放報名", **fields):
+        return EventStatus(
+            name=name,
+            location=location,
+            event_date=f"活動日期：{date} (六) 10:00",
+            registration_start=fields.pop("registration_start", "報名開始：2025/01/10 10:00"),
+            registration_end=fields.pop("registration_end", "報名截止：2025/02/10 23:59"),
+            status=status,
+            last_checked=fields.pop("last_checked", "2025-01-01 00:00:00"),
+            **fields,
+        )
+
+    return make
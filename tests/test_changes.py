@@ -0,0 +1,98 @@
+from services.changes import (
+    ChangeDetector,
+    split_cards,
+    CHANGE_NEW,
+    CHANGE_OPENED,
+    CHANGE_FILLED,
+    CHANGE_REMOVED,
+)
+from services.event import parse_event
+
+
+def card(name, full=False, location="板橋第一運動場", date="2025/03/01"):
+    state = '<b class="state stateFull">已額滿</b>' if full else '<b class="state">報名</b>'
+    return f"""<div class="col-md-4 activity-card">
+<h2> {name} </h2>
+<h3>活動地點：<span> {location} </span></h3>
+<h4>活動日期：{date}
+  (六) 10:00</h4>
+<h4>報名開始：2025/01/10 10:00</h4>
+<h4>報名截止：2025/02/10 23:59</h4>
+{state}
+</div>
+"""
+
+
+def page(*cards):
+    return "<html><body><header>頁首</header>" + "".join(cards) + "<footer>頁尾</footer></body></html>"
+
+
+def change_types(result):
+    return sorted((change.type, change.event.name) for change in result.changes)
+
+
+def test_split_cards_one_fragment_per_card():
+    html = page(card("游泳"), card("田徑"))
+    fragments = split_cards(html)
+    assert len(fragments) == 2
+    assert "游泳" in fragments[0] and "田徑" in fragments[1]
+
+
+def test_first_scan_reports_every_card_as_new():
+    result = ChangeDetector().update(page(card("游泳"), card("田徑", full=True)))
+    assert change_types(result) == [(CHANGE_NEW, "游泳"), (CHANGE_NEW, "田徑")]
+    assert [event.status for event in result.events] == ["開放報名", "已額滿"]
+
+
+def test_status_transitions_and_removal():
+    detector = ChangeDetector()
+    detector.update(page(card("游泳", full=True), card("田徑"), card("射箭")))
+    result = detector.update(page(card("游泳"), card("田徑", full=True)))
+    assert change_types(result) == [
+        (CHANGE_FILLED, "田徑"),
+        (CHANGE_OPENED, "游泳"),
+        (CHANGE_REMOVED, "射箭"),
+    ]
+    opened = next(change for change in result.changes if change.type == CHANGE_OPENED)
+    assert opened.previous_status == "已額滿"
+
+
+def test_unchanged_page_is_not_reparsed():
+    detector = ChangeDetector()
+    html = page(card("游泳"))
+    detector.update(html)
+    result = detector.update(html)
+    assert result.unchanged
+    assert result.changes == []
+    assert len(result.events) == 1
+
+
+def test_matches_parse_event_on_single_page():
+    html = page(card("游泳"), card("游泳"), card("田徑", full=True))
+    result = ChangeDetector().update(html)
+    def fields(events):
+        return [event.model_dump(exclude={"last_checked"}) for event in events]
+
+    assert fields(result.events) == fields(parse_event(html))
+
+
+def test_same_page_duplicates_are_tracked_separately():
+    detector = ChangeDetector()
+    detector.update(page(card("游泳"), card("游泳")))
+    result = detector.update(page(card("游泳")))
+    assert change_types(result) == [(CHANGE_REMOVED, "游泳")]
+
+
+def test_cards_repeated_across_pages_are_merged_with_level():
+    html = page(card("游泳"))
+    result = ChangeDetector().update_pages([(html, None), (html, "初級")])
+    assert len(result.events) == 1
+    assert result.events[0].level == "初級"
+
+
+def test_restore_uses_previous_events_as_baseline():
+    previous = ChangeDetector().update(page(card("游泳", full=True), card("田徑"))).events
+    detector = ChangeDetector()
+    detector.restore(previous)
+    result = detector.update(page(card("游泳"), card("田徑")))
+    assert change_types(result) == [(CHANGE_OPENED, "游泳")]
@@ -0,0 +1,63 @@
+import asyncio
+
+from services.coordination import Coordinator, LeaderLock, SharedSnapshotFile, ROLE_FOLLOWER, ROLE_LEADER
+from services.snapshot import SnapshotCache
+
+
+async def no_scan():
+    return None
+
+
+def make_coordinator(tmp_path):
+    return Coordinator(
+        SnapshotCache(no_scan),
+        LeaderLock(tmp_path / "leader.lock"),
+        SharedSnapshotFile(tmp_path / "snapshot.json"),
+        poll_interval=0.01,
+    )
+
+
+def test_leader_lock_is_exclusive(tmp_path):
+    first, second = LeaderLock(tmp_path / "leader.lock"), LeaderLock(tmp_path / "leader.lock")
+    assert first.try_acquire()
+    assert not second.try_acquire()
+    first.release()
+    assert second.try_acquire()
+    second.release()
+
+
+def test_follower_syncs_and_takes_over(tmp_path, make_event):
+    async def run():
+        leader, follower = make_coordinator(tmp_path), make_coordinator(tmp_path)
+        promoted = []
+
+        async def on_promote(snapshot):
+            promoted.append(snapshot)
+
+        await leader.start(on_promote)
+        await follower.start(on_promote)
+        assert (leader.role, follower.role) == (ROLE_LEADER, ROLE_FOLLOWER)
+        assert not follower.cache.scanning
+
+        snapshot = await leader.cache.publish([make_event("游泳-初級")])
+        leader.publish(snapshot)
+        follower.publish(snapshot)  # follower 不寫入共用快照
+        for _ in range(100):
+            if follower.cache.latest is not None:
+                break
+            await asyncio.sleep(0.01)
+        assert [event.name for event in follower.cache.latest.events] == ["游泳-初級"]
+        assert follower.cache.latest.taken_at == snapshot.taken_at
+
+        # leader 結束後 follower 接手，並拿到接手前最後的快照
+        leader.stop()
+        for _ in range(100):
+            if follower.is_leader:
+                break
+            await asyncio.sleep(0.01)
+        assert follower.role == ROLE_LEADER and follower.cache.scanning
+        assert promoted[-1] is follower.cache.latest
+        assert follower.shared.seq == leader.shared.seq
+        follower.stop()
+
+    asyncio.run(run())
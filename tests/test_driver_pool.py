@@ -0,0 +1,41 @@
+from services.driver_pool import DriverPool
+
+
+class FakeDriver:
+    def execute_script(self, script):
+        return 1
+
+    def quit(self):
+        pass
+
+
+def make_pool(size=2):
+    return DriverPool(size=size, max_uses=100, max_age=3600, checkout_timeout=1, factory=FakeDriver)
+
+
+def test_prefers_logged_in_driver():
+    pool = make_pool()
+    with pool.borrow() as first, pool.borrow() as second:
+        second.logged_in = True
+    with pool.borrow(prefer_logged_in=True) as entry:
+        assert entry is second
+    assert pool.total == 2
+
+
+def test_invalidate_sessions_covers_borrowed_drivers():
+    pool = make_pool()
+    with pool.borrow() as idle:
+        idle.logged_in = True
+    with pool.borrow(prefer_logged_in=True) as borrowed:
+        assert borrowed is idle
+        with pool.borrow() as other:
+            other.logged_in = True
+        # 借出中清除 cookies
+        pool.invalidate_sessions()
+        assert not other.logged_in
+    assert not borrowed.logged_in
+
+    # 清除之後登入的 Chrome 仍視為已登入
+    with pool.borrow() as entry:
+        entry.logged_in = True
+    assert entry.logged_in
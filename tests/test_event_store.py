@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routes.api import router
+from services.event_store import EventStore, event_store
+from services.snapshot import snapshot_cache
+
+
+@pytest.fixture
+def events(make_event):
+    return [
+        make_event("游泳-初級", "板橋", "2025/03/01"),
+        make_event("游泳-進階", "新莊", "2025/03/15", status="已額滿"),
+        make_event("田徑-初級", "板橋", "2025/04/01"),
+        make_event("射箭-進階", "新莊", "2025/05/20"),
+    ]
+
+
+@pytest.fixture
+def store(events):
+    store = EventStore()
+    store.replace(events)
+    return store
+
+
+def names(events):
+    return [event.name for event in events]
+
+
+def test_name_match_modes(store):
+    assert names(store.query(name="游泳-初級")) == ["游泳-初級"]
+    assert names(store.query(name="游泳", name_match="prefix")) == ["游泳-初級", "游泳-進階"]
+    assert names(store.query(name="進階", name_match="contains")) == ["游泳-進階", "射箭-進階"]
+    with pytest.raises(ValueError):
+        store.query(name="游泳", name_match="regex")
+
+
+def test_date_range_is_inclusive(store):
+    assert names(store.query(date_from="2025/03/15", date_to="2025/04/01")) == ["游泳-進階", "田徑-初級"]
+    assert names(store.query(date_from="2025/04/02")) == ["射箭-進階"]
+
+
+def test_conditions_are_intersected_in_page_order(store):
+    assert names(store.query(location="板橋", status="開放報名")) == ["游泳-初級", "田徑-初級"]
+    assert store.query(name="射箭-進階", location="板橋") == []
+
+
+def test_no_conditions_returns_everything(store, events):
+    assert store.query() == events
+
+
+def test_replace_rebuilds_indexes(store, make_event):
+    store.replace([make_event("籃球-初級")])
+    assert store.query(name="游泳", name_match="prefix") == []
+    assert len(store) == 1
+
+
+@pytest.fixture
+def client(events):
+    event_store.replace(events)
+    asyncio.run(snapshot_cache.publish(events))
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+def test_search_route(client):
+    response = client.get("/events/search", params={"event_name": "游泳", "name_match": "prefix", "status": "開放報名"})
+    assert response.status_code == 200
+    assert [event["name"] for event in response.json()] == ["游泳-初級"]
+
+
+def test_search_route_validation(client):
+    assert client.get("/events/search").status_code == 400
+    assert client.get("/events/search", params={"event_date": "2025-03-01"}).status_code == 400
+    assert client.get("/events/search", params={"event_name": "游泳", "name_match": "regex"}).status_code == 400
+    assert client.get("/events/search", params={"location": "台北"}).status_code == 404
@@ -0,0 +1,58 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import routes.api
+from models.schemas import EventChange
+from routes.api import router
+from services.changes import event_key
+from services.history import HistoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(tmp_path / "history.db")
+    store.start()
+    yield store
+    store.close()
+
+
+def test_record_scan_and_page(store, make_event):
+    for i, status in enumerate(["已額滿", "開放報名", "已額滿"]):
+        event = make_event("游泳-初級", status=status, last_checked=f"2025-01-01 00:0{i}:00")
+        change = EventChange(type="opened", event=event, previous_status="已額滿") if i == 1 else None
+        store.record_scan([event, make_event("田徑-初級")], [change] if change else [], scanned_at=event.last_checked)
+    store.close()  # 寫完佇列
+
+    observations = store.get_observations("游泳-初級", limit=2)
+    assert [o.status for o in observations] == ["已額滿", "開放報名"]
+    assert [o.observed_at for o in store.get_observations("游泳-初級", limit=2, offset=2)] == ["2025-01-01 00:00:00"]
+    transitions = store.get_transitions("游泳-初級", limit=10)
+    assert [(t.type, t.previous_status, t.status) for t in transitions] == [("opened", "已額滿", "開放報名")]
+
+
+def test_notification_ledger_survives_restart(tmp_path, make_event):
+    opened, closed = make_event("游泳-初級"), make_event("田徑-初級")
+    store = HistoryStore(tmp_path / "history.db")
+    assert store.load_notified() == set()
+    store.start()
+    store.mark_notified(event_key(opened), opened.name)
+    store.mark_notified(event_key(closed), closed.name)
+    store.clear_notified(event_key(closed))
+    store.close()
+
+    assert HistoryStore(tmp_path / "history.db").load_notified() == {event_key(opened)}
+
+
+def test_history_routes(store, make_event, monkeypatch):
+    store.record_scan([make_event("游泳-初級")], [])
+    store.close()
+    monkeypatch.setattr(routes.api, "history_store", store)
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+
+    page = client.get("/events/游泳-初級/history", params={"limit": 5}).json()
+    assert (page["limit"], page["offset"], len(page["items"])) == (5, 0, 1)
+    assert client.get("/events/游泳-初級/transitions").json()["items"] == []
+    assert client.get("/events/游泳-初級/history", params={"limit": 0}).status_code == 422
@@ -0,0 +1,111 @@
+import asyncio
+import json
+import time
+
+import httpx
+
+from services.notifier import TelegramNotifier, format_openings, parse_chat_ids
+from config import TELEGRAM_MESSAGE_LIMIT
+
+
+def run_notifier(handler, send, chat_interval=0.0):
+    """以 MockTransport 取代 Telegram API，執行 send(notifier) 後等待佇列送完"""
+
+    async def main():
+        notifier = TelegramNotifier(token="test", chat_ids=["1"], api_base="https://telegram.test", chat_interval=chat_interval)
+        notifier._backoff = lambda attempt: 0.01
+        await notifier.start()
+        await notifier._client.aclose()
+        notifier._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        send(notifier)
+        await notifier.close(timeout=5)
+        return notifier
+
+    return asyncio.run(main())
+
+
+def test_parse_chat_ids():
+    assert parse_chat_ids(" 1, 2 ,,3") == ["1", "2", "3"]
+    assert parse_chat_ids(None) == []
+
+
+def test_format_openings_splits_long_messages(make_event):
+    events = [make_event(f"課程{i}", location="地" * 200) for i in range(40)]
+    messages = format_openings(events)
+    assert len(messages) > 1
+    assert all(len(message) <= TELEGRAM_MESSAGE_LIMIT for message in messages)
+    assert sum(message.count("課程名稱：") for message in messages) == 40
+
+
+def test_delivers_to_each_chat():
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, json={"ok": True})
+
+    run_notifier(handler, lambda n: n.send("hello", ["1", "2"]))
+    assert sorted(r["chat_id"] for r in requests) == ["1", "2"]
+    assert requests[0]["text"] == "hello"
+
+
+def test_retries_after_rate_limit_and_server_error():
+    responses = [
+        httpx.Response(429, json={"ok": False, "parameters": {"retry_after": 0.05}}),
+        httpx.Response(502),
+        httpx.Response(200, json={"ok": True}),
+    ]
+    calls = []
+
+    def handler(request):
+        calls.append(time.monotonic())
+        return responses[len(calls) - 1]
+
+    run_notifier(handler, lambda n: n.send("hello"))
+    assert len(calls) == 3
+    assert calls[1] - calls[0] >= 0.05
+
+
+def test_retries_network_errors():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            raise httpx.ConnectError("down", request=request)
+        return httpx.Response(200, json={"ok": True})
+
+    run_notifier(handler, lambda n: n.send("hello"))
+    assert len(calls) == 2
+
+
+def test_client_errors_are_not_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(400, json={"ok": False})
+
+    notifier = run_notifier(handler, lambda n: n.send("hello"))
+    assert len(calls) == 1
+    assert notifier.pending == 0
+
+
+def test_throttles_per_chat():
+    sent = {}
+
+    def handler(request):
+        body = json.loads(request.content)
+        sent.setdefault(body["chat_id"], []).append(time.monotonic())
+        return httpx.Response(200, json={"ok": True})
+
+    def send(notifier):
+        for i in range(3):
+            notifier.send(f"m{i}", ["1", "2"])
+
+    run_notifier(handler, send, chat_interval=0.1)
+    for times in sent.values():
+        assert len(times) == 3
+        assert all(b - a >= 0.09 for a, b in zip(times, times[1:]))
+    # 不同聊天室各自節流，不互相等待
+    assert abs(sent["1"][0] - sent["2"][0]) < 0.05
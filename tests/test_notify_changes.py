@@ -0,0 +1,76 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import main
+from models.schemas import EventChange
+from services.changes import event_key, CHANGE_NEW, CHANGE_OPENED
+from services.history import HistoryStore
+from services.parser import STATUS_FULL, STATUS_OPEN
+from services.snapshot import Snapshot
+from services.watch_rules import WatchRuleEngine
+
+
+class FakeNotifier:
+    chat_ids = ["default"]
+
+    def __init__(self):
+        self.sent = []
+
+    def notify_openings(self, events, chat_ids=None):
+        self.sent.extend(event.name for event in events)
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    """以暫存的歷史資料庫與規則檔執行 leader 的 notify_changes"""
+    db_path = tmp_path / "history.db"
+    fake = FakeNotifier()
+    monkeypatch.setattr(main, "coordinator", SimpleNamespace(is_leader=True))
+    monkeypatch.setattr(main, "notifier", fake)
+    monkeypatch.setattr(main, "watch_engine", WatchRuleEngine(tmp_path / "rules.json"))
+    monkeypatch.setattr(main, "notified_events", set())
+
+    def restart():
+        """模擬重新啟動：寫完歷史紀錄後以新的 HistoryStore 載入通知紀錄"""
+        main.history_store.close()
+        store = HistoryStore(db_path)
+        store.start()
+        monkeypatch.setattr(main, "history_store", store)
+        main.notified_events.clear()
+        main.notified_events.update(store.load_notified())
+
+    restart()
+    yield SimpleNamespace(notifier=fake, restart=restart)
+    main.history_store.close()
+
+
+def notify(*changes):
+    asyncio.run(main.notify_changes(Snapshot([change.event for change in changes], list(changes))))
+
+
+def test_reopened_after_filled_while_down(service, make_event):
+    opened = make_event("游泳-初級", status=STATUS_OPEN)
+    notify(EventChange(type=CHANGE_OPENED, event=opened, previous_status=STATUS_FULL))
+    assert service.notifier.sent == ["游泳-初級"]
+
+    # 停機期間額滿，重啟後沒有共用快照，第一次掃描所有課程都是 new
+    service.restart()
+    assert event_key(opened) in main.notified_events
+    full = make_event("游泳-初級", status=STATUS_FULL)
+    notify(EventChange(type=CHANGE_NEW, event=full))
+    assert event_key(opened) not in main.notified_events
+
+    service.restart()
+    assert main.notified_events == set()
+    notify(EventChange(type=CHANGE_OPENED, event=opened, previous_status=STATUS_FULL))
+    assert service.notifier.sent == ["游泳-初級", "游泳-初級"]
+
+
+def test_notified_once_while_open(service, make_event):
+    opened = make_event("游泳-初級", status=STATUS_OPEN)
+    notify(EventChange(type=CHANGE_OPENED, event=opened, previous_status=STATUS_FULL))
+    service.restart()
+    notify(EventChange(type=CHANGE_NEW, event=opened))
+    assert service.notifier.sent == ["游泳-初級"]
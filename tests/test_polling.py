@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.polling import (
+    plan_next_scan,
+    parse_registration_time,
+    TAIPEI,
+    MODE_IDLE,
+    MODE_ACTIVE,
+    MODE_BURST,
+)
+from config import (
+    SCAN_INTERVAL,
+    SCAN_INTERVAL_ACTIVE,
+    SCAN_INTERVAL_BURST,
+    SCAN_BURST_BEFORE,
+    SCAN_ACTIVE_LEAD,
+    SCAN_JITTER,
+)
+
+NOW = TAIPEI.localize(datetime(2025, 1, 10, 12, 0))
+
+
+def registration(make_event, start: datetime, end: str = "報名截止：2025/02/10 23:59"):
+    return make_event(registration_start=f"報名開始：{start:%Y/%m/%d %H:%M}", registration_end=end)
+
+
+def test_parse_registration_time():
+    assert parse_registration_time("報名開始：2025/01/13 10:00") == TAIPEI.localize(datetime(2025, 1, 13, 10, 0))
+    assert parse_registration_time("報名截止：2025/2/3", end_of_day=True) == TAIPEI.localize(datetime(2025, 2, 3, 23, 59))
+    assert parse_registration_time("未公布") is None
+
+
+def test_idle_without_nearby_windows(make_event):
+    plan = plan_next_scan([registration(make_event, NOW + timedelta(days=30))], now=NOW)
+    assert plan.mode == MODE_IDLE
+    assert plan.delay == pytest.approx(SCAN_INTERVAL, rel=SCAN_JITTER)
+
+
+def test_active_while_registration_is_open(make_event):
+    plan = plan_next_scan([registration(make_event, NOW - timedelta(days=1))], now=NOW)
+    assert plan.mode == MODE_ACTIVE
+    assert plan.delay == pytest.approx(SCAN_INTERVAL_ACTIVE, rel=SCAN_JITTER)
+
+
+def test_active_shortly_before_opening(make_event):
+    plan = plan_next_scan([registration(make_event, NOW + timedelta(seconds=SCAN_ACTIVE_LEAD / 2))], now=NOW)
+    assert plan.mode == MODE_ACTIVE
+
+
+def test_burst_around_opening(make_event):
+    events = [
+        registration(make_event, NOW + timedelta(days=30)),
+        registration(make_event, NOW + timedelta(seconds=SCAN_BURST_BEFORE / 2)),
+    ]
+    plan = plan_next_scan(events, now=NOW)
+    assert plan.mode == MODE_BURST
+    assert plan.delay == pytest.approx(SCAN_INTERVAL_BURST, rel=SCAN_JITTER)
+
+
+def test_closed_registration_is_idle(make_event):
+    event = registration(make_event, NOW - timedelta(days=10), end="報名截止：2025/01/05 23:59")
+    assert plan_next_scan([event], now=NOW).mode == MODE_IDLE
+
+
+def test_does_not_sleep_past_next_burst(make_event):
+    # 報名時間只到分鐘，20 秒後進入密集時段，比一次 active 間隔還早
+    now = NOW + timedelta(seconds=40)
+    start = NOW + timedelta(seconds=SCAN_BURST_BEFORE + 60)
+    plan = plan_next_scan([registration(make_event, start)], now=now)
+    assert plan.mode == MODE_ACTIVE
+    assert plan.delay == pytest.approx(20)
@@ -0,0 +1,104 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import services.supervisor
+from services.driver_pool import PooledDriver
+from services.supervisor import ScanSupervisor, ScanTimeoutError, lease_driver, run_browser_stage, run_stage, stage_timeout
+
+START = datetime(2025, 1, 10, 12, 0, 0)
+
+
+def seconds(value):
+    return START + timedelta(seconds=value)
+
+
+def test_plan_next_keeps_fixed_pace():
+    supervisor = ScanSupervisor(deadline=10, min_gap=2)
+    assert supervisor.plan_next(START, 30, now=seconds(5)) == seconds(30)
+    # 以預定時間而非實際完成時間排下一次，不會累積漂移
+    assert supervisor.plan_next(seconds(31), 30, now=seconds(40)) == seconds(60)
+    assert supervisor.overruns == 0
+
+
+def test_plan_next_within_min_gap_is_not_overrun():
+    supervisor = ScanSupervisor(deadline=10, min_gap=2)
+    assert supervisor.plan_next(START, 5, now=seconds(4)) == seconds(6)
+    assert supervisor.overruns == 0
+
+
+def test_plan_next_coalesces_missed_runs():
+    supervisor = ScanSupervisor(deadline=10, min_gap=2)
+    assert supervisor.plan_next(START, 5, now=seconds(17)) == seconds(19)
+    assert supervisor.overruns == 1
+    # 接續的排程從合併後的時間繼續
+    assert supervisor.plan_next(seconds(19), 5, now=seconds(20)) == seconds(24)
+    assert supervisor.overruns == 1
+
+
+def test_started_records_lag():
+    supervisor = ScanSupervisor(deadline=10, min_gap=2)
+    supervisor.plan_next(START, 30, now=seconds(1))
+    supervisor.started(seconds(30.5))
+    assert supervisor.status()["lag_seconds"] == 0.5
+
+
+def test_stage_timeout_limited_by_scan_budget():
+    supervisor = ScanSupervisor(deadline=1, min_gap=2)
+    limits = []
+
+    async def scan():
+        limits.append(stage_timeout(15))
+        return []
+
+    assert stage_timeout(15) == 15
+    asyncio.run(supervisor.supervise(scan)())
+    assert 0 < limits[0] <= 1
+    assert supervisor.last_scan["result"] == "ok"
+
+
+def test_run_stage_timeout():
+    supervisor = ScanSupervisor(deadline=5, min_gap=2)
+
+    async def scan():
+        return await run_stage("http", asyncio.sleep(1), 0.05)
+
+    with pytest.raises(ScanTimeoutError) as info:
+        asyncio.run(supervisor.supervise(scan)())
+    assert info.value.stage == "http"
+    assert supervisor.last_scan["result"] == "timeout"
+    assert supervisor.last_scan["timed_out_stage"] == "http"
+
+
+def test_browser_stage_timeout_kills_chrome_off_the_loop(monkeypatch):
+    entry = PooledDriver(driver=None)
+    released = threading.Event()
+    killed = {}
+
+    class SlowKillPool:
+        def kill(self, entry):
+            # 模擬等待卡住的 Chrome 結束
+            time.sleep(0.3)
+            killed["thread"] = threading.current_thread()
+            released.set()
+
+    monkeypatch.setattr(services.supervisor, "driver_pool", SlowKillPool())
+
+    def stuck():
+        with lease_driver(entry):
+            released.wait(5)
+
+    async def run():
+        start = time.perf_counter()
+        with pytest.raises(ScanTimeoutError):
+            await run_browser_stage("browser", stuck, limit=0.05)
+        return time.perf_counter() - start
+
+    elapsed = asyncio.run(run())
+    assert elapsed < 0.25
+    assert entry.killed
+    assert released.wait(2)
+    assert killed["thread"] is not threading.main_thread()
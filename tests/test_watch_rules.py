@@ -0,0 +1,100 @@
+import random
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from benchmarks.bench_watch_rules import make_events, make_rules, rule_matches
+from models.schemas import WatchRule, WatchRuleInput
+from routes.api import router
+from services.watch_rules import CompiledRules, WatchRuleEngine, validate_rule, watch_engine
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_compiled_rules_match_naive(seed):
+    rng = random.Random(seed)
+    events = make_events(300, rng)
+    rules = make_rules(200, rng)
+    compiled = CompiledRules(rules)
+    for event in events:
+        expected = [i for i, rule in enumerate(rules) if rule_matches(rule, event)]
+        assert compiled.match(event) == expected
+
+
+def test_single_char_contains_and_open_date_range(make_event):
+    rules = [
+        WatchRule(id="0", name="泳", name_match="contains"),
+        WatchRule(id="1", date_from="2025/03/01"),
+        WatchRule(id="2", date_to="2025/02/28"),
+    ]
+    compiled = CompiledRules(rules)
+    assert compiled.match(make_event("游泳-初級", date="2025/03/01")) == [0, 1]
+    assert compiled.match(make_event("田徑-初級", date="2025/02/28")) == [2]
+
+
+@pytest.mark.parametrize("fields", [
+    {"name_match": "regex", "name": "游泳"},
+    {"name_match": "prefix"},
+    {"date_from": "2025-03-01"},
+    {"date_from": "2025/04/01", "date_to": "2025/03/01"},
+])
+def test_validate_rule_rejects(fields):
+    with pytest.raises(ValueError):
+        validate_rule(WatchRuleInput(**fields))
+
+
+def test_route_uses_default_chats(tmp_path, make_event):
+    engine = WatchRuleEngine(tmp_path / "rules.json")
+    swim, track = make_event("游泳-初級"), make_event("田徑-初級")
+    assert engine.route([swim, track], ["default"]) == {"default": [swim, track]}
+
+    engine.add(WatchRuleInput(name="游泳", name_match="prefix", chat_ids=["swim"]))
+    engine.add(WatchRuleInput(name="初級", name_match="contains"))
+    engine.add(WatchRuleInput(name="田徑-初級", enabled=False, chat_ids=["track"]))
+    assert engine.route([swim, track], ["default"]) == {"swim": [swim], "default": [swim, track]}
+
+
+def test_engines_sharing_file_keep_each_others_edits(tmp_path):
+    path = tmp_path / "rules.json"
+    first, second = WatchRuleEngine(path), WatchRuleEngine(path)
+    first.load()
+    second.load()
+
+    kept = first.add(WatchRuleInput(name="游泳-初級"))
+    second.add(WatchRuleInput(name="田徑-初級"))
+    assert [rule.name for rule in first.list()] == ["游泳-初級", "田徑-初級"]
+
+    first.delete(kept.id)
+    assert [rule.name for rule in second.list()] == ["田徑-初級"]
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(watch_engine, "path", tmp_path / "rules.json")
+    watch_engine.load()
+    app = FastAPI()
+    app.include_router(router)
+    yield TestClient(app)
+    monkeypatch.undo()
+    watch_engine.load()
+
+
+def test_rules_routes(client):
+    assert client.get("/rules").json() == []
+    assert client.post("/rules", json={"name": "游泳", "name_match": "regex"}).status_code == 400
+
+    created = client.post("/rules", json={"name": "游泳", "name_match": "prefix"})
+    assert created.status_code == 201
+    rule_id = created.json()["id"]
+    assert client.get(f"/rules/{rule_id}").json()["name"] == "游泳"
+
+    updated = client.put(f"/rules/{rule_id}", json={"name": "射箭", "name_match": "prefix"})
+    assert updated.json() == {**created.json(), "name": "射箭"}
+    assert client.put("/rules/missing", json={"name": "射箭"}).status_code == 404
+
+    replaced = client.put("/rules", json=[{"name": "田徑-初級"}, {"location": "板橋"}]).json()
+    assert [rule["id"] for rule in client.get("/rules").json()] == [rule["id"] for rule in replaced]
+
+    assert client.delete(f"/rules/{replaced[0]['id']}").status_code == 200
+    assert client.delete(f"/rules/{replaced[0]['id']}").status_code == 404
+    assert [rule["location"] for rule in client.get("/rules").json()] == ["板橋"]
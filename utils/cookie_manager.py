@@ -1,42 +1,108 @@
-import pickle
+import json
 import logging
-from datetime import datetime
+import os
+import threading
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional
+
+import httpx
+
+from config import (
+    Settings,
+    LOGIN_URL,
+    USER_AGENT,
+    COOKIE_DIR,
+    SESSION_PROBE_INTERVAL,
+    SESSION_PROBE_TIMEOUT,
+)
 
 logger = logging.getLogger(__name__)
 
+
 class CookieManager:
-    def __init__(self, cookie_max_age: int = 24 * 60 * 60):
-        self.cookie_dir = Path('data')
-        self.cookie_dir.mkdir(exist_ok=True)
-        self.cookie_file = self.cookie_dir / 'wmg_cookies.pkl'
-        self.cookie_timestamp_file = self.cookie_dir / 'cookie_timestamp.txt'
-        self.cookie_max_age = cookie_max_age
+    """共用於 Selenium 與 HTTP 客戶端的 cookie jar
 
-    def save_cookies(self, driver) -> bool:
-        """保存 cookies 到文件"""
+    cookies 保存在記憶體中，只在第一次使用時讀檔；寫檔以暫存檔取代，不使用 pickle。
+    有效性依各 cookie 的 expiry 判斷，登入狀態則以一次 HTTP 探測確認並快取結果。
+    """
+
+    def __init__(self, account: str = "default", cookie_dir: Path = COOKIE_DIR, probe_interval: float = SESSION_PROBE_INTERVAL):
+        self.account = account
+        self.cookie_dir = Path(cookie_dir)
+        self.cookie_file = self.cookie_dir / f"{account}.json"
+        self.probe_interval = probe_interval
+        self._cookies: List[dict] = []
+        self._loaded = False
+        self._session_valid: Optional[bool] = None
+        self._session_checked_at = 0.0
+        self._lock = threading.RLock()
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            try:
+                if self.cookie_file.exists():
+                    with open(self.cookie_file, 'r', encoding='utf-8') as f:
+                        self._cookies = json.load(f)["cookies"]
+            except Exception as e:
+                logger.error(f"讀取 Cookies 失敗: {str(e)}")
+                self._cookies = []
+            self._loaded = True
+
+    def _live_cookies(self) -> List[dict]:
+        """未過期的 cookies，沒有 expiry 的 session cookie 視為有效"""
+        self._ensure_loaded()
+        now = time.time()
+        return [c for c in self._cookies if c.get("expiry") is None or c["expiry"] > now]
+
+    def _write(self):
+        """先寫暫存檔再取代，避免中斷時留下寫一半的檔案"""
+        self.cookie_dir.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.cookie_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({"saved_at": time.time(), "cookies": self._cookies}, f, ensure_ascii=False)
+        os.chmod(tmp_file, 0o600)
+        os.replace(tmp_file, self.cookie_file)
+
+    def set_cookies(self, cookies: List[dict]) -> bool:
+        """以新的 cookies 取代並寫入檔案，剛登入取得的 cookies 視為有效登入狀態"""
         try:
-            cookies = driver.get_cookies()
-            with open(self.cookie_file, 'wb') as f:
-                pickle.dump(cookies, f)
-            # 記錄保存時間
-            with open(self.cookie_timestamp_file, 'w') as f:
-                f.write(str(datetime.now().timestamp()))
+            with self._lock:
+                self._cookies = list(cookies)
+                self._loaded = True
+                self.mark_session(True)
+                self._write()
             logger.info("Cookies 已保存")
             return True
         except Exception as e:
             logger.error(f"保存 Cookies 失敗: {str(e)}")
             return False
 
-    def load_cookies(self, driver) -> bool:
-        """從文件加載 cookies"""
+    def save_cookies(self, driver) -> bool:
+        """保存 WebDriver 目前的 cookies"""
         try:
-            if not self.cookie_file.exists() or not self.is_cookie_valid():
-                return False
+            cookies = driver.get_cookies()
+        except Exception as e:
+            logger.error(f"保存 Cookies 失敗: {str(e)}")
+            return False
+        return self.set_cookies(cookies)
 
-            with open(self.cookie_file, 'rb') as f:
-                cookies = pickle.load(f)
+    def get_cookies(self) -> Optional[List[dict]]:
+        """回傳未過期的 cookies，已知登入失效或沒有 cookies 時回傳 None"""
+        if not self.is_cookie_valid():
+            return None
+        return self._live_cookies()
+
+    def load_cookies(self, driver) -> bool:
+        """將 cookies 套用到 WebDriver，需先開啟同網域的頁面"""
+        cookies = self.get_cookies()
+        if not cookies:
+            return False
+        try:
             for cookie in cookies:
                 driver.add_cookie(cookie)
             logger.info("Cookies 已加載")
@@ -45,29 +111,82 @@ class CookieManager:
             logger.error(f"加載 Cookies 失敗: {str(e)}")
             return False
 
+    def apply_to_client(self, cookies: httpx.Cookies) -> bool:
+        """將 cookies 套用到 httpx 客戶端的 cookie jar，沒有可用的 cookies 時清空並回傳 False"""
+        cookies.clear()
+        live = self.get_cookies() or []
+        for cookie in live:
+            cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain", ""), path=cookie.get("path", "/"))
+        return bool(live)
+
     def clear_cookies(self) -> bool:
         """清除保存的 cookies"""
         try:
-            if self.cookie_file.exists():
-                self.cookie_file.unlink()
-            if self.cookie_timestamp_file.exists():
-                self.cookie_timestamp_file.unlink()
+            with self._lock:
+                self._cookies = []
+                self._loaded = True
+                self._session_valid = None
+                if self.cookie_file.exists():
+                    self.cookie_file.unlink()
             logger.info("Cookies 已清除")
             return True
         except Exception as e:
             logger.error(f"清除 Cookies 失敗: {str(e)}")
             return False
 
+    def mark_session(self, valid: bool):
+        """記錄已知的登入狀態，例如抓取頁面時被導回登入頁"""
+        self._session_valid = valid
+        self._session_checked_at = time.monotonic()
+
     def is_cookie_valid(self) -> bool:
-        """檢查 cookies 是否有效"""
-        try:
-            if not self.cookie_timestamp_file.exists():
-                return False
-                
-            with open(self.cookie_timestamp_file, 'r') as f:
-                timestamp = float(f.read().strip())
-            saved_time = datetime.fromtimestamp(timestamp)
-            return (datetime.now() - saved_time).total_seconds() < self.cookie_max_age
-        except Exception as e:
-            logger.error(f"檢查 Cookies 有效性失敗: {str(e)}")
+        """檢查 cookies 是否有效，只讀取記憶體"""
+        if self._session_valid is False:
+            return False
+        return bool(self._live_cookies())
+
+    def validate_session(self, force: bool = False) -> bool:
+        """以一次 HTTP 請求確認登入狀態，結果快取 probe_interval 秒
+
+        已登入時開啟登入頁會被導向其他頁面或出現「已登入」提示，未登入時會看到登入表單。
+        """
+        cookies = self._live_cookies()
+        if not cookies:
             return False
+        fresh = time.monotonic() - self._session_checked_at < self.probe_interval
+        if not force and self._session_valid is not None and fresh:
+            return self._session_valid
+
+        jar = httpx.Cookies()
+        for cookie in cookies:
+            jar.set(cookie["name"], cookie["value"], domain=cookie.get("domain", ""), path=cookie.get("path", "/"))
+        try:
+            with httpx.Client(headers={"User-Agent": USER_AGENT}, cookies=jar, timeout=SESSION_PROBE_TIMEOUT) as client:
+                response = client.get(LOGIN_URL, follow_redirects=False)
+        except httpx.HTTPError as e:
+            logger.warning(f"探測登入狀態失敗: {str(e)}")
+            return self._session_valid is not False
+
+        if response.is_redirect:
+            valid = "member_login.php" not in response.headers.get("location", "")
+        else:
+            valid = "已登入" in response.text or 'name="member_userid"' not in response.text
+        self.mark_session(valid)
+        logger.info(f"登入狀態探測: {'有效' if valid else '已失效'}")
+        return valid
+
+
+_managers: Dict[str, CookieManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_cookie_manager(account: Optional[str] = None) -> CookieManager:
+    """取得帳號共用的 CookieManager，預設為 WMG_USERNAME"""
+    account = account or Settings.WMG_USERNAME or "default"
+    with _managers_lock:
+        if account not in _managers:
+            _managers[account] = CookieManager(account)
+        return _managers[account]
+
+
+cookie_manager = get_cookie_manager()